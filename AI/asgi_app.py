@@ -0,0 +1,216 @@
+# asgi_app.py
+"""
+ASGI entry point: the JSON read endpoints and the push stream served by async
+views, everything else by the regular Flask app.
+
+Run with:  uvicorn --factory asgi_app:create_asgi_app --port 5000
+      or:  python asgi_app.py
+(the plain WSGI app still runs on its own: gunicorn "main_app:create_app()")
+
+Async routes (same URLs, payloads, ETags and error codes as the Flask views):
+- GET /api/state, /api/tasks, /api/quests, /api/academic
+- GET /api/stream   (server-sent events)
+
+Why: under a threaded WSGI server each open dashboard stream pins a worker
+thread for as long as the tab stays open. Here an idle stream is a parked
+coroutine waiting on events.subscribe_async(), so one process holds thousands
+of them, and the polling reads run on an asyncio engine (aiosqlite / asyncpg)
+without queueing behind the streams for a thread.
+
+Shared, not duplicated: the async views execute the statements built by
+backend.state (state_queries, page_query, version_query) and format them with
+the same normalizers. Writes, forms and HTML pages are routed to the Flask app
+mounted at "/" (in a thread pool), in the same process, so events published by
+its write paths reach the async subscribers directly.
+
+The login session is the Flask session cookie, verified with the Flask app's
+own signing serializer; the account check goes through auth's identity cache.
+"""
+
+import contextlib
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags, quote_etag
+
+from main_app import create_app
+from backend import auth, events, state as state_mod
+from backend.database import async_engine_args, install_engine_hooks
+from backend.leveling import PlayerStats
+from backend.pagination import DEFAULT_PAGE_SIZE
+
+from a2wsgi import WSGIMiddleware   # maintained successor of starlette's deprecated one
+
+
+def create_asgi_app(config=None):
+    """Build the Flask app (see main_app.create_app) and the async front end around it."""
+    flask_app = create_app(config)
+
+    uri, options = async_engine_args(flask_app)
+    engine = create_async_engine(uri, **options)
+    install_engine_hooks(flask_app, engine.sync_engine)
+
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie_name = flask_app.config["SESSION_COOKIE_NAME"]
+    max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+    heartbeat = float(flask_app.config.get("STREAM_HEARTBEAT_SECONDS", 15))
+
+    # ------------ helpers ------------
+    def _session(request):
+        raw = request.cookies.get(cookie_name)
+        if not raw or serializer is None:
+            return {}
+        try:
+            return serializer.loads(raw, max_age=max_age)
+        except Exception:
+            return {}
+
+    async def _username(request):
+        """Username of the logged-in user whose account still exists (see auth.current_user)."""
+        data = _session(request)
+        username = data.get("username")
+        if not username:
+            return None
+        identity = auth.cached_identity(username)
+        if identity is None:
+            async with engine.connect() as conn:
+                row = (await conn.execute(auth.identity_query(username))).first()
+            if row is None:
+                return None
+            identity = auth.remember_identity(row.id, row.username)
+        user_id = data.get("user_id")
+        if user_id is not None and user_id != identity["id"]:
+            return None
+        return identity["username"]
+
+    def _error(error, status):
+        return JSONResponse({"ok": False, "error": error}, status_code=status)
+
+    def _with_etag(resp, etag):
+        resp.headers["ETag"] = quote_etag(etag, weak=True)
+        # per-user payloads: never share, always revalidate
+        resp.headers["Cache-Control"] = "private, no-cache"
+        resp.headers["Vary"] = "Cookie"
+        return resp
+
+    async def _check_etag(conn, request, username, scope):
+        """Return (etag, response): a ready 304 when If-None-Match is current, else None."""
+        version = int((await conn.execute(state_mod.version_query(username))).scalar() or 0)
+        etag = state_mod.etag_for(username, scope, version)
+        if parse_etags(request.headers.get("if-none-match")).contains_weak(etag):
+            return etag, _with_etag(Response(status_code=304), etag)
+        return etag, None
+
+    # ------------ API: state ------------
+    async def api_state(request):
+        username = await _username(request)
+        if not username:
+            return _error("unauthenticated", 401)
+        try:
+            async with engine.connect() as conn:
+                etag, not_modified = await _check_etag(conn, request, username, "state")
+                if not_modified is not None:
+                    return not_modified
+                head_stmt, items_stmt = state_mod.state_queries(username, DEFAULT_PAGE_SIZE)
+                head = (await conn.execute(head_stmt)).first()
+                if head is None:
+                    return _error("user_not_found", 401)
+                rows = (await conn.execute(items_stmt)).all()
+        except Exception as e:
+            print("asgi api_state fetch error:", repr(e))
+            return _error("fetch_error", 500)
+
+        state = state_mod.build_state(head, rows, DEFAULT_PAGE_SIZE)
+        return _with_etag(JSONResponse({
+            "ok": True,
+            "user": state["user"],
+            "stats": state["stats"],
+            "tasks": state["tasks"],
+            "tasks_next_cursor": state["next_cursors"]["tasks"],
+        }), etag)
+
+    # ------------ API: paginated lists ------------
+    def _list_view(kind, scope, key):
+        async def view(request):
+            username = await _username(request)
+            if not username:
+                return _error("unauthenticated", 401)
+            try:
+                async with engine.connect() as conn:
+                    etag, not_modified = await _check_etag(conn, request, username, scope)
+                    if not_modified is not None:
+                        return not_modified
+                    try:
+                        stmt, limit = state_mod.page_query(
+                            kind, username,
+                            cursor=request.query_params.get("cursor"),
+                            limit=request.query_params.get("limit"),
+                        )
+                    except ValueError:
+                        return _error("invalid_cursor", 400)
+                    rows = (await conn.execute(stmt)).all()
+                    body = {"ok": True}
+                    body[key], body["next_cursor"] = state_mod.build_page(kind, rows, limit)
+                    if kind == "academic":
+                        xp = (await conn.execute(
+                            select(PlayerStats.xp).where(PlayerStats.username == username)
+                        )).scalar()
+                        body["total_xp"] = int(xp or 0)
+            except Exception as e:
+                print(f"asgi /api/{scope} GET failed:", repr(e))
+                return _error("server_error", 500)
+            return _with_etag(JSONResponse(body), etag)
+        return view
+
+    # ------------ API: push stream ------------
+    async def api_stream(request):
+        username = await _username(request)
+        if not username:
+            return _error("unauthenticated", 401)
+        sub = events.subscribe_async(username)
+
+        async def generate():
+            try:
+                yield "retry: 5000\n\n"
+                yield events.format_sse({"type": "hello", "data": {"username": username}})
+                while True:
+                    msg = await sub.get(timeout=heartbeat)
+                    if msg is None:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield events.format_sse(msg)
+            finally:
+                sub.close()
+
+        return StreamingResponse(generate(), media_type="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    routes = [
+        Route("/api/state", api_state, methods=["GET"]),
+        Route("/api/state/refresh", api_state, methods=["GET"]),
+        Route("/api/tasks", _list_view("task", "tasks", "tasks"), methods=["GET"]),
+        Route("/api/quests", _list_view("quest", "quests", "quests"), methods=["GET"]),
+        Route("/api/academic", _list_view("academic", "academic", "sessions"), methods=["GET"]),
+        Route("/api/stream", api_stream, methods=["GET"]),
+        # POSTs to the routes above and every other URL
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ]
+    asgi = Starlette(routes=routes, lifespan=lifespan)
+    asgi.state.flask_app = flask_app
+    asgi.state.async_engine = engine
+    return asgi
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(create_asgi_app(), host="127.0.0.1", port=5000)
@@ -4,14 +4,29 @@ from .extentions import db
 
 def init_app(app):
     """
-    Initialize backend modules and create tables.
+    Initialize backend modules and check the schema version.
     Import modules here (after db.init_app in create_app).
     """
     # db.init_app is called in create_app before this function is called.
     # Import modules now so models bind to the single db instance.
     # These imports should *not* execute expensive side-effects at import time.
-    from . import models, auth, task_tracker, academic_tracker, quest_system, leveling  # noqa: F401
+    from . import models, auth, task_tracker, academic_tracker, quest_system, leveling, state  # noqa: F401
+    from . import passwords, leaderboard, xp_manager
+    passwords.configure(app)
+    leaderboard.configure(app)
+    xp_manager.configure(app)
 
-    # create DB tables if not present
+    # never create_all here: one SELECT on schema_version, then per SCHEMA_MODE
+    #   "check" raise if the schema is not current (run `python migrate.py upgrade` first; default)
+    #   "auto"  upgrade a missing/outdated schema (opt-in: development, throwaway databases)
+    #   "off"   no database access at all (pre-fork workers, inspection scripts)
+    mode = app.config.get("SCHEMA_MODE") or "check"
+    if mode == "off":
+        return
+    from .migrations import ensure_current
     with app.app_context():
-        db.create_all()
+        ensure_current(db.engine, auto_upgrade=(mode == "auto"))
+
+    # timed quests complete in the background (needs a migrated schema)
+    from . import quest_scheduler
+    quest_scheduler.init_app(app)
@@ -5,14 +5,29 @@ Academic tracker helpers.
 Functions:
 - start_study_session(username, subject) -> session_id | None
 - end_study_session(session_id) -> {"ok": True, "hours": float, "xp_awarded": int} | {"ok": False, "error": str}
-- get_study_sessions(username) -> list of (subject, hours, date_iso)
+- get_study_sessions(username, limit=None, cursor=None) -> list of (subject, hours, date_iso)
+- get_study_sessions_page(username, cursor=None, limit=None) -> (list of session dicts, next_cursor)
+- get_subject_totals(username) -> {subject: hours}
+- get_study_stats(username, period="week", periods=12, today=None) -> {"period", "totals", "series"}
+- period_start(period, when) -> start date of the day / week holding `when` (None if unknown)
 - get_active_session(username) -> session dict or None
+- record_study(username, subject, hours, when, sessions=1)   (rollups; no commit)
+- rebuild_study_rollups(username=None, conn=None) -> rows written
+
+Study rollups (StudyRollup / study_rollups) hold hours and session counts
+per subject per day, per week and all-time. Every finished session or
+manual log entry adds to its three rows in the same transaction that writes
+the log (record_study), so totals and charts read O(subjects x periods)
+rows instead of every session. rebuild_study_rollups recomputes them from
+academic_logs (migration 7, `python migrate.py rebuild-rollups`).
 """
 
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, or_
 from backend import db
-from backend.leveling import add_xp
-from .models import AcademicLog
+from backend.leveling import add_xp, xp_ledger
+from .models import AcademicLog, StudyRollup
+from .pagination import keyset_page
 # backend/models.py
 from .extentions import db
 # define User, Task, Quest, etc. using that db
@@ -59,33 +74,36 @@ def end_study_session(session_id):
         return {"ok": False, "error": "session has no start_time"}
 
     try:
-        rec.end_time = datetime.utcnow()
-        duration_hours = (rec.end_time - rec.start_time).total_seconds() / 3600.0
-        rec.hours = round(duration_hours, 2)
+        # session end + XP award commit together
+        with xp_ledger() as ledger:
+            rec.end_time = datetime.utcnow()
+            duration_hours = (rec.end_time - rec.start_time).total_seconds() / 3600.0
+            rec.hours = round(duration_hours, 2)
 
-        xp_to_award = max(0, int(duration_hours * 5))  # 5 XP per hour
+            xp_to_award = max(0, int(duration_hours * 5))  # 5 XP per hour
 
-        if xp_to_award > 0:
-            try:
-                add_xp(rec.username, xp_to_award)
-            except Exception as e:
-                # don't abort the session if XP awarding fails; log for dev
-                print("Warning: add_xp failed in end_study_session:", repr(e))
+            if xp_to_award > 0:
+                add_xp(rec.username, xp_to_award, "study", rec.id)
+            record_study(rec.username, rec.subject, rec.hours, rec.date)
 
-        db.session.commit()
-        return {"ok": True, "hours": rec.hours, "xp_awarded": xp_to_award}
+        # the daily cap may have let through less than xp_to_award
+        xp_awarded = ledger.results.get(rec.username, {}).get("xp_added", xp_to_award)
+        return {"ok": True, "hours": rec.hours, "xp_awarded": xp_awarded}
     except Exception as e:
         db.session.rollback()
         print("end_study_session error:", repr(e))
         return {"ok": False, "error": str(e)}
 
-def get_study_sessions(username):
+def get_study_sessions(username, limit=None, cursor=None):
     username = (username or "").strip()
     if not username:
         return []
 
     try:
-        rows = AcademicLog.query.filter_by(username=username).order_by(AcademicLog.date.desc()).all()
+        if limit is None and cursor is None:
+            rows = AcademicLog.query.filter_by(username=username).order_by(AcademicLog.date.desc(), AcademicLog.id.desc()).all()
+        else:
+            rows = _study_sessions_query_page(username, cursor, limit)[0]
         result = []
         for r in rows:
             date_iso = r.date.isoformat() if hasattr(r.date, "isoformat") else str(r.date)
@@ -95,6 +113,205 @@ def get_study_sessions(username):
         print("get_study_sessions error:", repr(e))
         return []
 
+def _study_sessions_query_page(username, cursor, limit):
+    return keyset_page(
+        AcademicLog.query.filter_by(username=username), "academic",
+        AcademicLog.date, AcademicLog.id, cursor=cursor, limit=limit,
+    )
+
+def get_study_sessions_page(username, cursor=None, limit=None):
+    """
+    Return (sessions, next_cursor): one page of
+    {"id", "subject", "hours", "date"} dicts, most recent first.
+    next_cursor is None on the last page. Raises ValueError on a bad cursor.
+    """
+    username = (username or "").strip()
+    if not username:
+        return [], None
+    rows, next_cursor = _study_sessions_query_page(username, cursor, limit)
+    return [{
+        "id": r.id,
+        "subject": r.subject or "",
+        "hours": float(r.hours or 0),
+        "date": r.date.isoformat() if r.date else None,
+    } for r in rows], next_cursor
+
+def get_subject_totals(username):
+    """Return {subject: total_hours} from the all-time rollups (one row per subject)."""
+    username = (username or "").strip()
+    if not username:
+        return {}
+    try:
+        rows = db.session.execute(
+            db.select(StudyRollup.subject, StudyRollup.hours).where(
+                StudyRollup.username == username,
+                StudyRollup.period == "all",
+                StudyRollup.period_start == ROLLUP_ALL_START,
+            )
+        ).all()
+        return {subject: round(float(hours or 0), 2) for subject, hours in rows if subject}
+    except Exception as e:
+        print("get_subject_totals error:", repr(e))
+        return {}
+
+def get_study_stats(username, period="week", periods=12, today=None):
+    """
+    Study hours per subject for the last `periods` days or weeks (including the
+    current one), plus all-time totals:
+    {
+      "period": "day" | "week",
+      "totals": {subject: hours},
+      "series": [{"start": "YYYY-MM-DD", "subject": str, "hours": float, "sessions": int}, newest first]
+    }
+    Raises ValueError for an unknown period.
+    """
+    if period not in ("day", "week"):
+        raise ValueError("invalid_period")
+    periods = max(1, min(int(periods), MAX_STATS_PERIODS))
+    current = _period_starts(today or datetime.utcnow())[period]
+    step = timedelta(days=1 if period == "day" else 7)
+    since = current - step * (periods - 1)
+
+    rows = db.session.execute(
+        db.select(StudyRollup.period_start, StudyRollup.subject, StudyRollup.hours, StudyRollup.sessions)
+        .where(
+            StudyRollup.username == username,
+            StudyRollup.period == period,
+            StudyRollup.period_start >= since,
+        )
+        .order_by(StudyRollup.period_start.desc(), StudyRollup.subject)
+    ).all()
+    return {
+        "period": period,
+        "totals": get_subject_totals(username),
+        "series": [{
+            "start": r.period_start.isoformat(),
+            "subject": r.subject,
+            "hours": round(float(r.hours or 0), 2),
+            "sessions": int(r.sessions or 0),
+        } for r in rows],
+    }
+
+# ------------------------
+# Study rollups
+# ------------------------
+ROLLUP_ALL_START = date(1970, 1, 1)   # period_start of the single "all" row per subject
+MAX_STATS_PERIODS = 366
+REBUILD_CHUNK_SIZE = 1000
+
+def _period_starts(when):
+    day = when.date() if isinstance(when, datetime) else when
+    return {"day": day, "week": day - timedelta(days=day.weekday()), "all": ROLLUP_ALL_START}
+
+def period_start(period, when):
+    return _period_starts(when).get(period)
+
+def _rollup_rows(username, subject, hours, when, sessions=1):
+    return [
+        dict(username=username, subject=subject, period=period, period_start=start,
+             hours=float(hours or 0), sessions=sessions)
+        for period, start in _period_starts(when).items()
+    ]
+
+def _add_to_rollups(executor, rows):
+    """Add rows' hours/sessions onto existing rollups, creating missing ones (race-free upsert)."""
+    if not rows:
+        return
+    dialect = executor.get_bind().dialect.name if hasattr(executor, "get_bind") else executor.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    table = StudyRollup.__table__
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["username", "period", "period_start", "subject"],
+            set_={"hours": table.c.hours + stmt.excluded.hours,
+                  "sessions": table.c.sessions + stmt.excluded.sessions},
+        )
+        executor.execute(stmt, rows)
+        return
+    for row in rows:
+        res = executor.execute(
+            table.update().where(
+                table.c.username == row["username"], table.c.period == row["period"],
+                table.c.period_start == row["period_start"], table.c.subject == row["subject"],
+            ).values(hours=table.c.hours + row["hours"], sessions=table.c.sessions + row["sessions"])
+        )
+        if not res.rowcount:
+            executor.execute(table.insert().values(**row))
+
+def record_study(username, subject, hours, when, sessions=1):
+    """Add a finished session / log entry to its day, week and all-time rollups (no commit)."""
+    username = (username or "").strip()
+    if not username or not subject:
+        return
+    _add_to_rollups(db.session, _rollup_rows(username, subject, hours, when or datetime.utcnow(), sessions))
+
+def rebuild_study_rollups(username=None, conn=None):
+    """
+    Recompute rollups from academic_logs (every user, or one), replacing what is
+    there. Day totals are aggregated in SQL and streamed in username order;
+    week and all-time rows are summed from them one user at a time. Active
+    (not yet ended) sessions are left out, as in the incremental path.
+    Runs on `conn` when given (migrations), else in db.session (no commit).
+    Returns the number of rollup rows written.
+    """
+    executor = conn if conn is not None else db.session
+    logs = AcademicLog.__table__
+    table = StudyRollup.__table__
+
+    delete = table.delete()
+    day = func.date(logs.c.date)
+    stmt = (
+        db.select(logs.c.username, logs.c.subject, day.label("day"),
+                  func.sum(logs.c.hours).label("hours"), func.count().label("sessions"))
+        .where(or_(logs.c.end_time.is_not(None), logs.c.start_time.is_(None)))
+        .group_by(logs.c.username, logs.c.subject, day)
+        .order_by(logs.c.username)
+    )
+    if username:
+        delete = delete.where(table.c.username == username)
+        stmt = stmt.where(logs.c.username == username)
+    executor.execute(delete)
+
+    written = 0
+    pending = []
+    current_user = None
+    coarse = {}   # (period, start, subject) -> [hours, sessions] for current_user
+
+    def flush_user():
+        for (period, start, subject), (h, n) in coarse.items():
+            pending.append(dict(username=current_user, subject=subject, period=period,
+                                period_start=start, hours=h, sessions=n))
+        coarse.clear()
+
+    for r in executor.execute(stmt.execution_options(yield_per=REBUILD_CHUNK_SIZE)):
+        if r.username != current_user:
+            flush_user()
+            current_user = r.username
+        d = date.fromisoformat(r.day) if isinstance(r.day, str) else r.day
+        hours, sessions = float(r.hours or 0), int(r.sessions or 0)
+        pending.append(dict(username=r.username, subject=r.subject, period="day",
+                            period_start=d, hours=hours, sessions=sessions))
+        for period in ("week", "all"):
+            acc = coarse.setdefault((period, _period_starts(d)[period], r.subject), [0.0, 0])
+            acc[0] += hours
+            acc[1] += sessions
+        if len(pending) >= REBUILD_CHUNK_SIZE:
+            executor.execute(table.insert(), pending)
+            written += len(pending)
+            pending = []
+    flush_user()
+    if pending:
+        executor.execute(table.insert(), pending)
+        written += len(pending)
+    return written
+
 def get_active_session(username):
     """
     Return the active (not yet ended) session for the user as a dict:
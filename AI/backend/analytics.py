@@ -0,0 +1,248 @@
+# backend/analytics.py
+"""
+Charts: XP over time and study hours per day / week / month.
+
+Functions:
+- get_analytics(username, bucket="week", days=None, today=None) -> dict (see below)
+- bucket_starts(bucket, first, last) -> list of date
+- bucket_index(starts, days) -> bucket position per day (-1 = before the first)
+- record_xp_events(executor, events)   (XP ledger commit; no commit)
+- rebuild_xp_daily(username=None, conn=None) -> rows written
+
+XP events (models.XPEvent, written by leveling.add_xp) are also summed per
+user, UTC day and source into xp_daily (models.XPDaily) in the same commit,
+the way study hours are summed into the daily study rollups. Charts read
+only those day rows for the requested window (one range scan each on their
+(username, day) keys), so a year is at most a few thousand rows however many
+events it holds, and sum them into dense buckets with NumPy (searchsorted +
+bincount over the whole array) when it is installed, else with bisect.
+rebuild_xp_daily recomputes xp_daily from the event log (migration 8).
+
+Buckets are UTC calendar days, ISO weeks (starting Monday) and calendar months.
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from backend import db
+from .models import StudyRollup, XPDaily, XPEvent
+from .xp_curves import numpy_or_none
+
+BUCKETS = ("day", "week", "month")
+DEFAULT_DAYS = {"day": 30, "week": 26 * 7, "month": 365}
+MAX_DAYS = 10 * 366
+
+
+# ------------------------
+# Buckets
+# ------------------------
+def _floor(bucket, day):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next(bucket, start):
+    if bucket == "week":
+        return start + timedelta(days=7)
+    if bucket == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def bucket_starts(bucket, first, last):
+    """Start dates of every bucket from the one holding `first` to the one holding `last`."""
+    starts = []
+    start = _floor(bucket, first)
+    while start <= last:
+        starts.append(start)
+        start = _next(bucket, start)
+    return starts
+
+
+def bucket_index(starts, days):
+    """Position in `starts` (sorted dates) of the bucket each of `days` falls in; -1 if before all."""
+    np = numpy_or_none()
+    if np is None:
+        return [bisect_right(starts, d) - 1 for d in days]
+    # day ordinals: far cheaper to build than datetime64 arrays from date objects
+    edges = np.fromiter((s.toordinal() for s in starts), dtype=np.int64, count=len(starts))
+    keys = np.fromiter((d.toordinal() for d in days), dtype=np.int64, count=len(days))
+    return np.searchsorted(edges, keys, side="right") - 1
+
+
+def _sums(index, weights, size, mask=None):
+    """Per-bucket sums of weights (dropping index -1), optionally only where mask is true."""
+    np = numpy_or_none()
+    if np is None:
+        out = [0.0] * size
+        for i, (b, w) in enumerate(zip(index, weights)):
+            if b >= 0 and (mask is None or mask[i]):
+                out[b] += w
+        return out
+    keep = index >= 0
+    if mask is not None:
+        keep &= mask
+    return np.bincount(index[keep], weights=np.asarray(weights, dtype=float)[keep], minlength=size).tolist()
+
+
+def _grouped(index, weights, keys, size):
+    """{key: per-bucket sums} for each distinct key (event source / subject)."""
+    np = numpy_or_none()
+    distinct = sorted(set(keys))
+    if np is None:
+        return {k: _sums(index, weights, size, [x == k for x in keys]) for k in distinct}
+    keys = np.array(keys, dtype=object)
+    return {k: _sums(index, weights, size, keys == k) for k in distinct}
+
+
+# ------------------------
+# Daily XP aggregates
+# ------------------------
+def _add_to_xp_daily(executor, rows):
+    """Add rows' amounts onto existing xp_daily rows, creating missing ones (race-free upsert)."""
+    dialect = executor.get_bind().dialect.name if hasattr(executor, "get_bind") else executor.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    table = XPDaily.__table__
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["username", "day", "source"],
+            set_={"amount": table.c.amount + stmt.excluded.amount},
+        )
+        executor.execute(stmt, rows)
+        return
+    for row in rows:
+        res = executor.execute(
+            table.update().where(
+                table.c.username == row["username"], table.c.day == row["day"],
+                table.c.source == row["source"],
+            ).values(amount=table.c.amount + row["amount"])
+        )
+        if not res.rowcount:
+            executor.execute(table.insert().values(**row))
+
+
+def record_xp_events(executor, events):
+    """Add XP event dicts (username, source, amount, created_at) to their xp_daily rows."""
+    sums = {}
+    for e in events:
+        key = (e["username"], e["created_at"].date(), e["source"])
+        sums[key] = sums.get(key, 0) + int(e["amount"])
+    if sums:
+        _add_to_xp_daily(executor, [
+            dict(username=u, day=d, source=s, amount=a) for (u, d, s), a in sums.items()
+        ])
+
+
+def rebuild_xp_daily(username=None, conn=None):
+    """
+    Recompute xp_daily from xp_events (every user, or one) with one
+    INSERT ... SELECT, replacing what is there. Runs on `conn` when given
+    (migrations), else in db.session (no commit). Returns the rows written.
+    """
+    executor = conn if conn is not None else db.session
+    events = XPEvent.__table__
+    table = XPDaily.__table__
+    delete = table.delete()
+    day = func.date(events.c.created_at)
+    select = (
+        db.select(events.c.username, day, events.c.source, func.sum(events.c.amount))
+        .group_by(events.c.username, day, events.c.source)
+    )
+    if username:
+        delete = delete.where(table.c.username == username)
+        select = select.where(events.c.username == username)
+    executor.execute(delete)
+    return executor.execute(table.insert().from_select(["username", "day", "source", "amount"], select)).rowcount
+
+
+# ------------------------
+# Charts
+# ------------------------
+def _xp_series(username, starts):
+    rows = db.session.execute(
+        db.select(XPDaily.day, XPDaily.source, XPDaily.amount)
+        .where(XPDaily.username == username, XPDaily.day >= starts[0])
+    ).all()
+    before = db.session.execute(
+        db.select(func.coalesce(func.sum(XPDaily.amount), 0))
+        .where(XPDaily.username == username, XPDaily.day < starts[0])
+    ).scalar()
+
+    size = len(starts)
+    index = bucket_index(starts, [r.day for r in rows])
+    amounts = [int(r.amount or 0) for r in rows]
+    totals = _sums(index, amounts, size)
+    by_source = _grouped(index, amounts, [r.source for r in rows], size)
+
+    series, running = [], int(before or 0)
+    for i, start in enumerate(starts):
+        gained = int(totals[i])
+        running += gained
+        series.append({
+            "start": start.isoformat(),
+            "xp": gained,
+            "total": running,
+            "by_source": {s: int(v[i]) for s, v in by_source.items() if v[i]},
+        })
+    return {"before": int(before or 0), "series": series}
+
+
+def _study_series(username, starts):
+    rows = db.session.execute(
+        db.select(StudyRollup.period_start, StudyRollup.subject, StudyRollup.hours, StudyRollup.sessions)
+        .where(
+            StudyRollup.username == username,
+            StudyRollup.period == "day",
+            StudyRollup.period_start >= starts[0],
+        )
+    ).all()
+
+    size = len(starts)
+    index = bucket_index(starts, [r.period_start for r in rows])
+    hours = [float(r.hours or 0) for r in rows]
+    totals = _sums(index, hours, size)
+    sessions = _sums(index, [int(r.sessions or 0) for r in rows], size)
+    by_subject = _grouped(index, hours, [r.subject for r in rows], size)
+
+    return {"series": [{
+        "start": start.isoformat(),
+        "hours": round(totals[i], 2),
+        "sessions": int(sessions[i]),
+        "by_subject": {s: round(v[i], 2) for s, v in by_subject.items() if v[i]},
+    } for i, start in enumerate(starts)]}
+
+
+def get_analytics(username, bucket="week", days=None, today=None):
+    """
+    XP and study time for the last `days` days (default per bucket: 30 days,
+    26 weeks, 365 days), widened to whole buckets, oldest bucket first:
+    {
+      "bucket": "day" | "week" | "month", "start": "YYYY-MM-DD", "end": "YYYY-MM-DD",
+      "xp":    {"before": int, "series": [{"start", "xp", "total", "by_source": {source: xp}}]},
+      "study": {"series": [{"start", "hours", "sessions", "by_subject": {subject: hours}}]}
+    }
+    "total" is the running XP balance (starting from "before", the sum of all
+    earlier events). Raises ValueError for an unknown bucket.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError("invalid_bucket")
+    days = max(1, min(int(days or DEFAULT_DAYS[bucket]), MAX_DAYS))
+    today = today or datetime.utcnow().date()
+    starts = bucket_starts(bucket, today - timedelta(days=days - 1), today)
+    return {
+        "bucket": bucket,
+        "start": starts[0].isoformat(),
+        "end": today.isoformat(),
+        "xp": _xp_series(username, starts),
+        "study": _study_series(username, starts),
+    }
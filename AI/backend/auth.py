@@ -3,28 +3,61 @@
 Auth helpers using the shared SQLAlchemy `db` instance.
 
 Functions:
-- register_user(username, password) -> bool
+- register_user(username, password, remote_addr=None) -> bool
 - login_user(username, password) -> bool
+- authenticate(username, password, remote_addr=None) -> User | None
+  (one lookup; primes the identity cache; rehashes on KDF parameter change)
+- get_user(username) -> User | None
+- get_identity(username) -> {"id", "username"} | None   (cached)
+- current_user() -> {"id", "username"} | None   (the logged-in session's identity)
+- forget_identity(username), clear_identity_cache()
+- identity_query(username), cached_identity(username), remember_identity(user_id, username)
+  (the cache's parts, for callers running the query themselves, e.g. asgi_app)
+
+Identity cache: confirming that a session's user still exists costs at most
+one lookup per request (memoized on flask.g) and usually none, because
+identities are kept in a process-wide LRU with a short TTL. Deleting a User
+or changing its password (e.g. utils.change_password) through the ORM drops
+the entry when the transaction flushes and again when it commits, so a
+concurrent request cannot re-cache the old row. Raw Core deletes must call
+forget_identity() themselves.
+
+Hashing and verification run on backend.passwords' bounded pool.
+register_user / authenticate first spend rate-limit tokens (per client
+address when remote_addr is given; authenticate also per username) and let
+passwords.RateLimited and passwords.PasswordPoolBusy propagate, so the route
+can answer 429 / 503 instead of a plain failure.
 """
 
-from backend import db
+from flask import g, has_app_context, session
+from sqlalchemy import event, inspect, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from backend import db
+from .leveling import LRUStatsCache
+from . import passwords
 # backend/models.py
 from .extentions import db
 # define User, Task, Quest, etc. using that db
 from .models import User
 
-def register_user(username, password):
+def register_user(username, password, remote_addr=None):
     """
-    Register a new user and create their XP row.
+    Register a new user and create their progression row (leveling.PlayerStats)
+    in the same transaction.
     Returns True on success, False on failure (e.g., username exists or invalid input).
+    Raises passwords.RateLimited / passwords.PasswordPoolBusy (see module docstring).
     """
     username = (username or "").strip()
     if not username or not password:
         return False
+    if remote_addr:
+        passwords.check_rate(remote_addr=remote_addr)
 
     # import models lazily to avoid circular imports at module import time
-    from .models import User, UserXP
+    from .models import User
+    from .leveling import _insert_player_if_missing
+    from . import leaderboard
 
     try:
         # quick duplicate check
@@ -34,17 +67,20 @@ def register_user(username, password):
         user = User(username=username)
         user.set_password(password)
 
-        # create the XP row (if your models enforce uniqueness, this will also protect duplicates)
-        xp_row = UserXP(username=username, xp=0, level=1)
-
         db.session.add(user)
-        db.session.add(xp_row)
+        db.session.flush()
+        # the progression row commits with the account, so reads never have to create it
+        _insert_player_if_missing(username)
         db.session.commit()
+        leaderboard.note_player(username, 0, 0)
         return True
     except IntegrityError:
         # unique constraint violation (username already exists)
         db.session.rollback()
         return False
+    except passwords.PasswordPoolBusy:
+        db.session.rollback()
+        raise
     except Exception as e:
         # any other DB error — rollback and return False
         db.session.rollback()
@@ -55,27 +91,188 @@ def register_user(username, password):
 
 def login_user(username, password):
     """
-    Verify username & password. Returns True if valid, False otherwise.
+    Verify username & password. Returns True if valid, False otherwise
+    (including when rate limited or the hashing pool is busy).
     """
-    username = (username or "").strip()
-    if not username or not password:
+    try:
+        return authenticate(username, password) is not None
+    except (passwords.RateLimited, passwords.PasswordPoolBusy) as e:
+        print("login_user refused:", repr(e))
         return False
 
-    from .models import User
 
+def authenticate(username, password, remote_addr=None):
+    """
+    Return the User when username & password are valid, else None. One query:
+    the row that verified the password also primes the identity cache.
+    A hash made with other KDF parameters than configured is replaced while
+    the plaintext is at hand.
+    Raises passwords.RateLimited / passwords.PasswordPoolBusy (see module docstring).
+    """
+    username = (username or "").strip()
+    if not username or not password:
+        return None
+    passwords.check_rate(username=username, remote_addr=remote_addr)
     try:
         user = User.query.filter_by(username=username).first()
-        if not user:
-            return False
-        return user.check_password(password)
+        if not user or not user.check_password(password):
+            return None
+        if passwords.needs_rehash(user.password_hash):
+            _rehash(user, password)
+        _remember(_identity(user.id, user.username))
+        return user
+    except passwords.PasswordPoolBusy:
+        raise
     except Exception as e:
-        # on unexpected DB error, don't raise — return False and rollback if needed
+        # on unexpected DB error, don't raise — return None and rollback if needed
         try:
             db.session.rollback()
         except Exception:
             pass
-        print("login_user error:", repr(e))
-        return False
+        print("authenticate error:", repr(e))
+        return None
+
+
+def _rehash(user, password):
+    try:
+        user.set_password(password)
+        db.session.commit()
+        passwords.note_rehash()
+    except Exception as e:
+        # keep the old, still valid hash; the next login tries again
+        db.session.rollback()
+        print("password rehash error:", repr(e))
+
+
 def get_user(username: str) :
     """Return User instance or None."""
-    return User.query.filter_by(username=username).first()
\ No newline at end of file
+    return User.query.filter_by(username=username).first()
+
+
+# ------------------------
+# Identity cache
+# ------------------------
+IDENTITY_CACHE_SIZE = 4096   # max usernames held in-process
+IDENTITY_CACHE_TTL = 60.0    # seconds before an identity is re-read from the DB
+
+_identities = LRUStatsCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+
+
+def _identity(user_id, username):
+    return {"id": user_id, "username": username}
+
+
+def _request_cache():
+    """Per-request memo on flask.g (None outside an app context)."""
+    if not has_app_context():
+        return None
+    cache = g.get("_identities")
+    if cache is None:
+        cache = g._identities = {}
+    return cache
+
+
+def _remember(identity):
+    _identities.set(identity["username"], identity)
+    local = _request_cache()
+    if local is not None:
+        local[identity["username"]] = identity
+
+
+def cached_identity(username):
+    """Process-cache lookup only (no DB, no request memo)."""
+    return _identities.get(username)
+
+
+def remember_identity(user_id, username):
+    identity = _identity(user_id, username)
+    _remember(identity)
+    return identity
+
+
+def identity_query(username):
+    return select(User.id, User.username).where(User.username == username)
+
+
+def get_identity(username):
+    """
+    Return {"id", "username"} for an existing user, else None. Served from the
+    request memo, then the process cache; a miss costs one primary-key-sized query.
+    Missing users are only memoized per request, so a fresh registration is
+    visible immediately.
+    """
+    username = (username or "").strip()
+    if not username:
+        return None
+    local = _request_cache()
+    if local is not None and username in local:
+        return local[username]
+    identity = _identities.get(username)
+    if identity is None:
+        row = db.session.execute(identity_query(username)).first()
+        if row is not None:
+            identity = _identity(row.id, row.username)
+            _identities.set(username, identity)
+    if local is not None:
+        local[username] = identity
+    return identity
+
+
+def current_user():
+    """
+    Identity of the logged-in user, or None when there is no session or its
+    account is gone. A session issued to a deleted account whose username was
+    registered again is rejected by its stored user_id.
+    """
+    identity = get_identity(session.get("username"))
+    if identity is None:
+        return None
+    user_id = session.get("user_id")
+    if user_id is not None and user_id != identity["id"]:
+        return None
+    return identity
+
+
+def forget_identity(username):
+    _identities.delete(username)
+    local = _request_cache()
+    if local is not None:
+        local.pop(username, None)
+
+
+def clear_identity_cache():
+    _identities.clear()
+
+
+def _changed_identities(session_):
+    names = set()
+    for obj in session_.deleted:
+        if isinstance(obj, User):
+            names.add(obj.username)
+    for obj in session_.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if state.attrs.password_hash.history.has_changes() or state.attrs.username.history.has_changes():
+                names.add(obj.username)
+                names.update(state.attrs.username.history.deleted or ())
+    return names
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_identity_changes(session_, flush_context, instances):
+    names = _changed_identities(session_)
+    if names:
+        session_.info.setdefault("_forget_identities", set()).update(names)
+        for name in names:
+            forget_identity(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_committed_identities(session_):
+    for name in session_.info.pop("_forget_identities", ()):
+        forget_identity(name)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_identities(session_):
+    session_.info.pop("_forget_identities", None)
\ No newline at end of file
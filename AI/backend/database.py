@@ -0,0 +1,249 @@
+# backend/database.py
+"""
+Database engine configuration and dialect-neutral schema helpers.
+
+Functions:
+- database_uri_from_env() -> str | None
+- pool_settings_from_env() -> dict
+- configure_engine(app) -> str   (call BEFORE db.init_app; returns the profile name)
+- install_engine_hooks(app, engine)   (call after db.init_app, inside an app context)
+- async_engine_args(app) -> (uri, options)   (for create_async_engine, see asgi_app.py)
+- list_tables(), table_exists(name), column_names(table), add_column_if_missing(...)
+- ensure_indexes(metadata) -> list of created index names
+
+The storage backend is any SQLAlchemy URI: SAM_AI_DATABASE_URL (or DATABASE_URL)
+selects e.g. postgresql://...; otherwise create_app falls back to the bundled
+SQLite file. Client-server databases get a QueuePool sized by DB_POOL_SIZE,
+DB_MAX_OVERFLOW, DB_POOL_RECYCLE and DB_POOL_PRE_PING.
+
+SQLite profiles are picked with app.config["DB_PROFILE"] or the SAM_AI_DB_PROFILE
+environment variable:
+- "performance" (default): WAL journal, synchronous=NORMAL, larger page cache,
+  mmap, busy_timeout and a QueuePool sized for threaded servers
+- "default": SQLAlchemy / SQLite defaults (rollback journal, full fsync)
+
+Per-pragma overrides can be given as app.config["SQLITE_PRAGMAS"] = {...}.
+"""
+
+import os
+from sqlalchemy import event, inspect, text
+from sqlalchemy.pool import QueuePool
+
+DEFAULT_PROFILE = "performance"
+
+PROFILES = {
+    "default": {
+        "engine_options": {},
+        "sqlite_pragmas": {},
+    },
+    "performance": {
+        "engine_options": {
+            # one writer + many readers share a small pool; threads wait on the
+            # pool instead of opening fresh connections per request
+            "poolclass": QueuePool,
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 30,
+            "connect_args": {"check_same_thread": False, "timeout": 30},
+        },
+        "sqlite_pragmas": {
+            # readers no longer block the writer (and vice versa)
+            "journal_mode": "WAL",
+            # in WAL mode, NORMAL only fsyncs at checkpoints; still crash-safe
+            "synchronous": "NORMAL",
+            # negative = KiB: 64 MiB page cache per connection
+            "cache_size": -64000,
+            "mmap_size": 256 * 1024 * 1024,
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        },
+    },
+}
+
+
+def database_uri_from_env():
+    """Return the database URI configured in the environment, or None."""
+    uri = os.environ.get("SAM_AI_DATABASE_URL") or os.environ.get("DATABASE_URL")
+    if not uri:
+        return None
+    # Heroku-style URLs use the scheme SQLAlchemy dropped in 1.4
+    if uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://"):]
+    return uri
+
+
+def _env_bool(name, default):
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def pool_settings_from_env():
+    """Pool sizing config keys, from SAM_AI_DB_* environment variables when set."""
+    settings = {}
+    for key, env, cast in (
+        ("DB_POOL_SIZE", "SAM_AI_DB_POOL_SIZE", int),
+        ("DB_MAX_OVERFLOW", "SAM_AI_DB_MAX_OVERFLOW", int),
+        ("DB_POOL_RECYCLE", "SAM_AI_DB_POOL_RECYCLE", int),
+    ):
+        if os.environ.get(env):
+            settings[key] = cast(os.environ[env])
+    if os.environ.get("SAM_AI_DB_POOL_PRE_PING") is not None:
+        settings["DB_POOL_PRE_PING"] = _env_bool("SAM_AI_DB_POOL_PRE_PING", True)
+    return settings
+
+
+def _pool_options(app, defaults):
+    """Engine pool kwargs: profile/driver defaults overridden by DB_POOL_* config."""
+    options = dict(defaults)
+    for key, opt in (
+        ("DB_POOL_SIZE", "pool_size"),
+        ("DB_MAX_OVERFLOW", "max_overflow"),
+        ("DB_POOL_RECYCLE", "pool_recycle"),
+        ("DB_POOL_PRE_PING", "pool_pre_ping"),
+    ):
+        if app.config.get(key) is not None:
+            options[opt] = app.config[key]
+    return options
+
+
+def _profile_name(app):
+    name = app.config.get("DB_PROFILE") or os.environ.get("SAM_AI_DB_PROFILE") or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"unknown DB_PROFILE {name!r} (choose from {sorted(PROFILES)})")
+    return name
+
+
+def _is_sqlite(uri):
+    return (uri or "").startswith("sqlite")
+
+
+def configure_engine(app):
+    """
+    Merge the selected profile's engine options into SQLALCHEMY_ENGINE_OPTIONS
+    (explicit app config wins). Must run before db.init_app(app).
+    """
+    name = _profile_name(app)
+    app.config["DB_PROFILE"] = name
+    if not _is_sqlite(app.config.get("SQLALCHEMY_DATABASE_URI")):
+        # client-server RDBMS: pooled connections, validated before use
+        options = _pool_options(app, {
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        })
+        options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+        return name
+
+    profile = PROFILES[name]
+    options = dict(profile["engine_options"])
+    if options.get("poolclass") is QueuePool:
+        options = _pool_options(app, options)
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    pragmas = dict(profile["sqlite_pragmas"])
+    pragmas.update(app.config.get("SQLITE_PRAGMAS") or {})
+    app.config["SQLITE_PRAGMAS"] = pragmas
+    return name
+
+
+# sync driver -> asyncio driver for the ASGI read path
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+
+def async_engine_args(app):
+    """
+    URI and engine options for an asyncio engine on the same database as the
+    app's (already configured) sync engine. Pool sizes carry over; the pool
+    class is left to SQLAlchemy, which picks the asyncio-adapted variant.
+    """
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    scheme, sep, rest = uri.partition("://")
+    if scheme not in ASYNC_DRIVERS:
+        raise ValueError(f"no asyncio driver known for {scheme!r}")
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    options.pop("poolclass", None)
+    return ASYNC_DRIVERS[scheme] + sep + rest, options
+
+
+def install_engine_hooks(app, engine):
+    """Apply the profile's PRAGMAs on every new DBAPI connection of `engine`."""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cur = dbapi_connection.cursor()
+        try:
+            for key, value in pragmas.items():
+                cur.execute(f"PRAGMA {key}={value}")
+        finally:
+            cur.close()
+
+
+# ------------------------
+# Dialect-neutral schema helpers (used by the migration / inspection scripts)
+# ------------------------
+def _engine(engine=None):
+    if engine is not None:
+        return engine
+    from .extentions import db
+    return db.engine
+
+
+def list_tables(engine=None):
+    return sorted(inspect(_engine(engine)).get_table_names())
+
+
+def table_exists(name, engine=None):
+    return inspect(_engine(engine)).has_table(name)
+
+
+def column_names(table, engine=None):
+    return [c["name"] for c in inspect(_engine(engine)).get_columns(table)]
+
+
+def add_column_if_missing(table, name, definition, engine=None):
+    """ALTER TABLE ... ADD COLUMN unless the column exists. Returns True if added."""
+    engine = _engine(engine)
+    if name in column_names(table, engine):
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {definition}"))
+    return True
+
+
+def ensure_indexes(metadata, engine=None):
+    """
+    Create any index declared on the models that is missing from an existing
+    table (create_all only builds indexes together with new tables). An index
+    over a column the table does not have yet is left to the migration that
+    adds the column. Idempotent; returns the names of the indexes created.
+    """
+    engine = _engine(engine)
+    insp = inspect(engine)
+    existing_tables = set(insp.get_table_names())
+    created = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {ix["name"] for ix in insp.get_indexes(table.name)}
+        columns = {c["name"] for c in insp.get_columns(table.name)}
+        for index in table.indexes:
+            if index.name not in present and {c.name for c in index.columns} <= columns:
+                index.create(bind=engine, checkfirst=True)
+                created.append(index.name)
+    return created
@@ -0,0 +1,174 @@
+# backend/events.py
+"""
+In-process pub/sub used to push per-user state deltas to open dashboards.
+
+Functions:
+- publish(username, event_type, data) -> int (number of subscribers reached)
+- subscribe(username) -> Subscription
+- subscribe_async(username) -> AsyncSubscription   (call from a running event loop)
+- set_broker(broker) / get_broker()
+
+The default LocalBroker fans messages out to thread-safe queues in this process.
+Anything exposing the same publish(channel, message) / subscribe(channel, factory=...)
+pair (e.g. a Redis pub/sub adapter) can be installed with set_broker().
+
+AsyncSubscription lets the ASGI server (asgi_app.py) hold an open stream as a
+parked coroutine instead of a blocked thread; publishers on worker threads
+hand messages to its event loop with call_soon_threadsafe.
+"""
+
+import asyncio
+import json
+import queue
+import threading
+from datetime import datetime
+
+
+class Subscription:
+    """A single listener on a channel. Call close() when done."""
+
+    def __init__(self, broker, channel, maxsize=100):
+        self._broker = broker
+        self.channel = channel
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            # slow consumer: drop the oldest message rather than block publishers
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(message)
+            except queue.Full:
+                pass
+
+    def get(self, timeout=None):
+        """Return next message dict, or None if nothing arrived within timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """Subscription consumed from an asyncio event loop (await get())."""
+
+    def __init__(self, broker, channel, maxsize=100):
+        self._broker = broker
+        self.channel = channel
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, message):
+        # publishers run on arbitrary threads; asyncio.Queue is loop-bound
+        try:
+            self._loop.call_soon_threadsafe(self._put_nowait, message)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _put_nowait(self, message):
+        if self._queue.full():
+            # slow consumer: drop the oldest message rather than grow
+            self._queue.get_nowait()
+        self._queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Return next message dict, or None if nothing arrived within timeout."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """Thread-safe in-memory broker (single process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = {}
+
+    def subscribe(self, channel, factory=Subscription):
+        sub = factory(self, channel)
+        with self._lock:
+            self._subs.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subs.get(sub.channel)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    self._subs.pop(sub.channel, None)
+
+    def publish(self, channel, message):
+        with self._lock:
+            targets = list(self._subs.get(channel, ()))
+        for sub in targets:
+            sub.put(message)
+        return len(targets)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subs.get(channel, ()))
+            return sum(len(s) for s in self._subs.values())
+
+
+_broker = LocalBroker()
+
+
+def get_broker():
+    return _broker
+
+
+def set_broker(broker):
+    """Swap the broker (e.g. for a cross-process one). Returns the previous broker."""
+    global _broker
+    prev = _broker
+    _broker = broker
+    return prev
+
+
+def _channel(username):
+    return f"user:{username}"
+
+
+def publish(username, event_type, data=None):
+    """
+    Publish a delta for username. Never raises: a push failure must not
+    break the write path that triggered it.
+    """
+    username = (username or "").strip()
+    if not username or not event_type:
+        return 0
+    message = {
+        "type": event_type,
+        "data": data or {},
+        "ts": datetime.utcnow().isoformat(),
+    }
+    try:
+        return _broker.publish(_channel(username), message)
+    except Exception as e:
+        print("events.publish error:", repr(e))
+        return 0
+
+
+def subscribe(username):
+    return _broker.subscribe(_channel((username or "").strip()))
+
+
+def subscribe_async(username):
+    return _broker.subscribe(_channel((username or "").strip()), factory=AsyncSubscription)
+
+
+def format_sse(message):
+    """Encode a message dict as a server-sent-events frame."""
+    return f"event: {message.get('type', 'message')}\ndata: {json.dumps(message)}\n\n"
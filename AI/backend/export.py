@@ -0,0 +1,152 @@
+# backend/export.py
+"""
+Streaming export of a user's full history.
+
+Functions:
+- iter_records(username, batch_size=EXPORT_BATCH_SIZE) -> generator of dicts
+- iter_csv(username, batch_size=...) -> generator of str chunks
+- iter_ndjson(username, batch_size=...) -> generator of str chunks
+- gzip_chunks(chunks, level=6) -> generator of bytes
+- export_filename(username, fmt) -> str
+
+Records come out in a fixed order: the PlayerStats row first, then tasks,
+quests and study sessions (AcademicLog), each by id. Every table is read
+with yield_per, so rows are fetched from the cursor in batches and never
+materialized as a list. Memory stays flat no matter how long the history is.
+Text is buffered into ~EXPORT_CHUNK_BYTES pieces before it is yielded, so
+the response (and the gzip stream) is not made of thousands of tiny writes.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy import select
+from backend import db
+from .models import Task, Quest, AcademicLog
+from .leveling import PlayerStats
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_BYTES = 64 * 1024
+FORMATS = ("csv", "ndjson")
+
+# one flat header for every record type; fields a type lacks are left empty
+CSV_FIELDS = [
+    "type", "id", "title", "description", "xp", "done", "hours", "date",
+    "start_time", "end_time", "duration_seconds",
+    "level", "strength", "memory", "stamina",
+]
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _stream(stmt, batch_size):
+    """Execute stmt with a server-side cursor, yielding rows batch by batch."""
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def iter_records(username, batch_size=EXPORT_BATCH_SIZE):
+    """Yield one dict per exported row (see CSV_FIELDS for the keys)."""
+    username = (username or "").strip()
+    if not username:
+        return
+
+    ps = db.session.execute(
+        select(PlayerStats.xp, PlayerStats.level, PlayerStats.strength,
+               PlayerStats.memory, PlayerStats.stamina, PlayerStats.updated_at)
+        .where(PlayerStats.username == username)
+    ).first()
+    if ps is not None:
+        yield {
+            "type": "stats", "xp": ps.xp or 0, "level": ps.level or 0,
+            "strength": ps.strength, "memory": ps.memory, "stamina": ps.stamina,
+            "date": _iso(ps.updated_at),
+        }
+
+    for r in _stream(
+        select(Task.id, Task.title, Task.description, Task.xp, Task.is_done, Task.created_at)
+        .where(Task.username == username).order_by(Task.id),
+        batch_size,
+    ):
+        yield {
+            "type": "task", "id": r.id, "title": r.title, "description": r.description or "",
+            "xp": r.xp, "done": bool(r.is_done), "date": _iso(r.created_at),
+        }
+
+    for r in _stream(
+        select(Quest.id, Quest.title, Quest.description, Quest.reward_xp, Quest.completed,
+               Quest.created_at, Quest.start_time, Quest.duration_seconds)
+        .where(Quest.username == username).order_by(Quest.id),
+        batch_size,
+    ):
+        yield {
+            "type": "quest", "id": r.id, "title": r.title, "description": r.description or "",
+            "xp": r.reward_xp, "done": bool(r.completed), "date": _iso(r.created_at),
+            "start_time": _iso(r.start_time), "duration_seconds": r.duration_seconds,
+        }
+
+    for r in _stream(
+        select(AcademicLog.id, AcademicLog.subject, AcademicLog.hours, AcademicLog.date,
+               AcademicLog.start_time, AcademicLog.end_time)
+        .where(AcademicLog.username == username).order_by(AcademicLog.id),
+        batch_size,
+    ):
+        yield {
+            "type": "study", "id": r.id, "title": r.subject, "hours": r.hours,
+            "date": _iso(r.date), "start_time": _iso(r.start_time), "end_time": _iso(r.end_time),
+        }
+
+
+def iter_csv(username, batch_size=EXPORT_BATCH_SIZE):
+    """CSV text (header row first), in chunks of roughly EXPORT_CHUNK_BYTES."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for rec in iter_records(username, batch_size):
+        writer.writerow({k: ("" if v is None else v) for k, v in rec.items()})
+        if buf.tell() >= EXPORT_CHUNK_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def iter_ndjson(username, batch_size=EXPORT_BATCH_SIZE):
+    """One JSON object per line, in chunks of roughly EXPORT_CHUNK_BYTES."""
+    parts, size = [], 0
+    for rec in iter_records(username, batch_size):
+        line = json.dumps(rec, separators=(",", ":")) + "\n"
+        parts.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts)
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of str/bytes chunks incrementally (Content-Encoding: gzip)."""
+    comp = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def export_filename(username, fmt):
+    day = datetime.utcnow().strftime("%Y%m%d")
+    safe = "".join(c for c in username if c.isalnum() or c in "-_") or "user"
+    return f"sam-ai-{safe}-{day}.{'csv' if fmt == 'csv' else 'ndjson'}"
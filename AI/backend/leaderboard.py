@@ -0,0 +1,371 @@
+# backend/leaderboard.py
+"""
+XP leaderboard served from an in-process rank index.
+
+Functions:
+- configure(app)   (backend.init_app; reads LEADERBOARD_REFRESH)
+- note_player(username, xp, level)   (leveling, after an XP commit / reset)
+- ensure_loaded()   (cold start: one streaming scan of player_stats)
+- rebuild() -> number of players loaded
+- invalidate()   (force a rebuild on the next read)
+- top(limit=10, offset=0) -> list of entries
+- around(username, radius=5) -> list of entries
+- standing(username) -> {"rank", "xp", "level", "percentile", "total"} | None
+- threshold(top_percent) -> {"top_percent", "rank", "xp"} | None
+
+An entry is {"rank", "username", "xp", "level"}. Ranks are competition
+ranks: players with equal XP share a rank and the next rank skips ahead
+(1, 2, 2, 4). percentile is the share of other players with less XP
+(100 = nobody above you, 0 = nobody below).
+
+Every player is held as a (-xp, username) key in a RankIndex: sorted
+sublists of at most 2 x RankIndex.LOAD keys, found by bisecting their
+maxima, with a Fenwick tree over the sublist lengths for positions. An update
+is two O(log n) searches and a small list move; rank / page / percentile
+lookups are O(log n) (plus the page itself) and never touch the database. add_xp and
+reset_player feed it after commit (note_player).
+
+The index is per process. Writes made by other workers or scripts reach it
+when it is rebuilt: lazily on first use, then in a background thread once it
+is older than LEADERBOARD_REFRESH seconds (default 300; 0 disables). Updates
+that arrive while a rebuild scans are replayed onto the new index.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+
+DEFAULT_REFRESH = 300.0
+REBUILD_CHUNK_SIZE = 5000
+MAX_PAGE = 100
+
+
+class RankIndex:
+    """
+    Sorted list of keys split into sublists; supports positional lookups.
+    _tree is a Fenwick tree over the sublist lengths (rebuilt lazily after a
+    sublist is split or dropped, updated in place otherwise).
+    """
+
+    LOAD = 1000
+
+    def __init__(self, sorted_keys=()):
+        keys = list(sorted_keys)
+        self._lists = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [sub[-1] for sub in self._lists]
+        self._len = len(keys)
+        self._tree = None
+
+    def __len__(self):
+        return self._len
+
+    def add(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            self._tree = None
+        else:
+            i = min(bisect_left(self._maxes, key), len(self._lists) - 1)
+            sub = self._lists[i]
+            insort(sub, key)
+            self._maxes[i] = sub[-1]
+            if len(sub) > 2 * self.LOAD:
+                self._lists[i:i + 1] = [sub[:self.LOAD], sub[self.LOAD:]]
+                self._maxes[i:i + 1] = [self._lists[i][-1], self._lists[i + 1][-1]]
+                self._tree = None
+            else:
+                self._grow(i, 1)
+        self._len += 1
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            raise ValueError(key)
+        sub = self._lists[i]
+        j = bisect_left(sub, key)
+        if j == len(sub) or sub[j] != key:
+            raise ValueError(key)
+        del sub[j]
+        if sub:
+            self._maxes[i] = sub[-1]
+            self._grow(i, -1)
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+            self._tree = None
+        self._len -= 1
+
+    def _fenwick(self):
+        if self._tree is None:
+            tree = [0] + [len(sub) for sub in self._lists]
+            for i in range(1, len(tree)):
+                j = i + (i & -i)
+                if j < len(tree):
+                    tree[j] += tree[i]
+            self._tree = tree
+        return self._tree
+
+    def _grow(self, i, delta):
+        """Sublist i changed length by delta."""
+        tree = self._tree
+        if tree is None:
+            return
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _count_before(self, i):
+        """Number of keys in sublists [0, i)."""
+        tree, total = self._fenwick(), 0
+        while i:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, pos):
+        """(sublist, offset) of the key at position pos, 0 <= pos < len(self)."""
+        tree, i = self._fenwick(), 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            if i + step < len(tree) and tree[i + step] <= pos:
+                i += step
+                pos -= tree[i]
+            step >>= 1
+        return i, pos
+
+    def bisect_left(self, key):
+        """Number of keys < key."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._count_before(i) + bisect_left(self._lists[i], key)
+
+    def slice(self, start, stop):
+        """Keys at positions [start, stop)."""
+        out = []
+        start, stop = max(0, start), min(stop, self._len)
+        if start >= stop:
+            return out
+        i, j = self._locate(start)
+        while len(out) < stop - start:
+            out.extend(self._lists[i][j:j + stop - start - len(out)])
+            i, j = i + 1, 0
+        return out
+
+
+class Leaderboard:
+    def __init__(self, refresh_seconds=DEFAULT_REFRESH):
+        self.refresh_seconds = float(refresh_seconds)
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._index = RankIndex()
+        self._players = {}            # username -> (xp, level)
+        self._built_at = None         # time.monotonic() of the last rebuild, None = never
+        self._rebuilding = False
+        self._during_rebuild = None   # username -> (xp, level) noted while a rebuild scans
+
+    # ---- writes ----
+    def note(self, username, xp, level):
+        xp, level = int(xp or 0), int(level or 0)
+        with self._lock:
+            if self._during_rebuild is not None:
+                self._during_rebuild[username] = (xp, level)
+            if self._built_at is not None:
+                self._set(username, xp, level)
+
+    def _set(self, username, xp, level):
+        old = self._players.get(username)
+        if old is not None and old[0] != xp:
+            self._index.remove((-old[0], username))
+        if old is None or old[0] != xp:
+            self._index.add((-xp, username))
+        self._players[username] = (xp, level)
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def rebuild(self, if_missing=False):
+        """Reload every player with one streaming scan of player_stats, then swap the index in."""
+        from backend import db
+        from .leveling import PlayerStats
+
+        with self._build_lock:
+            if if_missing and self._built_at is not None:
+                return len(self._players)   # another thread built it while we waited
+            with self._lock:
+                self._during_rebuild = {}
+            try:
+                players, keys = {}, []
+                # Core rows in chunks: no ORM loading on the 100k-row path
+                result = db.session.connection().execute(
+                    db.select(PlayerStats.username, PlayerStats.xp, PlayerStats.level)
+                    .execution_options(yield_per=REBUILD_CHUNK_SIZE)
+                )
+                for chunk in result.partitions():
+                    for username, xp, level in chunk:
+                        xp = xp or 0
+                        players[username] = (xp, level or 0)
+                        keys.append((-xp, username))
+                keys.sort()
+                index = RankIndex(keys)
+            except BaseException:
+                with self._lock:
+                    self._during_rebuild = None
+                raise
+
+            with self._lock:
+                self._index, self._players = index, players
+                # updates committed while the SELECT ran may be missing from it
+                late, self._during_rebuild = self._during_rebuild, None
+                for username, (xp, level) in late.items():
+                    self._set(username, xp, level)
+                self._built_at = time.monotonic()
+            return len(players)
+
+    def ensure_loaded(self, app=None):
+        """Build on first use (blocking); refresh a stale index in the background."""
+        built_at = self._built_at
+        if built_at is None:
+            self.rebuild(if_missing=True)
+            return
+        if self.refresh_seconds <= 0 or time.monotonic() - built_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._rebuilding or app is None:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._refresh, args=(app,), name="leaderboard-rebuild", daemon=True).start()
+
+    def _refresh(self, app):
+        try:
+            with app.app_context():
+                self.rebuild()
+        except Exception as e:
+            print("leaderboard rebuild error:", repr(e))
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    # ---- reads (call ensure_loaded first) ----
+    def _rank_of_xp(self, xp):
+        # "" sorts before every username: keys < (-xp, "") are the players with more XP
+        return self._index.bisect_left((-xp, "")) + 1
+
+    def _entries(self, start, stop):
+        start = max(0, start)
+        keys = self._index.slice(start, stop)
+        out, rank, prev = [], None, None
+        for pos, (neg_xp, username) in enumerate(keys, start):
+            xp = -neg_xp
+            if xp != prev:
+                rank = self._rank_of_xp(xp) if rank is None else pos + 1
+                prev = xp
+            out.append({"rank": rank, "username": username, "xp": xp, "level": self._players[username][1]})
+        return out
+
+    def total(self):
+        with self._lock:
+            return len(self._index)
+
+    def top(self, limit=10, offset=0):
+        with self._lock:
+            return self._entries(offset, offset + limit)
+
+    def around(self, username, radius=5):
+        with self._lock:
+            player = self._players.get(username)
+            if player is None:
+                return []
+            pos = self._index.bisect_left((-player[0], username))
+            return self._entries(pos - radius, pos + radius + 1)
+
+    def standing(self, username):
+        with self._lock:
+            player = self._players.get(username)
+            if player is None:
+                return None
+            xp, level = player
+            total = len(self._index)
+            below = total - self._index.bisect_left((-xp + 1, ""))
+            return {
+                "rank": self._rank_of_xp(xp),
+                "xp": xp,
+                "level": level,
+                "percentile": round(100.0 * below / (total - 1), 2) if total > 1 else 100.0,
+                "total": total,
+            }
+
+    def threshold(self, top_percent):
+        """XP of the lowest-ranked player inside the top `top_percent` percent."""
+        with self._lock:
+            total = len(self._index)
+            if not total:
+                return None
+            pos = max(1, min(total, -(-int(total * top_percent) // 100))) - 1
+            neg_xp, _ = self._index.slice(pos, pos + 1)[0]
+            return {"top_percent": top_percent, "rank": self._rank_of_xp(-neg_xp), "xp": -neg_xp}
+
+
+_board = Leaderboard()
+_app = None
+
+
+def configure(app):
+    global _app
+    _app = app
+    _board.refresh_seconds = float(app.config.get("LEADERBOARD_REFRESH", DEFAULT_REFRESH))
+
+
+def _after_fork():
+    # a lock held by another thread at fork() would stay held in the child
+    _board._lock = threading.Lock()
+    _board._build_lock = threading.Lock()
+    _board._rebuilding = False
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_board():
+    return _board
+
+
+def note_player(username, xp, level):
+    _board.note(username, xp, level)
+
+
+def ensure_loaded():
+    _board.ensure_loaded(_app)
+
+
+def rebuild():
+    return _board.rebuild()
+
+
+def invalidate():
+    _board.invalidate()
+
+
+def top(limit=10, offset=0):
+    limit = max(1, min(int(limit), MAX_PAGE))
+    return _board.top(limit, max(0, int(offset)))
+
+
+def around(username, radius=5):
+    radius = max(0, min(int(radius), MAX_PAGE // 2))
+    return _board.around(username, radius)
+
+
+def standing(username):
+    return _board.standing(username)
+
+
+def threshold(top_percent):
+    top_percent = float(top_percent)
+    if not 0 < top_percent <= 100:
+        raise ValueError("invalid_percent")
+    return _board.threshold(top_percent)
@@ -2,12 +2,35 @@
 """
 Leveling / player stats helpers using the shared `db` instance from backend.
 Provides:
-- PlayerStats model (player-specific XP, level, and stats)
+- PlayerStats model: the one progression row per user (XP, level, stats),
+  created with the account (auth.register_user) or by the first XP award
 - get_player, get_xp, get_level, add_xp, reset_player
+- get_stats(username) -> cached stats dict
+- cache_stats(), clear_cache(), set_cache_backend(backend)
+- get_curve(), set_curve(curve), recompute_levels()
+- xp_ledger() -> context manager batching add_xp calls into one commit
+
+Every award is also appended to the XP event log (models.XPEvent / xp_events:
+source, amount, timestamp, reference id) in the same commit; backend.analytics
+charts XP over time from it.
+
+get_xp/get_level/get_stats read through a bounded LRU/TTL cache keyed by
+username; add_xp and reset_player write through it (and the leaderboard's
+rank index, backend.leaderboard) after commit.
 """
 
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from sqlalchemy import func, case, bindparam
 from backend import db
+from . import analytics, events, leaderboard
+from .models import XPEvent
+from .xp_curves import LinearCurve
 # backend/models.py
 from .extentions import db
 # define User, Task, Quest, etc. using that db
@@ -29,12 +52,159 @@ class PlayerStats(db.Model):
     def __repr__(self):
         return f"<PlayerStats {self.username} xp={self.xp} lvl={self.level}>"
 
+# ------------------------
+# Stats cache
+# ------------------------
+STATS_CACHE_SIZE = 2048     # max usernames held in-process
+STATS_CACHE_TTL = 30.0      # seconds before an entry is re-read from the DB
+
+
+class LRUStatsCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return dict(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (dict(value), time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisStatsCache:
+    """
+    Shared cache for multi-process deployments. `client` only needs the
+    redis-py style get(key), setex(key, ttl, value) and delete(key) calls,
+    so any Redis-compatible server (or local stand-in) works.
+    """
+
+    def __init__(self, client, ttl=STATS_CACHE_TTL, prefix="sam:stats:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self.client.setex(self.prefix + key, max(1, int(self.ttl)), json.dumps(value))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        # shared keyspace: only drop what we can enumerate
+        keys = getattr(self.client, "keys", None)
+        if keys:
+            for k in keys(self.prefix + "*"):
+                self.client.delete(k)
+
+
+_cache = LRUStatsCache()
+_cache_counters = {"hits": 0, "misses": 0}
+_counter_lock = threading.Lock()
+
+
+def set_cache_backend(backend):
+    """Install a cache backend (LRUStatsCache, RedisStatsCache, ...). Returns the previous one."""
+    global _cache
+    prev = _cache
+    _cache = backend
+    return prev
+
+
+def cache_stats():
+    """Return {"hits", "misses", "hit_ratio", "backend"} for the stats cache."""
+    with _counter_lock:
+        hits, misses = _cache_counters["hits"], _cache_counters["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": (hits / total) if total else 0.0,
+        "backend": type(_cache).__name__,
+    }
+
+
+def clear_cache(reset_counters=False):
+    _cache.clear()
+    if reset_counters:
+        with _counter_lock:
+            _cache_counters["hits"] = _cache_counters["misses"] = 0
+
+
+def _count(name):
+    with _counter_lock:
+        _cache_counters[name] += 1
+
+
+def _snapshot(player):
+    return {
+        "xp": int(player.xp or 0),
+        "level": int(player.level or 0),
+        "strength": int(player.strength or 0),
+        "memory": int(player.memory or 0),
+        "stamina": int(player.stamina or 0),
+    }
+
+
+def _cache_store(player):
+    """Write-through: called after a successful commit."""
+    try:
+        _cache.set(player.username, _snapshot(player))
+    except Exception as e:
+        # a cache outage must not fail the write; drop the entry instead
+        print("stats cache set error:", repr(e))
+        _cache_discard(player.username)
+
+
+def _cache_discard(username):
+    try:
+        _cache.delete(username)
+    except Exception as e:
+        print("stats cache delete error:", repr(e))
+
+
 # ------------------------
 # Internal Helpers
 # ------------------------
 def _ensure_player(username):
     """
-    Return the PlayerStats row for username, creating it if necessary.
+    Return the PlayerStats row for username, creating it in the current
+    transaction if necessary (write paths only; no commit).
     """
     username = (username or "").strip()
     if not username:
@@ -42,92 +212,428 @@ def _ensure_player(username):
 
     player = PlayerStats.query.filter_by(username=username).first()
     if not player:
-        player = PlayerStats(username=username, xp=0, level=0, strength=1, memory=1, stamina=1)
-        try:
-            db.session.add(player)
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-            # Re-query to avoid race conditions where another thread created it
-            player = PlayerStats.query.filter_by(username=username).first()
+        _insert_player_if_missing(username)
+        player = PlayerStats.query.filter_by(username=username).first()
     return player
 
+# starting values of a player without a row yet (reads never create one)
+_NEW_PLAYER = {"xp": 0, "level": 0, "strength": 1, "memory": 1, "stamina": 1}
+
 # ------------------------
 # Public Functions
 # ------------------------
 def get_player(username):
-    """Return PlayerStats or None if username invalid."""
-    return _ensure_player(username)
+    """Return the PlayerStats row, or None if username is invalid or has none. Never writes."""
+    username = (username or "").strip()
+    if not username:
+        return None
+    return PlayerStats.query.filter_by(username=username).first()
+
+def get_stats(username):
+    """
+    Return {"xp", "level", "strength", "memory", "stamina"} for username
+    (served from the stats cache when possible), or None if username invalid.
+    """
+    username = (username or "").strip()
+    if not username:
+        return None
+    try:
+        snap = _cache.get(username)
+    except Exception as e:
+        print("stats cache get error:", repr(e))
+        snap = None
+    if snap is not None:
+        _count("hits")
+        return snap
+    _count("misses")
+    player = get_player(username)
+    snap = _snapshot(player) if player is not None else dict(_NEW_PLAYER)
+    try:
+        _cache.set(username, snap)
+    except Exception as e:
+        print("stats cache set error:", repr(e))
+    return snap
 
 def get_xp(username):
-    p = _ensure_player(username)
-    return p.xp if p else 0
+    s = get_stats(username)
+    return s["xp"] if s else 0
 
 def get_level(username):
-    p = _ensure_player(username)
-    return p.level if p else 0
+    s = get_stats(username)
+    return s["level"] if s else 0
+
+# ------------------------
+# XP curve
+# ------------------------
+# Default: (level + 1) * 100 total XP to reach the next level.
+# Example: level 0 -> need 100 for level 1, level 1 -> need 200 for level 2, etc.
+# Swap with set_curve() (see backend.xp_curves) to tweak progression speed.
+_curve = LinearCurve(per_level=100)
+
+def get_curve():
+    return _curve
+
+def set_curve(curve):
+    """Install a new XP curve. Call recompute_levels() afterwards to re-level existing players."""
+    global _curve
+    prev = _curve
+    _curve = curve
+    return prev
 
 def _xp_needed_for_next_level(level):
+    return _curve.xp_needed_for_next_level(level)
+
+def recompute_levels(batch_size=1000):
+    """
+    Re-derive every player's level from their total XP under the current curve
+    (e.g. after set_curve). Levels are computed vectorized per batch and only
+    changed rows are written. Stats are left as-is. Returns number of rows updated.
+    """
+    from .state import bump_version  # state imports this module
+
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            rows = db.session.execute(
+                db.select(PlayerStats.id, PlayerStats.username, PlayerStats.xp, PlayerStats.level)
+                .where(PlayerStats.id > last_id)
+                .order_by(PlayerStats.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            levels = _curve.levels_for([r.xp or 0 for r in rows])
+            changed = [(r, int(lvl)) for r, lvl in zip(rows, levels) if int(lvl) != int(r.level or 0)]
+            if changed:
+                db.session.execute(db.update(PlayerStats), [{"id": r.id, "level": lvl} for r, lvl in changed])
+                for r, _ in changed:
+                    bump_version(r.username)
+                updated += len(changed)
+            db.session.commit()
+        clear_cache()
+        leaderboard.invalidate()
+        return updated
+    except Exception as e:
+        db.session.rollback()
+        print("recompute_levels error:", repr(e))
+        return updated
+
+_RETURN_COLUMNS = (
+    PlayerStats.username, PlayerStats.xp, PlayerStats.level,
+    PlayerStats.strength, PlayerStats.memory, PlayerStats.stamina,
+)
+
+def _update_returning(stmt, username):
+    """
+    Execute an UPDATE on player_stats and return the updated row (or None if no row
+    matched). Uses UPDATE ... RETURNING where the dialect supports it; otherwise
+    re-selects inside the same transaction, which still holds the row/write lock.
+    """
+    opts = {"synchronize_session": False}
+    if db.engine.dialect.update_returning:
+        return db.session.execute(stmt.returning(*_RETURN_COLUMNS), execution_options=opts).first()
+    res = db.session.execute(stmt, execution_options=opts)
+    if not res.rowcount:
+        return None
+    return db.session.execute(
+        db.select(*_RETURN_COLUMNS).where(PlayerStats.username == username)
+    ).first()
+
+def _apply_xp(username, xp_to_add):
+    """
+    Atomically add XP and level up inside the current transaction (no commit).
+    Returns (row, levels_gained), or (None, 0) if the player row does not exist.
+
+    Both statements are computed from the row's current values by the database,
+    never from a Python-side read, so concurrent awards cannot overwrite each
+    other. The level update is a monotonic max: a concurrent award that already
+    pushed the level higher simply makes it a no-op, so no retry loop is needed.
+    """
+    now = datetime.utcnow()
+    row = _update_returning(
+        db.update(PlayerStats)
+        .where(PlayerStats.username == username)
+        .values(xp=func.coalesce(PlayerStats.xp, 0) + xp_to_add, updated_at=now),
+        username,
+    )
+    if row is None:
+        return None, 0
+
+    level_before = int(row.level or 0)
+    target = _curve.level_for(row.xp)
+    if target <= level_before:
+        return row, 0
+
+    current = func.coalesce(PlayerStats.level, 0)
+    gained = case((current < target, target - current), else_=0)
+    row = _update_returning(
+        db.update(PlayerStats)
+        .where(PlayerStats.username == username)
+        .values(
+            level=case((current < target, target), else_=current),
+            strength=func.coalesce(PlayerStats.strength, 0) + gained,
+            memory=func.coalesce(PlayerStats.memory, 0) + gained,
+            stamina=func.coalesce(PlayerStats.stamina, 0) + gained,
+        ),
+        username,
+    )
+    return row, max(0, int(row.level or 0) - level_before)
+
+def _apply_xp_many(awards, chunk_size=500):
+    """
+    Set-based _apply_xp for many users at once (no commit). awards maps
+    username -> amount for players whose rows already exist. XP and level are
+    written with executemany UPDATEs and read back with one SELECT per chunk;
+    the first UPDATE takes the row locks (the write lock on SQLite), so the
+    Python-side level computation cannot race. Returns {username: (row, levels_gained)}.
+    """
+    t = PlayerStats.__table__
+    now = datetime.utcnow()
+    out = {}
+    items = [(u, a) for u, a in awards.items() if a]
+    for i in range(0, len(items), chunk_size):
+        part = items[i:i + chunk_size]
+        db.session.execute(
+            t.update().where(t.c.username == bindparam("u"))
+            .values(xp=func.coalesce(t.c.xp, 0) + bindparam("amount"), updated_at=now),
+            [{"u": u, "amount": a} for u, a in part],
+        )
+        names = [u for u, _ in part]
+        rows = db.session.execute(
+            db.select(*_RETURN_COLUMNS).where(PlayerStats.username.in_(names))
+        ).all()
+        targets = _curve.levels_for([r.xp or 0 for r in rows])
+        ups = []
+        for r, target in zip(rows, targets):
+            gained = max(0, int(target) - int(r.level or 0))
+            out[r.username] = (r, gained)
+            if gained:
+                ups.append({"u": r.username, "lvl": int(target), "g": gained})
+        if ups:
+            db.session.execute(
+                t.update().where(t.c.username == bindparam("u")).values(
+                    level=bindparam("lvl"),
+                    strength=func.coalesce(t.c.strength, 0) + bindparam("g"),
+                    memory=func.coalesce(t.c.memory, 0) + bindparam("g"),
+                    stamina=func.coalesce(t.c.stamina, 0) + bindparam("g"),
+                ),
+                ups,
+            )
+            leveled = [u["u"] for u in ups]
+            for r in db.session.execute(
+                db.select(*_RETURN_COLUMNS).where(PlayerStats.username.in_(leveled))
+            ).all():
+                out[r.username] = (r, out[r.username][1])
+    return out
+
+def _insert_players_if_missing(usernames):
+    """Create PlayerStats rows for every username that lacks one (no commit)."""
+    usernames = set(usernames)
+    existing = set()
+    names = sorted(usernames)
+    for i in range(0, len(names), 500):
+        existing.update(db.session.execute(
+            db.select(PlayerStats.username).where(PlayerStats.username.in_(names[i:i + 500]))
+        ).scalars())
+    missing = usernames - existing
+    if len(missing) == 1:
+        _insert_player_if_missing(missing.pop())
+    elif missing:
+        now = datetime.utcnow()
+        db.session.execute(PlayerStats.__table__.insert(), [
+            dict(username=u, xp=0, level=0, strength=1, memory=1, stamina=1, updated_at=now)
+            for u in sorted(missing)
+        ])
+
+def _insert_player_if_missing(username):
+    """Create the PlayerStats row inside the current transaction (no commit), race-free."""
+    values = dict(username=username, xp=0, level=0, strength=1, memory=1, stamina=1,
+                  updated_at=datetime.utcnow())
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(PlayerStats).values(**values).on_conflict_do_nothing(index_elements=["username"])
+    else:
+        exists = db.session.execute(
+            db.select(PlayerStats.id).where(PlayerStats.username == username)
+        ).first()
+        if exists:
+            return
+        stmt = db.insert(PlayerStats).values(**values)
+    db.session.execute(stmt)
+
+# ------------------------
+# XP ledger (unit of work)
+# ------------------------
+# XPEvent.source values (what earned the XP)
+XP_SOURCES = ("task_created", "task_completed", "quest", "study", "import", "reset", "legacy", "other")
+
+def _log_xp_events(xp_events):
+    """Append award dicts to xp_events and the daily XP aggregates (no commit)."""
+    if xp_events:
+        db.session.execute(XPEvent.__table__.insert(), xp_events)
+        analytics.record_xp_events(db.session, xp_events)
+
+
+_active_ledger = ContextVar("sam_ai_xp_ledger", default=None)
+
+
+class XPLedger:
+    """
+    Accumulates XP awards (summed per user), their XP events and post-commit
+    callbacks for one unit of work. Use via xp_ledger(); results are filled in
+    after commit.
+    """
+
+    def __init__(self):
+        self.awards = OrderedDict()
+        self.events = []
+        self.results = {}
+        self._after_commit = []
+
+    def add(self, username, amount, source="other", ref_id=None):
+        self.awards[username] = self.awards.get(username, 0) + amount
+        if amount:
+            self.events.append({
+                "username": username, "source": source, "amount": amount,
+                "ref_id": ref_id, "created_at": datetime.utcnow(),
+            })
+        return {"ok": True, "deferred": True, "xp_added": amount}
+
+    def after_commit(self, fn):
+        """Run fn() once the unit of work has committed (e.g. to publish events)."""
+        self._after_commit.append(fn)
+
+    def commit(self):
+        """Apply all awards and the caller's pending changes in a single transaction."""
+        from .state import bump_version, bump_versions  # state imports this module
+        from . import xp_manager  # imports this module
+
+        applied = []
+        try:
+            # daily cap: trims events / awards to each user's remaining allowance
+            xp_events, awards = xp_manager.apply_cap(self.events, {u: a for u, a in self.awards.items() if a})
+            awards = {u: a for u, a in awards.items() if a}
+            if len(awards) > 1:
+                # many users (batch imports): set-based statements instead of ~5 per user
+                _insert_players_if_missing(awards)
+                done = _apply_xp_many(awards)
+                if len(done) != len(awards):
+                    raise RuntimeError("could not create player record")
+                bump_versions(awards)
+                applied = [(u, a) + done[u] for u, a in awards.items()]
+            else:
+                for username, amount in awards.items():
+                    row, gained = _apply_xp(username, amount)
+                    if row is None:
+                        _insert_player_if_missing(username)
+                        row, gained = _apply_xp(username, amount)
+                        if row is None:
+                            raise RuntimeError("could not create player record")
+                    # raw UPDATEs bypass the ORM flush hook, so bump the state version here
+                    bump_version(username)
+                    applied.append((username, amount, row, gained))
+            _log_xp_events(xp_events)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for username in self.awards:
+                _cache_discard(username)
+            xp_manager.forget(self.awards)
+            raise
+
+        for username, amount, row, gained in applied:
+            _cache_store(row)
+            leaderboard.note_player(username, row.xp, row.level)
+            self.results[username] = {
+                "ok": True, "xp": row.xp, "level": row.level, "levels_gained": gained, "xp_added": amount,
+            }
+            events.publish(username, "stats", {
+                "xp": row.xp, "level": row.level, "delta": amount, "levels_gained": gained
+            })
+        for username in self.awards:
+            if username not in self.results:
+                # nothing applied (capped, or the awards summed to zero)
+                s = get_stats(username) or {"xp": 0, "level": 0}
+                self.results[username] = {
+                    "ok": True, "xp": s["xp"], "level": s["level"], "levels_gained": 0, "xp_added": 0,
+                }
+        for fn in self._after_commit:
+            try:
+                fn()
+            except Exception as e:
+                print("xp_ledger after_commit error:", repr(e))
+
+
+@contextmanager
+def xp_ledger():
     """
-    XP curve: (level + 1) * 100 XP required to reach next level.
-    Example: level 0 -> need 100 for level 1, level 1 -> need 200 for level 2, etc.
-    Adjust this function to tweak progression speed.
+    Unit of work for a request: add_xp calls inside the block are deferred and
+    flushed, together with whatever else was added to db.session, in ONE commit
+    when the block exits. Nested blocks join the outermost ledger. If the block
+    raises, the session is rolled back and no XP is awarded.
     """
-    return (level + 1) * 100
+    outer = _active_ledger.get()
+    if outer is not None:
+        yield outer
+        return
 
-def add_xp(username, xp_to_add):
+    ledger = XPLedger()
+    token = _active_ledger.set(ledger)
+    try:
+        yield ledger
+    except BaseException:
+        _active_ledger.reset(token)
+        db.session.rollback()
+        raise
+    _active_ledger.reset(token)
+    ledger.commit()
+
+def add_xp(username, xp_to_add, source="other", ref_id=None):
     """
-    Add XP to user, handle level-ups and stat increases.
-    Returns a dict: {"ok": True, "xp": new_xp, "level": new_level, "levels_gained": n}
+    Add XP to user, handle level-ups and stat increases, and log the award as
+    an XP event (source from XP_SOURCES, ref_id = task / quest / log id).
+    Awards are clamped to the daily cap (backend.xp_manager).
+    Returns a dict: {"ok": True, "xp": new_xp, "level": new_level, "levels_gained": n,
+    "xp_added": XP actually awarded}
+    Inside an xp_ledger() block the award is deferred and this returns
+    {"ok": True, "deferred": True, "xp_added": n} (before the cap; see ledger.results).
     """
+    username = (username or "").strip()
     if not username or xp_to_add is None:
         return {"ok": False, "error": "invalid input"}
 
+    # Ensure xp_to_add is int
     try:
-        player = _ensure_player(username)
-        if player is None:
-            return {"ok": False, "error": "could not create player record"}
+        xp_to_add = int(xp_to_add)
+    except Exception:
+        xp_to_add = 0
 
-        # Ensure xp_to_add is int
-        try:
-            xp_to_add = int(xp_to_add)
-        except Exception:
-            xp_to_add = 0
+    ledger = _active_ledger.get()
+    if ledger is not None:
+        return ledger.add(username, xp_to_add, source, ref_id)
 
+    try:
         if xp_to_add == 0:
-            return {"ok": True, "xp": player.xp, "level": player.level, "levels_gained": 0}
-
-        player.xp = int(player.xp) + xp_to_add
-
-        levels_gained = 0
-        # Level up loop (handles multiple level-ups in one add)
-        while player.xp >= _xp_needed_for_next_level(player.level):
-            # consume the XP required for next level
-            required = _xp_needed_for_next_level(player.level)
-            # It's simpler to increment level and not subtract XP (we keep total XP tracking),
-            # but if you want to subtract required XP, change logic here.
-            player.level += 1
-            levels_gained += 1
-            _increase_stats(player)
-
-        player.updated_at = datetime.utcnow()
-        db.session.commit()
-        return {"ok": True, "xp": player.xp, "level": player.level, "levels_gained": levels_gained}
+            s = get_stats(username)
+            if s is None:
+                return {"ok": False, "error": "could not create player record"}
+            return {"ok": True, "xp": s["xp"], "level": s["level"], "levels_gained": 0, "xp_added": 0}
+
+        with xp_ledger() as ledger:
+            ledger.add(username, xp_to_add, source, ref_id)
+        return ledger.results[username]
     except Exception as e:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
         return {"ok": False, "error": str(e)}
 
-def _increase_stats(player):
-    """
-    Increase player stats when leveling up. Customize distribution here.
-    """
-    player.strength = (player.strength or 0) + 1
-    player.memory = (player.memory or 0) + 1
-    player.stamina = (player.stamina or 0) + 1
-
 def reset_player(username):
     """
     Reset a player's stats and XP to starting values.
@@ -135,6 +641,10 @@ def reset_player(username):
     player = _ensure_player(username)
     if not player:
         return False
+    if player.xp:
+        # keeps the event log summing to the player's XP
+        _log_xp_events([{"username": player.username, "source": "reset", "amount": -int(player.xp),
+                         "ref_id": None, "created_at": datetime.utcnow()}])
     player.xp = 0
     player.level = 0
     player.strength = 1
@@ -143,6 +653,9 @@ def reset_player(username):
     player.updated_at = datetime.utcnow()
     try:
         db.session.commit()
+        _cache_store(player)
+        leaderboard.note_player(player.username, 0, 0)
+        events.publish(player.username, "stats", {"xp": 0, "level": 0, "delta": 0, "levels_gained": 0})
         return True
     except Exception:
         db.session.rollback()
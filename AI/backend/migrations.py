@@ -0,0 +1,526 @@
+# backend/migrations.py
+"""
+Versioned schema migrations.
+
+Functions:
+- current_version(engine) -> int | None   (one SELECT; None = unversioned database)
+- upgrade(engine, target=None, log=print) -> list of applied versions
+- ensure_current(engine, auto_upgrade=True)   (app start: fast version check)
+- batch_alter(conn, name, make_columns, copy=None, indexes=())
+
+The schema version lives in a one-row `schema_version` table. MIGRATIONS is
+an ordered list of (version, description, fn); fn(conn) receives a
+connection inside a transaction that also records the new version, so each
+migration applies completely or not at all (SQLite included: the migration
+engine issues an explicit BEGIN, so DDL is transactional there too).
+
+- A new, empty database is built with create_all() and stamped at HEAD.
+- An unversioned database that already has tables (made by the old
+  create_db.py / migrate_*.py scripts) is taken through every migration.
+  Migrations therefore inspect what is there before changing it.
+- Tables created by create_all() from the *current* models may already
+  match later migrations, so migrations must be safe on such a schema
+  (create tables with checkfirst, add columns only if missing).
+
+SQLite cannot drop or retype columns with ALTER TABLE; batch_alter rebuilds
+the table instead (create new, copy, drop, rename, recreate indexes).
+"""
+
+import secrets
+from datetime import timedelta
+from sqlalchemy import (
+    MetaData, Table, Column, ForeignKey, Integer, String, Text, Boolean, DateTime, Index,
+    bindparam, create_engine, event, func, inspect, literal, select, text,
+)
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import AddConstraint
+from werkzeug.security import generate_password_hash
+
+_version_md = MetaData()
+schema_version = Table(
+    "schema_version", _version_md,
+    Column("version", Integer, nullable=False),
+)
+
+
+# ------------------------
+# Helpers for migration bodies
+# ------------------------
+def _columns(conn, table):
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _has_table(conn, table):
+    return inspect(conn).has_table(table)
+
+
+def batch_alter(conn, name, make_columns, copy=None, indexes=(), where=None):
+    """
+    Bring table `name` to exactly the columns returned by make_columns()
+    (a factory, so fresh Column objects can be built more than once).
+    copy maps a new column name to a SQL expression over the old table; by
+    default a column is copied from the same-named old column, or left to
+    its default when the old table lacks it. indexes are (name, [columns],
+    unique) tuples created on the final table; foreign keys declared on the
+    columns are created too. Rows of the old table that do not match the SQL
+    condition `where` (in terms of the NEW columns' copy expressions) are
+    dropped.
+    """
+    old_cols = _columns(conn, name)
+    copy = copy or {}
+    index_defs = list(indexes)
+
+    def select_list(cols):
+        exprs = []
+        for c in cols:
+            if c.name in copy:
+                exprs.append((c.name, copy[c.name]))
+            elif c.name in old_cols:
+                exprs.append((c.name, c.name))
+        return exprs
+
+    if conn.dialect.name == "sqlite":
+        for ix in inspect(conn).get_indexes(name):
+            conn.execute(text(f'DROP INDEX IF EXISTS "{ix["name"]}"'))
+        tmp_name = f"_{name}_new"
+        tmp = Table(tmp_name, MetaData(), *make_columns())
+        tmp.create(conn)
+        exprs = select_list(tmp.columns)
+        if exprs:
+            conn.execute(text(
+                f'INSERT INTO "{tmp_name}" ({", ".join(c for c, _ in exprs)}) '
+                f'SELECT * FROM (SELECT {", ".join(f"{e} AS {c}" for c, e in exprs)} FROM "{name}") '
+                f'WHERE {where or "1 = 1"}'
+            ))
+        conn.execute(text(f'DROP TABLE "{name}"'))
+        conn.execute(text(f'ALTER TABLE "{tmp_name}" RENAME TO "{name}"'))
+    else:
+        final = Table(name, MetaData(), *make_columns())
+        for c in final.columns:
+            if c.name not in old_cols:
+                conn.execute(text(
+                    f"ALTER TABLE {name} ADD COLUMN {c.name} {c.type.compile(conn.dialect)}"
+                ))
+        for col, expr in select_list(final.columns):
+            if col != expr:
+                conn.execute(text(f"UPDATE {name} SET {col} = {expr}"))
+        if where:
+            conn.execute(text(f"DELETE FROM {name} WHERE NOT ({where})"))
+        for col in old_cols - {c.name for c in final.columns}:
+            conn.execute(text(f"ALTER TABLE {name} DROP COLUMN {col}"))
+        present = {tuple(fk["constrained_columns"]) for fk in inspect(conn).get_foreign_keys(name)}
+        for fk in final.foreign_key_constraints:
+            if tuple(fk.column_keys) not in present:
+                conn.execute(AddConstraint(fk))
+
+    final = Table(name, MetaData(), *make_columns())
+    present = {ix["name"] for ix in inspect(conn).get_indexes(name)}
+    for ix_name, cols, unique in index_defs:
+        if ix_name not in present:
+            Index(ix_name, *[final.c[c] for c in cols], unique=unique).create(conn)
+
+
+def _users_username():
+    """users.username, for ForeignKeys of tables rebuilt by batch_alter."""
+    return Table("users", MetaData(), Column("username", String(100))).c.username
+
+
+def _merge_progress(conn, source):
+    """
+    Merge XP from a legacy table with username / xp columns into player_stats:
+    the higher XP wins, the level is re-derived from it under the current
+    curve, stats gain 1 per level gained, and the difference is logged as a
+    "legacy" XP event (once xp_events exists; before that, migration 8 seeds
+    the log from player_stats). Bumps the changed users' state versions.
+    Returns the number of players changed.
+    """
+    from .leveling import PlayerStats, get_curve
+    from .models import StateVersion, XPEvent
+    from .analytics import rebuild_xp_daily
+    players = PlayerStats.__table__
+    now = func.current_timestamp()
+
+    players.create(conn, checkfirst=True)
+    rows = conn.execute(
+        select(source.c.username, source.c.xp, players.c.id, players.c.xp.label("old_xp"), players.c.level)
+        .select_from(source.outerjoin(players, players.c.username == source.c.username))
+        .where(source.c.username.is_not(None), source.c.xp > func.coalesce(players.c.xp, 0))
+    ).all()
+    if not rows:
+        return 0
+    levels = [int(lvl) for lvl in get_curve().levels_for([int(r.xp) for r in rows])]
+    new = [(r, lvl) for r, lvl in zip(rows, levels) if r.id is None]
+    old = [(r, lvl) for r, lvl in zip(rows, levels) if r.id is not None]
+    if new:
+        conn.execute(players.insert().values(updated_at=now), [
+            {"username": r.username, "xp": int(r.xp), "level": lvl,
+             "strength": 1 + lvl, "memory": 1 + lvl, "stamina": 1 + lvl}
+            for r, lvl in new
+        ])
+    if old:
+        gained = bindparam("g")
+        conn.execute(
+            players.update().where(players.c.id == bindparam("pid")).values(
+                xp=bindparam("new_xp"), level=bindparam("lvl"), updated_at=now,
+                strength=func.coalesce(players.c.strength, 0) + gained,
+                memory=func.coalesce(players.c.memory, 0) + gained,
+                stamina=func.coalesce(players.c.stamina, 0) + gained,
+            ),
+            [{"pid": r.id, "new_xp": int(r.xp), "lvl": lvl, "g": max(0, lvl - int(r.level or 0))}
+             for r, lvl in old],
+        )
+    if _has_table(conn, "xp_events"):
+        conn.execute(XPEvent.__table__.insert().values(source="legacy", created_at=now), [
+            {"username": r.username, "amount": int(r.xp) - int(r.old_xp or 0)} for r in rows
+        ])
+        rebuild_xp_daily(conn=conn)
+    if _has_table(conn, "state_versions"):
+        versions = StateVersion.__table__
+        names = sorted({r.username for r in rows})
+        known = set(conn.execute(select(versions.c.username)).scalars())
+        bumped = [n for n in names if n in known]
+        if bumped:
+            conn.execute(
+                versions.update().where(versions.c.username == bindparam("u"))
+                .values(version=versions.c.version + 1),
+                [{"u": n} for n in bumped],
+            )
+        if len(bumped) < len(names):
+            conn.execute(versions.insert(), [{"username": n, "version": 1} for n in names if n not in known])
+    return len(rows)
+
+
+# ------------------------
+# Migrations
+# ------------------------
+def _m1_users(conn):
+    """
+    users: password_hash (hashed from a legacy plaintext `password`), created_at;
+    legacy xp moves to player_stats (_merge_progress); drop legacy columns.
+    """
+    if not _has_table(conn, "users"):
+        return
+    cols = _columns(conn, "users")
+    if "xp" in cols:
+        _merge_progress(conn, Table("users", MetaData(), autoload_with=conn))
+    if "password_hash" not in cols:
+        conn.execute(text("ALTER TABLE users ADD COLUMN password_hash VARCHAR(200)"))
+    if "password" in cols:
+        rows = conn.execute(text(
+            "SELECT id, password FROM users WHERE (password_hash IS NULL OR password_hash = '') "
+            "AND password IS NOT NULL AND password != ''"
+        )).all()
+        for uid, pw in rows:
+            conn.execute(text("UPDATE users SET password_hash = :h WHERE id = :id"),
+                         {"h": generate_password_hash(pw), "id": uid})
+    # no usable password: an unguessable hash, so the account needs a reset
+    conn.execute(text(
+        "UPDATE users SET password_hash = :h WHERE password_hash IS NULL OR password_hash = ''"
+    ), {"h": generate_password_hash(secrets.token_urlsafe(24))})
+
+    batch_alter(
+        conn, "users",
+        lambda: [
+            Column("id", Integer, primary_key=True),
+            Column("username", String(100), nullable=False),
+            Column("password_hash", String(200), nullable=False),
+            Column("created_at", DateTime, nullable=False),
+        ],
+        copy={
+            "created_at": "COALESCE(created_at, CURRENT_TIMESTAMP)" if "created_at" in cols else "CURRENT_TIMESTAMP",
+        },
+        indexes=[("ix_users_username", ["username"], True)],
+    )
+
+
+def _m2_tasks(conn):
+    """tasks: username (from legacy user_id), is_done (from legacy completed), xp, created_at."""
+    if not _has_table(conn, "tasks"):
+        return
+    cols = _columns(conn, "tasks")
+    if "username" in cols and "user_id" in cols:
+        username = "COALESCE(NULLIF(username, ''), (SELECT u.username FROM users u WHERE u.id = tasks.user_id))"
+    elif "user_id" in cols:
+        username = "(SELECT u.username FROM users u WHERE u.id = tasks.user_id)"
+    else:
+        username = "username"
+    # old scripts added is_done DEFAULT 0 next to a legacy `completed`: either one set means done
+    done_parts = [f"COALESCE({c}, 0) != 0" for c in ("is_done", "completed") if c in cols]
+    is_done = f"CASE WHEN {' OR '.join(done_parts)} THEN 1 ELSE 0 END" if done_parts else "0"
+
+    batch_alter(
+        conn, "tasks",
+        lambda: [
+            Column("id", Integer, primary_key=True),
+            Column("username", String(100), ForeignKey(_users_username(), ondelete="CASCADE"), nullable=False),
+            Column("title", String(200), nullable=False),
+            Column("description", Text),
+            Column("is_done", Boolean, nullable=False),
+            Column("xp", Integer, nullable=False),
+            Column("created_at", DateTime, nullable=False),
+        ],
+        copy={
+            "username": username,
+            "is_done": is_done,
+            # old scripts added xp with DEFAULT 0; the model's default is 10
+            "xp": "COALESCE(NULLIF(xp, 0), 10)" if "xp" in cols else "10",
+            "created_at": "COALESCE(created_at, CURRENT_TIMESTAMP)" if "created_at" in cols else "CURRENT_TIMESTAMP",
+        },
+        indexes=[("ix_tasks_username", ["username"], False)],
+        # tasks whose owner cannot be resolved would violate NOT NULL
+        where="username IS NOT NULL",
+    )
+
+
+def _m3_create_tables(conn):
+    """Create every model table that does not exist yet."""
+    from .extentions import db
+    from . import models, leveling  # noqa: F401  (register all tables on db.metadata)
+    db.metadata.create_all(conn, checkfirst=True)
+
+
+def _m4_quest_timers(conn):
+    """quests: optional timer columns start_time, duration_seconds."""
+    cols = _columns(conn, "quests")
+    if "start_time" not in cols:
+        conn.execute(text("ALTER TABLE quests ADD COLUMN start_time TIMESTAMP"))
+    if "duration_seconds" not in cols:
+        conn.execute(text("ALTER TABLE quests ADD COLUMN duration_seconds INTEGER"))
+
+
+def _m5_indexes(conn):
+    """Composite / partial indexes declared on the models."""
+    from .extentions import db
+    from .database import ensure_indexes
+    ensure_indexes(db.metadata, engine=conn)
+
+
+def _m6_quest_deadlines(conn):
+    """quests: precomputed timer deadline (start_time + duration_seconds) and its index."""
+    if "deadline" not in _columns(conn, "quests"):
+        conn.execute(text("ALTER TABLE quests ADD COLUMN deadline TIMESTAMP"))
+    quests = Table("quests", MetaData(), autoload_with=conn)
+    rows = conn.execute(
+        select(quests.c.id, quests.c.start_time, quests.c.duration_seconds).where(
+            quests.c.deadline.is_(None),
+            quests.c.start_time.is_not(None),
+            quests.c.duration_seconds.is_not(None),
+        )
+    ).all()
+    if rows:
+        conn.execute(
+            quests.update().where(quests.c.id == bindparam("qid")).values(deadline=bindparam("dl")),
+            [{"qid": r.id, "dl": r.start_time + timedelta(seconds=int(r.duration_seconds))} for r in rows],
+        )
+    _m5_indexes(conn)
+
+
+def _m7_study_rollups(conn):
+    """study_rollups: per-subject day / week / all-time study hours, built from academic_logs."""
+    from .models import StudyRollup
+    from .academic_tracker import rebuild_study_rollups
+    StudyRollup.__table__.create(conn, checkfirst=True)
+    rebuild_study_rollups(conn=conn)
+
+
+def _m8_xp_events(conn):
+    """xp_events / xp_daily: XP award log, seeded with each player's XP so far as one "legacy" event."""
+    from .models import XPEvent, XPDaily
+    from .analytics import rebuild_xp_daily
+    events = XPEvent.__table__
+    events.create(conn, checkfirst=True)
+    XPDaily.__table__.create(conn, checkfirst=True)
+    if conn.execute(select(events.c.id).limit(1)).first() is None and _has_table(conn, "player_stats"):
+        players = Table("player_stats", MetaData(), autoload_with=conn)
+        conn.execute(events.insert().from_select(
+            ["username", "source", "amount", "created_at"],
+            select(
+                players.c.username, literal("legacy"), players.c.xp,
+                func.coalesce(players.c.updated_at, func.current_timestamp()),
+            ).where(players.c.xp > 0),
+        ))
+    rebuild_xp_daily(conn=conn)
+
+
+def _m9_daily_xp(conn):
+    """daily_xp: per-user daily XP counter for the daily cap."""
+    from .models import DailyXP
+    DailyXP.__table__.create(conn, checkfirst=True)
+
+
+def _m10_merge_user_xp(conn):
+    """
+    player_stats becomes the only progression table: user_xp rows are merged
+    into it (_merge_progress), every user without a row gets one, and user_xp
+    is dropped.
+    """
+    from .leveling import PlayerStats
+    players = PlayerStats.__table__
+    if _has_table(conn, "user_xp"):
+        user_xp = Table("user_xp", MetaData(), autoload_with=conn)
+        _merge_progress(conn, user_xp)
+        user_xp.drop(conn)
+
+    # accounts registered before registration created the row
+    users = Table("users", MetaData(), autoload_with=conn)
+    conn.execute(players.insert().from_select(
+        ["username", "xp", "level", "strength", "memory", "stamina", "updated_at"],
+        select(users.c.username, literal(0), literal(0), literal(1), literal(1), literal(1), func.current_timestamp())
+        .where(~select(players.c.id).where(players.c.username == users.c.username).exists()),
+    ))
+
+
+def _m11_quests(conn):
+    """
+    quests: username (from legacy user_id), title (from legacy description),
+    reward_xp (from xp_reward), created_at; then the indexes migration 5
+    skipped while those columns were missing.
+    """
+    if not _has_table(conn, "quests"):
+        return
+    cols = _columns(conn, "quests")
+    if {"username", "title", "reward_xp", "created_at"} <= cols and not cols & {"user_id", "xp_reward"}:
+        return
+    if "username" in cols and "user_id" in cols:
+        username = "COALESCE(NULLIF(username, ''), (SELECT u.username FROM users u WHERE u.id = quests.user_id))"
+    elif "user_id" in cols:
+        username = "(SELECT u.username FROM users u WHERE u.id = quests.user_id)"
+    else:
+        username = "username"
+    copy = {
+        "username": username,
+        "completed": "CASE WHEN COALESCE(completed, 0) != 0 THEN 1 ELSE 0 END" if "completed" in cols else "0",
+        "created_at": "COALESCE(created_at, CURRENT_TIMESTAMP)" if "created_at" in cols else "CURRENT_TIMESTAMP",
+    }
+    if "title" not in cols:
+        # create_db.py stored the quest text in a NOT NULL `description`
+        copy["title"] = "description"
+        copy["description"] = "NULL"
+    if "reward_xp" not in cols:
+        # the legacy xp_reward defaulted to 0; the model's default is 20
+        copy["reward_xp"] = "COALESCE(NULLIF(xp_reward, 0), 20)" if "xp_reward" in cols else "20"
+
+    batch_alter(
+        conn, "quests",
+        lambda: [
+            Column("id", Integer, primary_key=True),
+            Column("username", String(100), ForeignKey(_users_username(), ondelete="CASCADE"), nullable=False),
+            Column("title", String(200), nullable=False),
+            Column("description", Text),
+            Column("reward_xp", Integer, nullable=False),
+            Column("completed", Boolean, nullable=False),
+            Column("created_at", DateTime, nullable=False),
+            Column("start_time", DateTime),
+            Column("duration_seconds", Integer),
+            Column("deadline", DateTime),
+        ],
+        copy=copy,
+        indexes=[("ix_quests_username", ["username"], False)],
+        where="username IS NOT NULL",
+    )
+    _m5_indexes(conn)
+
+
+MIGRATIONS = [
+    (1, "users: hashed passwords, created_at", _m1_users),
+    (2, "tasks: username, is_done, xp, created_at", _m2_tasks),
+    (3, "create missing tables", _m3_create_tables),
+    (4, "quests: timer columns", _m4_quest_timers),
+    (5, "composite and partial indexes", _m5_indexes),
+    (6, "quests: timer deadlines", _m6_quest_deadlines),
+    (7, "study rollups", _m7_study_rollups),
+    (8, "xp event log", _m8_xp_events),
+    (9, "daily xp cap counters", _m9_daily_xp),
+    (10, "merge user_xp into player_stats", _m10_merge_user_xp),
+    (11, "quests: username, title, reward_xp, created_at", _m11_quests),
+]
+HEAD = MIGRATIONS[-1][0]
+
+
+# ------------------------
+# Runner
+# ------------------------
+def current_version(engine):
+    """Schema version recorded in the database, or None if it has no schema_version table."""
+    with engine.connect() as conn:
+        try:
+            return int(conn.execute(text("SELECT version FROM schema_version")).scalar() or 0)
+        except Exception:
+            conn.rollback()
+            return None
+
+
+def _migration_engine(engine):
+    """
+    Engine for running DDL. pysqlite does not open a transaction before DDL, so
+    on SQLite take over transaction control and emit BEGIN ourselves.
+    """
+    if engine.dialect.name != "sqlite":
+        return engine, False
+    eng = create_engine(engine.url, poolclass=NullPool)
+
+    @event.listens_for(eng, "connect")
+    def _no_implicit_tx(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(eng, "begin")
+    def _explicit_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return eng, True
+
+
+def _set_version(conn, version):
+    schema_version.create(conn, checkfirst=True)
+    if conn.execute(schema_version.update().values(version=version)).rowcount == 0:
+        conn.execute(schema_version.insert().values(version=version))
+
+
+def upgrade(engine, target=None, log=print):
+    """Apply pending migrations in order, each in its own transaction. Returns applied versions."""
+    target = HEAD if target is None else int(target)
+    eng, owned = _migration_engine(engine)
+    applied = []
+    try:
+        version = current_version(eng)
+        if version is None:
+            with eng.begin() as conn:
+                if not inspect(conn).get_table_names():
+                    # brand-new database: build the current schema directly
+                    from .extentions import db
+                    from . import models, leveling  # noqa: F401
+                    db.metadata.create_all(conn)
+                    _set_version(conn, HEAD)
+                    log(f"created schema at version {HEAD}")
+                    return [HEAD]
+            version = 0
+        for number, description, fn in MIGRATIONS:
+            if number <= version or number > target:
+                continue
+            log(f"applying {number:04d} {description}")
+            with eng.begin() as conn:
+                fn(conn)
+                _set_version(conn, number)
+            applied.append(number)
+        return applied
+    finally:
+        if owned:
+            eng.dispose()
+
+
+def ensure_current(engine, auto_upgrade=True):
+    """
+    App-start check: one SELECT when the schema is current. Otherwise upgrade
+    (auto_upgrade) or raise RuntimeError pointing at migrate.py.
+    """
+    version = current_version(engine)
+    if version == HEAD:
+        return version
+    if version is not None and version > HEAD:
+        raise RuntimeError(f"database schema version {version} is newer than this code ({HEAD})")
+    if not auto_upgrade:  # SCHEMA_MODE "check"
+        raise RuntimeError(
+            f"database schema at version {version or 0}, code expects {HEAD}; run: python migrate.py upgrade"
+        )
+    upgrade(engine, log=lambda msg: print("[migrate]", msg))
+    return HEAD
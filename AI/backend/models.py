@@ -1,7 +1,7 @@
 # backend/models.py
 from . import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from . import passwords
 from datetime import date
 from backend import db  #
 
@@ -14,35 +14,17 @@ class User(db.Model):
     password_hash = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # the KDF runs on the bounded pool in backend.passwords, not the request thread
     def set_password(self, raw_password):
-        self.password_hash = generate_password_hash(raw_password)
+        self.password_hash = passwords.hash_password(raw_password)
 
     def check_password(self, raw_password):
-        return check_password_hash(self.password_hash, raw_password)
+        return passwords.verify_password(self.password_hash, raw_password)
 
     def __repr__(self):
         return f"<User {self.username}>"
 
 
-class UserXP(db.Model):
-    __tablename__ = "user_xp"
-
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(
-        db.String(100),
-        db.ForeignKey("users.username", ondelete="CASCADE"),
-        unique=True,
-        nullable=False,
-        index=True,
-    )
-    xp = db.Column(db.Integer, default=0, nullable=False)
-    level = db.Column(db.Integer, default=1, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-
-    def __repr__(self):
-        return f"<UserXP {self.username} xp={self.xp} lvl={self.level}>"
-
-
 class Task(db.Model):
     __tablename__ = "tasks"
 
@@ -59,6 +41,11 @@ class Task(db.Model):
     xp = db.Column(db.Integer, default=10, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # get_tasks: WHERE username = ? ORDER BY created_at DESC
+        db.Index("ix_tasks_username_created_at", "username", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Task {self.id} {self.title} by {self.username}>"
 
@@ -79,10 +66,112 @@ class AcademicLog(db.Model):
     start_time = db.Column(db.DateTime)
     end_time = db.Column(db.DateTime)
 
+    __table_args__ = (
+        # get_study_sessions / api_academic: WHERE username = ? ORDER BY date DESC
+        db.Index("ix_academic_logs_username_date", "username", "date"),
+        # get_active_session: WHERE username = ? AND end_time IS NULL (few rows match)
+        db.Index(
+            "ix_academic_logs_active",
+            "username",
+            sqlite_where=db.text("end_time IS NULL"),
+            postgresql_where=db.text("end_time IS NULL"),
+        ),
+    )
+
     def __repr__(self):
         return f"<AcademicLog {self.username} {self.subject} {self.hours}h>"
 
 
+class StudyRollup(db.Model):
+    """
+    Study hours per (username, subject, period, period_start), kept in step with
+    academic_logs by backend.academic_tracker (record_study / rebuild_study_rollups).
+    period is "day", "week" (period_start = Monday) or "all" (period_start = 1970-01-01).
+    """
+    __tablename__ = "study_rollups"
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), nullable=False)
+    subject = db.Column(db.String(100), nullable=False)
+    period = db.Column(db.String(8), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    hours = db.Column(db.Float, default=0.0, nullable=False)
+    sessions = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        # upsert target; also serves WHERE username = ? AND period = ? [AND period_start >= ?]
+        db.Index("ix_study_rollups_key", "username", "period", "period_start", "subject", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<StudyRollup {self.username} {self.subject} {self.period} {self.period_start} {self.hours}h>"
+
+
+class XPEvent(db.Model):
+    """
+    Append-only log of XP awards, written by backend.leveling in the same
+    transaction as the award. source names what earned it (leveling.XP_SOURCES),
+    ref_id the task / quest / study log it came from, when there is one.
+    """
+    __tablename__ = "xp_events"
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), nullable=False)
+    source = db.Column(db.String(32), nullable=False, default="other")
+    amount = db.Column(db.Integer, nullable=False)
+    ref_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # per-user history: WHERE username = ? [AND created_at >= ?]
+        db.Index("ix_xp_events_username_created_at", "username", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<XPEvent {self.username} {self.source} {self.amount:+d}>"
+
+
+class XPDaily(db.Model):
+    """
+    XP per (username, day, source), summed from xp_events in the same commit
+    by backend.analytics (record_xp_events / rebuild_xp_daily). day is the UTC date.
+    """
+    __tablename__ = "xp_daily"
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    source = db.Column(db.String(32), nullable=False)
+    amount = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        # upsert target; also serves WHERE username = ? AND day >= ?
+        db.Index("ix_xp_daily_key", "username", "day", "source", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<XPDaily {self.username} {self.day} {self.source} {self.amount}>"
+
+
+class DailyXP(db.Model):
+    """
+    Capped XP a user earned on `day` (UTC), one row per user, kept by
+    backend.xp_manager. A row from an earlier day counts as zero and is reset
+    by the next award. granted is what the last award added (read back with
+    RETURNING by the same upsert).
+    """
+    __tablename__ = "daily_xp"
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), unique=True, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    xp = db.Column(db.Integer, default=0, nullable=False)
+    granted = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<DailyXP {self.username} {self.day} {self.xp}>"
+
+
 class Quest(db.Model):
     __tablename__ = "quests"
 
@@ -103,6 +192,41 @@ class Quest(db.Model):
     # duration_seconds is total required duration in seconds)
     start_time = db.Column(db.DateTime, nullable=True)
     duration_seconds = db.Column(db.Integer, nullable=True)
+    # start_time + duration_seconds, stored by start_quest so reads and the
+    # quest scheduler (backend.quest_scheduler) never recompute it
+    deadline = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # get_quests: WHERE username = ? ORDER BY created_at DESC
+        db.Index("ix_quests_username_created_at", "username", "created_at"),
+        # quest scheduler reload: WHERE completed = false AND deadline IS NOT NULL ORDER BY deadline
+        db.Index("ix_quests_completed_deadline", "completed", "deadline"),
+    )
 
     def __repr__(self):
         return f"<Quest {self.id} {self.title} by {self.username} completed={self.completed}>"
+
+
+class StateVersion(db.Model):
+    """Per-user monotonically increasing version, bumped on every write (see backend.state)."""
+    __tablename__ = "state_versions"
+
+    username = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<StateVersion {self.username} v{self.version}>"
+
+
+class ImportCheckpoint(db.Model):
+    """Progress of one legacy JSON source in migrate_legacy_json.py (committed with each chunk)."""
+    __tablename__ = "import_checkpoints"
+
+    source = db.Column(db.String(255), primary_key=True)   # path relative to AI/
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha1 of the file contents
+    position = db.Column(db.Integer, default=0, nullable=False)  # records committed so far
+    done = db.Column(db.Boolean, default=False, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ImportCheckpoint {self.source} pos={self.position} done={self.done}>"
@@ -0,0 +1,85 @@
+# backend/pagination.py
+"""
+Keyset (cursor) pagination helpers.
+
+Listings are ordered newest first by (timestamp DESC, id DESC); a cursor encodes
+the (timestamp, id) of the last row returned, so the next page is a range scan
+on the (username, timestamp) index instead of an OFFSET.
+
+Functions:
+- clamp_limit(raw, default=DEFAULT_PAGE_SIZE) -> int
+- encode_cursor(scope, ts, row_id) -> str
+- decode_cursor(scope, cursor) -> (datetime, int)      raises ValueError
+- keyset_page(query, scope, ts_col, id_col, cursor=None, limit=None) -> (rows, next_cursor)
+- keyset_query(query, scope, ts_col, id_col, cursor=None, limit=None) -> (query, limit)
+- split_page(rows, scope, limit, ts_attr, id_attr) -> (rows, next_cursor)
+
+keyset_query/split_page are the two halves of keyset_page for callers that
+execute the statement themselves (e.g. on an async connection).
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import or_, and_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def clamp_limit(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a client-supplied page size and clamp it to [1, maximum]."""
+    try:
+        limit = int(raw) if raw not in (None, "") else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(scope, ts, row_id):
+    """Opaque cursor for the row (ts, row_id) of listing `scope`."""
+    payload = json.dumps([scope, ts.isoformat() if ts else None, int(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(scope, cursor):
+    """Return (ts, row_id) from a cursor made by encode_cursor for the same scope."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        got_scope, ts, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if got_scope != scope or ts is None:
+            raise ValueError
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def keyset_query(query, scope, ts_col, id_col, cursor=None, limit=None):
+    """
+    Narrow an ORM query or Core select to the page after cursor, newest first,
+    fetching limit+1 rows (the extra row flags a next page). Returns (query, limit).
+    """
+    limit = clamp_limit(limit)
+    if cursor:
+        c_ts, c_id = decode_cursor(scope, cursor)
+        query = query.where(or_(ts_col < c_ts, and_(ts_col == c_ts, id_col < c_id)))
+    return query.order_by(ts_col.desc(), id_col.desc()).limit(limit + 1), limit
+
+
+def split_page(rows, scope, limit, ts_attr, id_attr):
+    """Trim the limit+1 rows of keyset_query to limit and build the next cursor."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(scope, getattr(last, ts_attr), getattr(last, id_attr))
+    return rows, next_cursor
+
+
+def keyset_page(query, scope, ts_col, id_col, cursor=None, limit=None):
+    """
+    Return (rows, next_cursor) for an ORM query ordered by (ts_col DESC, id_col DESC).
+    next_cursor is None on the last page. limit is clamped to MAX_PAGE_SIZE.
+    """
+    query, limit = keyset_query(query, scope, ts_col, id_col, cursor, limit)
+    return split_page(query.all(), scope, limit, ts_col.key, id_col.key)
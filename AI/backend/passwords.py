@@ -0,0 +1,295 @@
+# backend/passwords.py
+"""
+Password hashing off the request thread, with rate limits and metrics.
+
+Functions:
+- configure(app)   (backend.init_app; reads the settings below from app.config)
+- hash_password(password) -> str
+- verify_password(stored_hash, password) -> bool
+- needs_rehash(stored_hash) -> bool
+- check_rate(username=None, remote_addr=None)   (raises RateLimited)
+- metrics() -> dict
+- reset()   (drop the pool, buckets and counters; tests / after fork)
+
+Exceptions:
+- RateLimited(retry_after)   too many attempts for this user or address
+- PasswordPoolBusy           the hashing queue is full (shed load, try later)
+
+The KDF is deliberately slow, so it runs on a small bounded thread pool
+(hashlib's pbkdf2/scrypt release the GIL). Request threads wait for their
+result, but at most PASSWORD_HASH_WORKERS hashes run at once and at most
+PASSWORD_HASH_QUEUE more wait; beyond that callers get PasswordPoolBusy
+immediately instead of piling up, so a login burst cannot take every worker
+thread away from dashboard traffic.
+
+Token buckets (burst, per minute) limit attempts per username and per client
+address before any hashing happens.
+
+Settings (app.config):
+  PASSWORD_HASH_METHOD    werkzeug method string, e.g. "scrypt:32768:8:1" or
+                          "pbkdf2:sha256:600000". Stored hashes made with other
+                          parameters are upgraded on the next successful login.
+  PASSWORD_HASH_WORKERS   concurrent hashes (default: min(4, CPUs))
+  PASSWORD_HASH_QUEUE     hashes allowed to wait for a worker (default 32)
+  PASSWORD_HASH_TIMEOUT   seconds a caller waits for its result (default 10)
+  LOGIN_RATE_PER_USER     (burst, per_minute), default (5, 5)
+  LOGIN_RATE_PER_IP       (burst, per_minute), default (20, 20)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+DEFAULT_QUEUE = 32
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_RATE_PER_USER = (5, 5)
+DEFAULT_RATE_PER_IP = (20, 20)
+BUCKETS_MAX_KEYS = 50000      # LRU bound on tracked usernames / addresses per scope
+LATENCY_SAMPLES = 1024        # recent timings kept per operation for percentiles
+
+
+class RateLimited(RuntimeError):
+    def __init__(self, scope, retry_after):
+        super().__init__(f"rate limited ({scope}); retry in {retry_after:.0f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class PasswordPoolBusy(RuntimeError):
+    pass
+
+
+# ------------------------
+# Token buckets
+# ------------------------
+class TokenBuckets:
+    """Thread-safe token buckets keyed by string, LRU-bounded."""
+
+    def __init__(self, burst, per_minute, max_keys=BUCKETS_MAX_KEYS):
+        self.burst = float(burst)
+        self.rate = float(per_minute) / 60.0
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # key -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Consume one token. Returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1.0:
+                self._buckets[key] = (tokens - 1.0, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1.0 - tokens) / self.rate if self.rate > 0 else float("inf")
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+# ------------------------
+# Module state
+# ------------------------
+_lock = threading.Lock()
+_settings = {
+    "method": DEFAULT_METHOD,
+    "workers": min(4, os.cpu_count() or 1),
+    "queue": DEFAULT_QUEUE,
+    "timeout": DEFAULT_TIMEOUT,
+    "rate_user": DEFAULT_RATE_PER_USER,
+    "rate_ip": DEFAULT_RATE_PER_IP,
+}
+_executor = None
+_slots = None           # BoundedSemaphore(workers + queue): admission control
+_method_tag = None      # method prefix as werkzeug writes it for the configured method
+_buckets = {}
+_stats = None
+
+
+def _new_stats():
+    return {
+        "pending": 0,
+        "max_pending": 0,
+        "rejected_busy": 0,
+        "rate_limited": {"user": 0, "ip": 0},
+        "rehashed": 0,
+        "ops": {op: {"count": 0, "samples": deque(maxlen=LATENCY_SAMPLES)} for op in ("hash", "verify")},
+    }
+
+
+def reset():
+    """Forget the pool, buckets and counters (the next call rebuilds them)."""
+    global _executor, _slots, _method_tag, _stats
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+        _slots = None
+        _method_tag = None
+        _buckets.clear()
+        _buckets["user"] = TokenBuckets(*_settings["rate_user"])
+        _buckets["ip"] = TokenBuckets(*_settings["rate_ip"])
+        _stats = _new_stats()
+
+
+def configure(app):
+    cfg = app.config
+    _settings.update({
+        "method": cfg.get("PASSWORD_HASH_METHOD") or DEFAULT_METHOD,
+        "workers": int(cfg.get("PASSWORD_HASH_WORKERS") or min(4, os.cpu_count() or 1)),
+        "queue": int(cfg.get("PASSWORD_HASH_QUEUE", DEFAULT_QUEUE)),
+        "timeout": float(cfg.get("PASSWORD_HASH_TIMEOUT") or DEFAULT_TIMEOUT),
+        "rate_user": tuple(cfg.get("LOGIN_RATE_PER_USER") or DEFAULT_RATE_PER_USER),
+        "rate_ip": tuple(cfg.get("LOGIN_RATE_PER_IP") or DEFAULT_RATE_PER_IP),
+    })
+    reset()
+
+
+def _after_fork():
+    # pool threads (and a lock another thread may have held) do not survive fork()
+    global _lock, _executor
+    _lock = threading.Lock()
+    _executor = None
+    reset()
+
+
+reset()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+# ------------------------
+# Hashing pool
+# ------------------------
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = max(1, _settings["workers"])
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+            _slots = threading.BoundedSemaphore(workers + max(0, _settings["queue"]))
+        return _executor, _slots
+
+
+def _run(op, fn, *args):
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        with _lock:
+            _stats["rejected_busy"] += 1
+        raise PasswordPoolBusy("password hashing queue is full")
+    with _lock:
+        _stats["pending"] += 1
+        _stats["max_pending"] = max(_stats["max_pending"], _stats["pending"])
+
+    def task():
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - t0
+            with _lock:
+                entry = _stats["ops"][op]
+                entry["count"] += 1
+                entry["samples"].append(elapsed)
+
+    def done(_future):
+        slots.release()
+        with _lock:
+            _stats["pending"] -= 1
+
+    future = executor.submit(task)
+    future.add_done_callback(done)
+    try:
+        return future.result(timeout=_settings["timeout"])
+    except FutureTimeout:
+        future.cancel()
+        raise PasswordPoolBusy("password hashing timed out")
+
+
+def hash_password(password):
+    return _run("hash", generate_password_hash, password, _settings["method"])
+
+
+def verify_password(stored_hash, password):
+    if not stored_hash:
+        return False
+    return _run("verify", check_password_hash, stored_hash, password)
+
+
+def _configured_tag():
+    """Method prefix werkzeug writes for the configured method (it expands defaults)."""
+    global _method_tag
+    if _method_tag is None:
+        method = _settings["method"]
+        if method.count(":") >= 2:
+            _method_tag = method
+        else:
+            # shorthand such as "scrypt": let werkzeug fill in its parameters once
+            _method_tag = generate_password_hash("", method).split("$", 1)[0]
+    return _method_tag
+
+
+def needs_rehash(stored_hash):
+    """True when stored_hash was made with other KDF parameters than configured."""
+    if not stored_hash or "$" not in stored_hash:
+        return True
+    return stored_hash.split("$", 1)[0] != _configured_tag()
+
+
+def note_rehash():
+    with _lock:
+        _stats["rehashed"] += 1
+
+
+# ------------------------
+# Rate limits
+# ------------------------
+def check_rate(username=None, remote_addr=None):
+    """Spend one attempt for username and remote_addr; raise RateLimited if either is exhausted."""
+    for scope, key in (("ip", remote_addr), ("user", username)):
+        if not key:
+            continue
+        wait = _buckets[scope].take(key)
+        if wait:
+            with _lock:
+                _stats["rate_limited"][scope] += 1
+            raise RateLimited(scope, wait)
+
+
+# ------------------------
+# Metrics
+# ------------------------
+def _latency(samples):
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "max_ms": None}
+    xs = sorted(samples)
+    return {
+        "p50_ms": round(xs[int(0.5 * (len(xs) - 1))] * 1000, 2),
+        "p95_ms": round(xs[int(0.95 * (len(xs) - 1))] * 1000, 2),
+        "max_ms": round(xs[-1] * 1000, 2),
+    }
+
+
+def metrics():
+    """Counters and recent latencies of the hashing pool and rate limiters."""
+    with _lock:
+        ops = {op: dict(count=e["count"], **_latency(list(e["samples"]))) for op, e in _stats["ops"].items()}
+        return {
+            "method": _settings["method"],
+            "workers": _settings["workers"],
+            "queue_limit": _settings["queue"],
+            "queue_depth": max(0, _stats["pending"] - _settings["workers"]),
+            "in_flight": _stats["pending"],
+            "max_in_flight": _stats["max_pending"],
+            "rejected_busy": _stats["rejected_busy"],
+            "rate_limited": dict(_stats["rate_limited"]),
+            "rehashed": _stats["rehashed"],
+            "ops": ops,
+        }
@@ -0,0 +1,182 @@
+# backend/quest_scheduler.py
+"""
+Background completion of timed quests.
+
+Functions:
+- init_app(app)   (backend.init_app; the scheduler starts with the first request)
+- schedule(quest_id, deadline)   (quest_system.start_quest, after commit)
+- get_scheduler() -> QuestScheduler | None
+
+Pending timers live in a min-heap of (deadline, quest_id). One daemon thread
+sleeps until the earliest deadline, pops every timer that is due and hands
+them to quest_system.complete_expired in batches of QUEST_SCHEDULER_BATCH
+(one UPDATE and one XP update per user per batch).
+
+Restart-safe: on start the heap is rebuilt from the quests table (open
+quests with a deadline, via ix_quests_completed_deadline), so timers that
+expired while the process was down complete immediately. The same reload
+runs every QUEST_SCHEDULER_RESCAN seconds to pick up timers started by other
+worker processes. Several processes may race for one quest; complete_expired
+only completes still-open quests, so XP is awarded once.
+
+Settings (app.config): QUEST_SCHEDULER (default True), QUEST_SCHEDULER_BATCH
+(default 500), QUEST_SCHEDULER_RESCAN (seconds, default 60).
+"""
+
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_BATCH = 500
+DEFAULT_RESCAN = 60.0
+
+
+class QuestScheduler:
+    def __init__(self, app, batch_size=DEFAULT_BATCH, rescan_seconds=DEFAULT_RESCAN):
+        self.app = app
+        self.batch_size = max(1, int(batch_size))
+        self.rescan_seconds = float(rescan_seconds)
+        self._heap = []          # (deadline, quest_id)
+        self._deadlines = {}     # quest_id -> current deadline (older heap entries are stale)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self._scheduled_during_reload = None
+        self.completed = 0
+
+    # ---- public ----
+    def start(self):
+        """Start the worker thread in this process (no-op if it is already running here)."""
+        if self._running():
+            return   # fast path: runs before every request
+        with self._cond:
+            if self._running():
+                return
+            self._stopping = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="quest-scheduler", daemon=True)
+            self._thread.start()
+
+    def _running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def stop(self, timeout=5):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def schedule(self, quest_id, deadline):
+        quest_id = int(quest_id)
+        with self._cond:
+            self._push(quest_id, deadline)
+            if self._heap[0][1] == quest_id:
+                self._cond.notify()   # new earliest deadline: re-arm the wait
+
+    def pending(self):
+        with self._cond:
+            return len(self._deadlines)
+
+    def reload(self):
+        """Rebuild the heap from the open, timed quests in the database."""
+        from .extentions import db
+        from .models import Quest
+        with self._cond:
+            self._scheduled_during_reload = {}
+        with self.app.app_context():
+            rows = db.session.execute(
+                db.select(Quest.id, Quest.deadline)
+                .where(Quest.completed.is_(False), Quest.deadline.is_not(None))
+                .order_by(Quest.deadline)
+            ).all()
+        with self._cond:
+            self._deadlines = {r.id: r.deadline for r in rows}
+            # rows arrive sorted by deadline, which is already a valid heap
+            self._heap = [(r.deadline, r.id) for r in rows]
+            # timers started while the SELECT ran may be missing from it
+            late, self._scheduled_during_reload = self._scheduled_during_reload, None
+            for quest_id, deadline in late.items():
+                self._push(quest_id, deadline)
+            self._cond.notify()
+
+    # ---- internals ----
+    def _push(self, quest_id, deadline):
+        if self._scheduled_during_reload is not None:
+            self._scheduled_during_reload[quest_id] = deadline
+        self._deadlines[quest_id] = deadline
+        heapq.heappush(self._heap, (deadline, quest_id))
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            deadline, quest_id = heapq.heappop(self._heap)
+            if self._deadlines.get(quest_id) != deadline:
+                continue   # restarted with a new deadline, or already handled
+            del self._deadlines[quest_id]
+            due.append(quest_id)
+        return due
+
+    def _complete(self, quest_ids):
+        from . import quest_system
+        with self.app.app_context():
+            done = quest_system.complete_expired(quest_ids)
+        self.completed += len(done)
+
+    def _run(self):
+        next_rescan = 0.0
+        while True:
+            if not self._stopping and time.monotonic() >= next_rescan:
+                try:
+                    self.reload()
+                except Exception as e:
+                    print("quest scheduler reload error:", repr(e))
+                next_rescan = time.monotonic() + self.rescan_seconds
+
+            with self._cond:
+                if self._stopping:
+                    return
+                now = datetime.utcnow()
+                due = self._pop_due(now)
+                if not due:
+                    wait = next_rescan - time.monotonic()
+                    if self._heap:
+                        wait = min(wait, (self._heap[0][0] - now).total_seconds())
+                    self._cond.wait(max(0.0, wait))
+                    continue
+
+            try:
+                self._complete(due)
+            except Exception as e:
+                # leave them to the next reload rather than lose the timers
+                print("quest scheduler completion error:", repr(e))
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def init_app(app):
+    """Create the process's scheduler; the thread starts lazily on the first request (after any fork)."""
+    global _scheduler
+    if not app.config.get("QUEST_SCHEDULER", True):
+        return None
+    _scheduler = QuestScheduler(
+        app,
+        batch_size=app.config.get("QUEST_SCHEDULER_BATCH", DEFAULT_BATCH),
+        rescan_seconds=app.config.get("QUEST_SCHEDULER_RESCAN", DEFAULT_RESCAN),
+    )
+    app.before_request(_scheduler.start)
+    return _scheduler
+
+
+def schedule(quest_id, deadline):
+    """Register a timer with this process's scheduler (no-op when it is disabled)."""
+    if _scheduler is not None and deadline is not None:
+        _scheduler.schedule(quest_id, deadline)
@@ -7,14 +7,23 @@ Functions:
 - create_quest(username, title, description="", reward_xp=20)
 - start_quest(username, quest_id, duration_minutes)
 - complete_quest(username, quest_id) -> True/False
+- complete_expired(quest_ids, now=None) -> list of (id, username, reward_xp) completed
 - get_remaining_time(username, quest_id) -> seconds remaining or None
-- get_quests(username) -> list of dicts
+- get_quests(username, limit=None, cursor=None) -> list of dicts
+- get_quests_page(username, cursor=None, limit=None) -> (list of dicts, next_cursor)
+
+start_quest stores the timer's deadline and hands it to the quest scheduler
+(backend.quest_scheduler), which calls complete_expired when it passes.
 """
 
 from datetime import datetime, timezone, timedelta
+from sqlalchemy import or_
 from backend import db
-from backend.leveling import add_xp
+from backend.leveling import add_xp, xp_ledger
 from .models import Quest
+from . import events, quest_scheduler
+from .pagination import keyset_page
+from .state import bump_versions
 # backend/models.py
 from .extentions import db
 # define User, Task, Quest, etc. using that db
@@ -92,7 +101,10 @@ def start_quest(username, quest_id, duration_minutes):
             return False
         q.start_time = datetime.utcnow()
         q.duration_seconds = seconds
+        q.deadline = q.start_time + timedelta(seconds=seconds)
+        deadline = q.deadline
         db.session.commit()
+        quest_scheduler.schedule(quest_id, deadline)
         return True
     except Exception as e:
         db.session.rollback()
@@ -106,27 +118,31 @@ def complete_quest(username, quest_id):
     Returns True on success, False otherwise.
     """
     try:
-        q = Quest.query.get(quest_id)
-        if not q or q.username != username:
-            return False
-        if q.completed:
-            return False
+        now = datetime.utcnow()
+        # conditional UPDATE, like complete_expired: if the scheduler completes the
+        # quest at the same time, only the statement that flipped the row pays XP
+        cond = (
+            Quest.id == quest_id, Quest.username == username, Quest.completed.is_(False),
+            or_(Quest.deadline.is_(None), Quest.deadline <= now),
+        )
+        stmt = db.update(Quest).where(*cond).values(completed=True).execution_options(synchronize_session=False)
 
-        # If a duration is set, require that enough time has passed
-        if q.duration_seconds and q.start_time:
-            elapsed = (datetime.utcnow() - q.start_time).total_seconds()
-            if elapsed < q.duration_seconds:
+        with xp_ledger() as ledger:
+            if db.engine.dialect.update_returning:
+                row = db.session.execute(stmt.returning(Quest.id, Quest.reward_xp)).first()
+            else:
+                row = None
+                if db.session.execute(stmt).rowcount:
+                    row = db.session.execute(
+                        db.select(Quest.id, Quest.reward_xp).where(Quest.id == quest_id)
+                    ).first()
+            if row is None:
                 return False
-
-        # mark completed and award XP
-        q.completed = True
-        db.session.commit()
-
-        try:
-            add_xp(username, int(q.reward_xp or 0))
-        except Exception as e:
-            # XP awarding failure should not rollback the completion — log
-            print("Warning: add_xp failed in complete_quest:", repr(e))
+            reward = int(row.reward_xp or 0)
+            add_xp(username, reward, "quest", row.id)
+            ledger.after_commit(lambda: events.publish(
+                username, "quest_completed", {"id": row.id, "reward_xp": reward}
+            ))
 
         return True
     except Exception as e:
@@ -143,16 +159,68 @@ def get_remaining_time(username, quest_id):
         q = Quest.query.get(quest_id)
         if not q or q.username != username:
             return None
-        if not q.start_time or not q.duration_seconds:
-            return None
-        elapsed = (datetime.utcnow() - q.start_time).total_seconds()
-        remaining = int(q.duration_seconds - elapsed)
-        return max(0, remaining)
+        return _remaining(q.deadline, datetime.utcnow())
     except Exception as e:
         print("get_remaining_time error:", repr(e))
         return None
 
-def get_quests(username):
+def complete_expired(quest_ids, now=None):
+    """
+    Complete the given quests whose deadline has passed and that are still
+    open, award their reward_xp (one XP update per user) and publish
+    quest_completed. One UPDATE for the whole batch; a quest completed
+    concurrently (by its owner or another process's scheduler) is skipped,
+    so XP is awarded once. Returns [(id, username, reward_xp)] completed.
+    """
+    ids = [int(q) for q in quest_ids]
+    if not ids:
+        return []
+    now = now or datetime.utcnow()
+    stmt = db.update(Quest).where(
+        Quest.id.in_(ids), Quest.completed.is_(False), Quest.deadline <= now
+    ).values(completed=True).execution_options(synchronize_session=False)
+
+    with xp_ledger() as ledger:
+        if db.engine.dialect.update_returning:
+            done = db.session.execute(stmt.returning(Quest.id, Quest.username, Quest.reward_xp)).all()
+        else:
+            done = db.session.execute(
+                db.select(Quest.id, Quest.username, Quest.reward_xp).where(
+                    Quest.id.in_(ids), Quest.completed.is_(False), Quest.deadline <= now
+                )
+            ).all()
+            db.session.execute(stmt)
+        bump_versions({r.username for r in done})
+        # one event per quest; the ledger sums them into one XP update per user
+        for r in done:
+            add_xp(r.username, int(r.reward_xp or 0), "quest", r.id)
+
+        def publish():
+            for r in done:
+                events.publish(r.username, "quest_completed", {"id": r.id, "reward_xp": int(r.reward_xp or 0)})
+        ledger.after_commit(publish)
+    return [(r.id, r.username, int(r.reward_xp or 0)) for r in done]
+
+def _remaining(deadline, now):
+    if deadline is None:
+        return None
+    return max(0, int((deadline - now).total_seconds()))
+
+def _quest_to_dict(r, now):
+    return {
+        "id": r.id,
+        "title": r.title,
+        "description": r.description,
+        "reward_xp": int(r.reward_xp or 0),
+        "completed": bool(r.completed),
+        "start_time": r.start_time.isoformat() if r.start_time else None,
+        "duration_seconds": int(r.duration_seconds) if r.duration_seconds else None,
+        "deadline": r.deadline.isoformat() if r.deadline else None,
+        "remaining_seconds": _remaining(r.deadline, now),
+        "created_at": r.created_at.isoformat() if r.created_at else None
+    }
+
+def get_quests(username, limit=None, cursor=None):
     """
     Return list of quests for the user as dicts for templates:
     {
@@ -163,33 +231,39 @@ def get_quests(username):
       "completed": bool,
       "start_time": ISO string or None,
       "duration_seconds": int or None,
+      "deadline": ISO string or None,
       "remaining_seconds": int or None,
       "created_at": ISO string
     }
+    With limit/cursor, return one keyset page (see get_quests_page).
     """
     username = (username or "").strip()
     if not username:
         return []
+    if limit is not None or cursor is not None:
+        try:
+            return get_quests_page(username, cursor=cursor, limit=limit)[0]
+        except ValueError:
+            return []
     try:
-        rows = Quest.query.filter_by(username=username).order_by(Quest.created_at.desc()).all()
-        out = []
-        for r in rows:
-            remaining = None
-            if r.start_time and r.duration_seconds:
-                elapsed = (datetime.utcnow() - r.start_time).total_seconds()
-                remaining = max(0, int(r.duration_seconds - elapsed))
-            out.append({
-                "id": r.id,
-                "title": r.title,
-                "description": r.description,
-                "reward_xp": int(r.reward_xp or 0),
-                "completed": bool(r.completed),
-                "start_time": r.start_time.isoformat() if r.start_time else None,
-                "duration_seconds": int(r.duration_seconds) if r.duration_seconds else None,
-                "remaining_seconds": remaining,
-                "created_at": r.created_at.isoformat() if r.created_at else None
-            })
-        return out
+        rows = Quest.query.filter_by(username=username).order_by(Quest.created_at.desc(), Quest.id.desc()).all()
+        now = datetime.utcnow()
+        return [_quest_to_dict(r, now) for r in rows]
     except Exception as e:
         print("get_quests error:", repr(e))
         return []
+
+def get_quests_page(username, cursor=None, limit=None):
+    """
+    Return (quests, next_cursor): one page of quest dicts, most recent first.
+    next_cursor is None on the last page. Raises ValueError on a bad cursor.
+    """
+    username = (username or "").strip()
+    if not username:
+        return [], None
+    rows, next_cursor = keyset_page(
+        Quest.query.filter_by(username=username), "quests",
+        Quest.created_at, Quest.id, cursor=cursor, limit=limit,
+    )
+    now = datetime.utcnow()
+    return [_quest_to_dict(r, now) for r in rows], next_cursor
@@ -0,0 +1,308 @@
+# backend/state.py
+"""
+Aggregated per-user dashboard state.
+
+Functions:
+- load_state(username, limit=None) -> dict | None
+- state_queries(username, limit=None) / build_state(head, rows, limit=None)
+- page_query(kind, username, cursor=None, limit=None) / build_page(kind, rows, limit)
+- get_version(username) -> int
+- version_query(username) -> select
+- bump_version(username, session=None) -> None
+- bump_versions(usernames, session=None) -> None
+- etag_for(username, scope) -> str
+
+The whole state object (user, stats, tasks, quests, study sessions) is built from
+two SQL statements instead of one round-trip per backend helper:
+  1. users LEFT JOIN player_stats (identity + progression)
+  2. one UNION ALL over tasks, quests and academic_logs
+
+Every flush that touches a row carrying a `username` bumps that user's
+StateVersion in the same transaction, so GET endpoints can answer
+If-None-Match with a single primary-key lookup.
+"""
+
+import zlib
+from datetime import datetime
+from sqlalchemy import select, update, insert, union_all, literal, null, type_coerce, event, bindparam
+from sqlalchemy.orm import Session
+from backend import db
+from .models import User, Task, Quest, AcademicLog, StateVersion
+from .leveling import PlayerStats
+from .pagination import encode_cursor, clamp_limit, keyset_query, split_page
+
+
+# ------------------------
+# Versioning
+# ------------------------
+def get_version(username):
+    """Return the current state version for username (0 if never written)."""
+    username = (username or "").strip()
+    if not username:
+        return 0
+    v = db.session.execute(version_query(username)).scalar()
+    return int(v or 0)
+
+
+def version_query(username):
+    return select(StateVersion.version).where(StateVersion.username == username)
+
+
+def bump_version(username, session=None):
+    """Increment username's version inside the current transaction (no commit)."""
+    session = session or db.session
+    res = session.execute(
+        update(StateVersion)
+        .where(StateVersion.username == username)
+        .values(version=StateVersion.version + 1)
+    )
+    if not res.rowcount:
+        session.execute(insert(StateVersion).values(username=username, version=1))
+
+
+def bump_versions(usernames, session=None):
+    """bump_version for many users with two executemany statements (no commit)."""
+    session = session or db.session
+    names = sorted(set(usernames))
+    if not names:
+        return
+    existing = set()
+    for i in range(0, len(names), 500):
+        existing.update(session.execute(
+            select(StateVersion.username).where(StateVersion.username.in_(names[i:i + 500]))
+        ).scalars())
+    t = StateVersion.__table__
+    if existing:
+        session.execute(
+            t.update().where(t.c.username == bindparam("u")).values(version=t.c.version + 1),
+            [{"u": n} for n in sorted(existing)],
+        )
+    missing = [n for n in names if n not in existing]
+    if missing:
+        session.execute(t.insert(), [{"username": n, "version": 1} for n in missing])
+
+
+def etag_for(username, scope, version=None):
+    """
+    Weak-ETag value for one user's view of an endpoint. The username checksum keeps
+    two accounts at the same version from sharing a cache entry in one browser.
+    """
+    if version is None:
+        version = get_version(username)
+    tag = zlib.crc32((username or "").encode("utf-8")) & 0xFFFFFFFF
+    return f"{scope}-{tag:08x}-{version}"
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_versions_after_flush(session, flush_context):
+    usernames = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, StateVersion):
+            continue
+        name = getattr(obj, "username", None)
+        if name:
+            usernames.add(name)
+    for name in usernames:
+        bump_version(name, session)
+
+
+def _typed_null(type_):
+    return type_coerce(null(), type_)
+
+
+def _first_page(stmt, ts_col, id_col, limit):
+    """Keep only the newest limit+1 rows of one UNION member (the extra row flags a next page)."""
+    if not limit:
+        return stmt
+    # SQLite does not accept LIMIT on a bare compound member; wrap it.
+    sub = stmt.order_by(ts_col.desc(), id_col.desc()).limit(int(limit) + 1).subquery()
+    return select(*sub.c)
+
+
+def _task_select(username):
+    return select(
+        literal("task").label("kind"),
+        Task.id.label("id"),
+        Task.title.label("title"),
+        Task.description.label("description"),
+        Task.is_done.label("flag"),
+        Task.xp.label("xp"),
+        Task.created_at.label("ts"),
+        _typed_null(db.DateTime).label("start_time"),
+        _typed_null(db.Integer).label("duration_seconds"),
+        _typed_null(db.DateTime).label("deadline"),
+        _typed_null(db.Float).label("hours"),
+    ).where(Task.username == username)
+
+
+def _quest_select(username):
+    return select(
+        literal("quest").label("kind"),
+        Quest.id.label("id"),
+        Quest.title.label("title"),
+        Quest.description.label("description"),
+        Quest.completed.label("flag"),
+        Quest.reward_xp.label("xp"),
+        Quest.created_at.label("ts"),
+        Quest.start_time.label("start_time"),
+        Quest.duration_seconds.label("duration_seconds"),
+        Quest.deadline.label("deadline"),
+        _typed_null(db.Float).label("hours"),
+    ).where(Quest.username == username)
+
+
+def _academic_select(username):
+    return select(
+        literal("academic").label("kind"),
+        AcademicLog.id.label("id"),
+        AcademicLog.subject.label("title"),
+        _typed_null(db.Text).label("description"),
+        _typed_null(db.Boolean).label("flag"),
+        _typed_null(db.Integer).label("xp"),
+        AcademicLog.date.label("ts"),
+        AcademicLog.start_time.label("start_time"),
+        _typed_null(db.Integer).label("duration_seconds"),
+        _typed_null(db.DateTime).label("deadline"),
+        AcademicLog.hours.label("hours"),
+    ).where(AcademicLog.username == username)
+
+
+def _normalize_task(r):
+    return {
+        "id": r.id,
+        "title": r.title or "",
+        "description": r.description or "",
+        "is_done": bool(r.flag),
+        "xp": int(r.xp if r.xp is not None else 10),
+    }
+
+
+def _normalize_quest(r, now):
+    return {
+        "id": r.id,
+        "title": r.title,
+        "description": r.description,
+        "reward_xp": int(r.xp or 0),
+        "completed": bool(r.flag),
+        "start_time": r.start_time.isoformat() if r.start_time else None,
+        "duration_seconds": int(r.duration_seconds) if r.duration_seconds else None,
+        "deadline": r.deadline.isoformat() if r.deadline else None,
+        "remaining_seconds": max(0, int((r.deadline - now).total_seconds())) if r.deadline else None,
+        "created_at": r.ts.isoformat() if r.ts else None,
+    }
+
+
+def _normalize_session(r):
+    return {
+        "id": r.id,
+        "subject": r.title or "",
+        "hours": float(r.hours or 0),
+        "date": r.ts.isoformat() if r.ts is not None else None,
+    }
+
+
+# UNION member kind -> (pagination scope, state key)
+_KINDS = {"task": ("tasks", "tasks"), "quest": ("quests", "quests"), "academic": ("academic", "academics")}
+
+
+def load_state(username, limit=None):
+    """
+    Return the normalized state dict for username, or None if the user does not exist:
+    {
+      "user": {"username": str},
+      "stats": {"xp": int, "level": int},
+      "tasks": [task dicts, newest first],
+      "quests": [quest dicts, newest first],
+      "academics": [session dicts, newest first],
+      "next_cursors": {"tasks": str|None, "quests": str|None, "academics": str|None}
+    }
+    limit caps each list to its first keyset page (None = everything); the
+    cursors continue in the paginated /api/tasks, /api/quests and /api/academic.
+    Read-only: a missing PlayerStats row reports zero XP instead of being created.
+    """
+    username = (username or "").strip()
+    if not username:
+        return None
+    if limit is not None:
+        limit = clamp_limit(limit)
+    head_stmt, items_stmt = state_queries(username, limit)
+    head = db.session.execute(head_stmt).first()
+    if head is None:
+        return None
+    return build_state(head, db.session.execute(items_stmt).all(), limit)
+
+
+def state_queries(username, limit=None):
+    """
+    The two statements behind load_state, for callers that execute them
+    themselves (the async API): (head, items). limit must already be clamped.
+    """
+    head = (
+        select(User.username, PlayerStats.xp, PlayerStats.level)
+        .select_from(User)
+        .outerjoin(PlayerStats, PlayerStats.username == User.username)
+        .where(User.username == username)
+    )
+    combined = union_all(
+        _first_page(_task_select(username), Task.created_at, Task.id, limit),
+        _first_page(_quest_select(username), Quest.created_at, Quest.id, limit),
+        _first_page(_academic_select(username), AcademicLog.date, AcademicLog.id, limit),
+    ).subquery()
+    items = select(combined).order_by(combined.c.kind, combined.c.ts.desc(), combined.c.id.desc())
+    return head, items
+
+
+def build_state(head, rows, limit=None):
+    """Assemble the load_state dict from the head row and the UNION ALL rows."""
+    grouped = {"task": [], "quest": [], "academic": []}
+    for r in rows:
+        grouped[r.kind].append(r)
+
+    next_cursors = {}
+    for kind, (scope, key) in _KINDS.items():
+        kind_rows = grouped[kind]
+        if limit and len(kind_rows) > limit:
+            kind_rows = grouped[kind] = kind_rows[:limit]
+            next_cursors[key] = encode_cursor(scope, kind_rows[-1].ts, kind_rows[-1].id)
+        else:
+            next_cursors[key] = None
+
+    now = datetime.utcnow()
+    return {
+        "user": {"username": head.username},
+        "stats": {"xp": int(head.xp or 0), "level": int(head.level or 0)},
+        "tasks": [_normalize_task(r) for r in grouped["task"]],
+        "quests": [_normalize_quest(r, now) for r in grouped["quest"]],
+        "academics": [_normalize_session(r) for r in grouped["academic"]],
+        "next_cursors": next_cursors,
+    }
+
+
+# ------------------------
+# Single-list pages (same payloads as the paginated backend helpers)
+# ------------------------
+# kind -> (select builder, ts column, id column)
+_PAGE_SOURCES = {
+    "task": (_task_select, Task.created_at, Task.id),
+    "quest": (_quest_select, Quest.created_at, Quest.id),
+    "academic": (_academic_select, AcademicLog.date, AcademicLog.id),
+}
+
+
+def page_query(kind, username, cursor=None, limit=None):
+    """
+    One keyset page of tasks, quests or study sessions as a statement:
+    (stmt, limit). Raises ValueError on a bad cursor.
+    """
+    build, ts_col, id_col = _PAGE_SOURCES[kind]
+    return keyset_query(build(username), _KINDS[kind][0], ts_col, id_col, cursor, limit)
+
+
+def build_page(kind, rows, limit):
+    """(items, next_cursor) from the rows of page_query, normalized like load_state's lists."""
+    rows, next_cursor = split_page(rows, _KINDS[kind][0], limit, "ts", "id")
+    if kind == "quest":
+        now = datetime.utcnow()
+        return [_normalize_quest(r, now) for r in rows], next_cursor
+    normalize = _normalize_task if kind == "task" else _normalize_session
+    return [normalize(r) for r in rows], next_cursor
@@ -2,49 +2,243 @@
 """
 Task tracker utilities for Sam AI (no blueprints).
 Defines functions only — no top-level side-effect code (no award_xp calls at import time).
+
+Batch helpers (one transaction, one aggregated XP award, per-item results):
+- add_tasks(username, items) -> (results, xp_result)
+- complete_tasks(username, task_ids) -> (results, xp_result)
+- delete_tasks(username, task_ids) -> results
+Each result is {"index": i, "ok": True, "id": ...} or {"index": i, "ok": False, "error": ...}.
 """
 
+from datetime import datetime
 from .extentions import db
 from .models import Task, User
-from .leveling import add_xp  # add_xp(username, amount) returns awarded amount
+from .leveling import add_xp, xp_ledger  # add_xp(username, amount) returns awarded amount
+from . import events
+from .pagination import keyset_page
+from .state import bump_version
+
+TASK_CREATE_XP = 10     # awarded for creating a task
+MAX_BATCH_SIZE = 1000   # items per batch call
+TITLE_MAX_LEN = Task.__table__.c.title.type.length
 
 def add_task(username: str, title: str, description: str):
     """
-    Create a new task and award XP for creating it.
+    Create a new task and award XP for creating it (task + XP in one commit).
     Returns (task_id, awarded_xp) on success, (None, 0) on failure.
+    awarded_xp is add_xp's result dict, or None when called inside an outer
+    xp_ledger() that has not committed yet.
     """
     t = Task(username=username, title=title, description=description)
     try:
-        db.session.add(t)
-        db.session.commit()
-        # Award XP after committing the task
-        awarded = add_xp(username, 10)
-        return t.id, awarded
+        with xp_ledger() as ledger:
+            db.session.add(t)
+            db.session.flush()  # get id
+            add_xp(username, TASK_CREATE_XP, "task_created", t.id)
+            ledger.after_commit(lambda: events.publish(username, "task_added", {"task": {
+                "id": t.id, "title": t.title or "", "description": t.description or "",
+                "is_done": bool(t.is_done), "xp": int(t.xp or 10),
+            }}))
+        return t.id, ledger.results.get(username)
     except Exception:
         db.session.rollback()
         return None, 0
 
-def get_tasks(username: str):
+def get_tasks(username: str, limit=None, cursor=None):
     """
     Return a list of Task objects for the user (most recent first).
+    With limit/cursor, return one keyset page (see get_tasks_page).
+    """
+    if limit is None and cursor is None:
+        return Task.query.filter_by(username=username).order_by(Task.created_at.desc(), Task.id.desc()).all()
+    return get_tasks_page(username, cursor=cursor, limit=limit)[0]
+
+def get_tasks_page(username: str, cursor=None, limit=None):
+    """
+    Return (tasks, next_cursor): one page of Task objects, most recent first.
+    next_cursor is None on the last page. Raises ValueError on a bad cursor.
     """
-    return Task.query.filter_by(username=username).order_by(Task.created_at.desc()).all()
+    return keyset_page(
+        Task.query.filter_by(username=username), "tasks",
+        Task.created_at, Task.id, cursor=cursor, limit=limit,
+    )
 
 def complete_task(task_id: int, username: str):
     """
     Mark a task completed and award XP (if not already completed).
     Returns True/False.
     """
-    t = Task.query.get(task_id)
-    if not t or t.username != username:
+    try:
+        # same conditional UPDATE as the batch path, so concurrent completes award XP once
+        results, _ = complete_tasks(username, [task_id])
+        return bool(results[0]["ok"])
+    except Exception:
+        db.session.rollback()
         return False
-    if not t.completed:
-        t.completed = True
+
+
+# ------------------------
+# Batch operations
+# ------------------------
+def _check_batch(items):
+    if not isinstance(items, (list, tuple)):
+        raise ValueError("batch_must_be_list")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError("batch_too_large")
+
+
+def _parse_ids(task_ids):
+    """Split raw ids into per-item error results and {index: id} for the valid, first-seen ones."""
+    results, wanted, seen = {}, {}, set()
+    for i, raw in enumerate(task_ids):
         try:
+            tid = int(raw)
+        except (TypeError, ValueError):
+            results[i] = {"index": i, "ok": False, "error": "invalid_id"}
+            continue
+        if tid in seen:
+            results[i] = {"index": i, "ok": False, "id": tid, "error": "duplicate"}
+            continue
+        seen.add(tid)
+        wanted[i] = tid
+    return results, wanted
+
+
+def _owned(username, ids):
+    """{id: (is_done, xp)} for the user's tasks among ids."""
+    if not ids:
+        return {}
+    rows = db.session.execute(
+        db.select(Task.id, Task.is_done, Task.xp).where(Task.username == username, Task.id.in_(ids))
+    ).all()
+    return {r.id: (bool(r.is_done), int(r.xp or TASK_CREATE_XP)) for r in rows}
+
+
+def add_tasks(username: str, items):
+    """
+    Create many tasks in one multi-row INSERT and award TASK_CREATE_XP per
+    created task as a single XP update. items are dicts with "title" and
+    optional "description". Invalid items are reported and skipped; the rest
+    are committed together. Raises ValueError("batch_must_be_list" /
+    "batch_too_large") for a malformed batch.
+    """
+    _check_batch(items)
+    results, rows, positions = [None] * len(items), [], []
+    now = datetime.utcnow()
+    for i, item in enumerate(items):
+        item = item if isinstance(item, dict) else {"title": item if isinstance(item, str) else None}
+        title = (item.get("title") or "").strip()
+        if not title:
+            results[i] = {"index": i, "ok": False, "error": "title_required"}
+            continue
+        if len(title) > TITLE_MAX_LEN:
+            results[i] = {"index": i, "ok": False, "error": "title_too_long"}
+            continue
+        rows.append({
+            "username": username, "title": title,
+            "description": (item.get("description") or "").strip(),
+            "is_done": False, "xp": TASK_CREATE_XP, "created_at": now,
+        })
+        positions.append(i)
+
+    if not rows:
+        return results, None
+
+    with xp_ledger() as ledger:
+        if db.engine.dialect.insert_executemany_returning:
+            # executemany with RETURNING: ids come back in parameter order
+            ids = db.session.execute(
+                db.insert(Task).returning(Task.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+        else:
+            objs = [Task(**r) for r in rows]
+            db.session.add_all(objs)
+            db.session.flush()
+            ids = [o.id for o in objs]
+        bump_version(username)
+        for tid in ids:
+            add_xp(username, TASK_CREATE_XP, "task_created", tid)
+        ledger.after_commit(lambda: events.publish(username, "tasks_changed", {"added": ids}))
+
+    for i, tid in zip(positions, ids):
+        results[i] = {"index": i, "ok": True, "id": tid}
+    return results, ledger.results.get(username)
+
+
+def complete_tasks(username: str, task_ids):
+    """
+    Mark many of the user's tasks done with one UPDATE and award the summed
+    task XP as a single XP update. Per-item errors: invalid_id, duplicate,
+    not_found (missing or owned by someone else), already_done.
+    """
+    _check_batch(task_ids)
+    results, wanted = _parse_ids(task_ids)
+    owned = _owned(username, list(wanted.values()))
+    pending = [tid for tid in wanted.values() if tid in owned and not owned[tid][0]]
+
+    done, xp_result = set(), None
+    if pending:
+        with xp_ledger() as ledger:
+            def flip(ids):
+                return db.update(Task).where(
+                    Task.username == username, Task.id.in_(ids), Task.is_done.is_(False)
+                ).values(is_done=True).execution_options(synchronize_session=False)
+
+            # only the rows this call flipped earn XP (concurrent completes of the same task)
+            if db.engine.dialect.update_returning:
+                flipped = db.session.execute(flip(pending).returning(Task.id, Task.xp)).all()
+                awarded = {r.id: int(r.xp or TASK_CREATE_XP) for r in flipped}
+            else:
+                # no RETURNING: one UPDATE per task, so rowcount tells which ones flipped
+                awarded = {tid: owned[tid][1] for tid in pending if db.session.execute(flip([tid])).rowcount}
+            done = set(awarded)
+            bump_version(username)
+            # one event per task; the ledger still applies them as one XP update
+            for tid, xp in awarded.items():
+                add_xp(username, xp, "task_completed", tid)
+            ledger.after_commit(lambda: events.publish(username, "tasks_changed", {"completed": sorted(done)}))
+        xp_result = ledger.results.get(username)
+
+    for i, tid in wanted.items():
+        if tid not in owned:
+            results[i] = {"index": i, "ok": False, "id": tid, "error": "not_found"}
+        elif tid in done:
+            results[i] = {"index": i, "ok": True, "id": tid, "xp": owned[tid][1]}
+        else:
+            results[i] = {"index": i, "ok": False, "id": tid, "error": "already_done"}
+    return [results[i] for i in range(len(task_ids))], xp_result
+
+
+def delete_tasks(username: str, task_ids):
+    """
+    Delete many of the user's tasks with one DELETE. XP already earned is kept.
+    Per-item errors: invalid_id, duplicate, not_found.
+    """
+    _check_batch(task_ids)
+    results, wanted = _parse_ids(task_ids)
+    owned = _owned(username, list(wanted.values()))
+    targets = [tid for tid in wanted.values() if tid in owned]
+
+    deleted = set()
+    if targets:
+        try:
+            stmt = db.delete(Task).where(Task.username == username, Task.id.in_(targets)) \
+                .execution_options(synchronize_session=False)
+            if db.engine.dialect.delete_returning:
+                deleted = set(db.session.execute(stmt.returning(Task.id)).scalars().all())
+            else:
+                db.session.execute(stmt)
+                deleted = set(targets)
+            bump_version(username)
             db.session.commit()
-            add_xp(username, 10)
-            return True
         except Exception:
             db.session.rollback()
-            return False
-    return False
+            raise
+        events.publish(username, "tasks_changed", {"deleted": sorted(deleted)})
+
+    for i, tid in wanted.items():
+        if tid in deleted:
+            results[i] = {"index": i, "ok": True, "id": tid}
+        else:
+            results[i] = {"index": i, "ok": False, "id": tid, "error": "not_found"}
+    return [results[i] for i in range(len(task_ids))]
@@ -29,17 +29,24 @@ from .models import User
 
 def _hash_password(password: str) -> str:
     """Return password hash using werkzeug if available, else SHA256 fallback."""
+    if _USE_WERKZEUG:
+        # configured KDF, on the bounded hashing pool
+        from . import passwords
+        return passwords.hash_password(password)
     return generate_password_hash(password)
 
 
 def _verify_password(stored_hash: str, password: str) -> bool:
     """Verify password against stored hash."""
+    if _USE_WERKZEUG:
+        from . import passwords
+        return passwords.verify_password(stored_hash, password)
     return check_password_hash(stored_hash, password)
 
 
 def register_user(username: str, password: str) -> bool:
     """
-    Create a new user. Returns True on success, False on failure (e.g., username exists).
+    Create a new user and their progression row. Returns True on success, False on failure (e.g., username exists).
     """
     username = (username or "").strip()
     if not username or not password:
@@ -49,9 +56,13 @@ def register_user(username: str, password: str) -> bool:
     if User.query.filter_by(username=username).first():
         return False
 
+    from .leveling import _insert_player_if_missing
+
     user = User(username=username, password_hash=_hash_password(password))
     try:
         db.session.add(user)
+        db.session.flush()
+        _insert_player_if_missing(username)
         db.session.commit()
         return True
     except Exception:
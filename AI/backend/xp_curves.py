@@ -0,0 +1,150 @@
+# backend/xp_curves.py
+"""
+XP progression curves.
+
+A curve maps total XP to a level and back:
+- xp_for_level(level) -> total XP needed to *be* at `level`
+- level_for(xp)       -> highest level whose threshold is <= xp (O(1) / O(log n))
+- levels_for(xps)     -> vectorized level_for over a sequence (uses NumPy if installed)
+
+numpy_or_none() returns NumPy when it is installed, else None (shared with
+backend.analytics, which falls back to plain Python the same way).
+
+Curves:
+- LinearCurve(per_level=100)   threshold(L) = L * per_level (the historical curve)
+- QuadraticCurve(base=50)      threshold(L) = base * L * (L + 1), inverted with isqrt
+- TableCurve(thresholds)       precomputed table for curves without a closed form
+"""
+
+import math
+from bisect import bisect_right
+
+_numpy = False  # not imported yet; None once known to be unavailable
+
+
+def numpy_or_none():
+    """NumPy, imported on first vectorized call (it costs ~80 ms of process start), or None."""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+            _numpy = numpy
+        except Exception:  # optional: plain-Python fallback in the callers
+            _numpy = None
+    return _numpy
+
+
+class XPCurve:
+    def xp_for_level(self, level):
+        raise NotImplementedError
+
+    def level_for(self, xp):
+        raise NotImplementedError
+
+    def levels_for(self, xps):
+        """Return levels for a sequence of XP totals (NumPy array if NumPy is available)."""
+        return [self.level_for(x) for x in xps]
+
+    def xp_needed_for_next_level(self, level):
+        return self.xp_for_level(level + 1)
+
+
+class LinearCurve(XPCurve):
+    """Every level costs the same: level L is reached at L * per_level total XP."""
+
+    def __init__(self, per_level=100):
+        if per_level <= 0:
+            raise ValueError("per_level must be positive")
+        self.per_level = int(per_level)
+
+    def xp_for_level(self, level):
+        return max(0, int(level)) * self.per_level
+
+    def level_for(self, xp):
+        return max(0, int(xp or 0)) // self.per_level
+
+    def levels_for(self, xps):
+        np = numpy_or_none()
+        if np is not None:
+            arr = np.maximum(np.asarray(xps, dtype=np.int64), 0)
+            return arr // self.per_level
+        return super().levels_for(xps)
+
+
+class QuadraticCurve(XPCurve):
+    """Level L costs 2*base*L XP, so the total to reach L is base * L * (L + 1)."""
+
+    def __init__(self, base=50):
+        if base <= 0:
+            raise ValueError("base must be positive")
+        self.base = int(base)
+
+    def xp_for_level(self, level):
+        level = max(0, int(level))
+        return self.base * level * (level + 1)
+
+    def level_for(self, xp):
+        xp = max(0, int(xp or 0))
+        # solve base*L*(L+1) <= xp  ->  L = floor((sqrt(1 + 4*xp/base) - 1) / 2)
+        level = (math.isqrt(1 + (4 * xp) // self.base) - 1) // 2
+        # integer division above can be off by one at exact boundaries
+        while self.xp_for_level(level + 1) <= xp:
+            level += 1
+        while level > 0 and self.xp_for_level(level) > xp:
+            level -= 1
+        return level
+
+    def levels_for(self, xps):
+        np = numpy_or_none()
+        if np is not None:
+            arr = np.maximum(np.asarray(xps, dtype=np.int64), 0)
+            est = ((np.sqrt(1.0 + 4.0 * arr / self.base) - 1.0) // 2).astype(np.int64)
+            est += (self.base * (est + 1) * (est + 2) <= arr)
+            est -= (self.base * est * (est + 1) > arr)
+            return est
+        return super().levels_for(xps)
+
+
+class TableCurve(XPCurve):
+    """
+    Curve given as a precomputed, non-decreasing list of thresholds where
+    thresholds[L] is the total XP for level L (thresholds[0] must be 0).
+    XP beyond the last entry caps at the table's top level.
+    """
+
+    def __init__(self, thresholds):
+        thresholds = [int(t) for t in thresholds]
+        if not thresholds or thresholds[0] != 0:
+            raise ValueError("thresholds must start at 0")
+        if any(b < a for a, b in zip(thresholds, thresholds[1:])):
+            raise ValueError("thresholds must be non-decreasing")
+        self.thresholds = thresholds
+        self._np_thresholds = None
+
+    @classmethod
+    def from_function(cls, xp_for_level, max_level=1000):
+        """Precompute a table from any xp_for_level(level) callable."""
+        return cls([xp_for_level(l) for l in range(max_level + 1)])
+
+    @property
+    def max_level(self):
+        return len(self.thresholds) - 1
+
+    def xp_for_level(self, level):
+        level = max(0, int(level))
+        if level > self.max_level:
+            # unreachable level: no finite amount of XP gets there
+            return math.inf
+        return self.thresholds[level]
+
+    def level_for(self, xp):
+        return bisect_right(self.thresholds, max(0, int(xp or 0))) - 1
+
+    def levels_for(self, xps):
+        np = numpy_or_none()
+        if np is not None:
+            if self._np_thresholds is None:
+                self._np_thresholds = np.asarray(self.thresholds, dtype=np.int64)
+            arr = np.maximum(np.asarray(xps, dtype=np.int64), 0)
+            return np.searchsorted(self._np_thresholds, arr, side="right") - 1
+        return super().levels_for(xps)
@@ -1,34 +1,177 @@
-# xp_manager.py
-from datetime import date
+# backend/xp_manager.py
+"""
+Daily XP cap.
+
+Functions:
+- configure(app)   (backend.init_app; DAILY_XP_CAP, default DAILY_XP_MAX, 0 = no cap)
+- daily_cap() -> int | None
+- apply_cap(xp_events, awards) -> (xp_events, awards)   (XP ledger commit; no commit)
+- daily_status(username) -> {"cap", "earned", "remaining", "day"}
+- forget(usernames)   (after a rolled-back commit)
+- award_xp(username, amount, source="other", ref_id=None) -> XP actually awarded
+
+Each user has one row in daily_xp (models.DailyXP): the UTC day it counts
+for and the capped XP earned that day. It expires lazily: the upsert that
+adds an award resets the count when the stored day is not today, so nothing
+has to sweep old days. The upsert is atomic and clamps at the cap in SQL,
+and returns how much of the request it granted, so concurrent awards in
+several processes never exceed the cap.
+
+The cap adds no read to the award path: the upsert that records the award
+is also what decides the grant, and it runs inside the ledger's existing
+transaction. An in-process cache of (day, earned) answers for users already
+at the cap, whose awards then touch no counter row at all. Counts only grow
+within a day, so a stale cache entry can only under-report; the database
+has the final word.
+
+Awards from UNCAPPED_SOURCES (imports, the legacy seed, resets) and
+negative amounts are never capped. The cap is on by default at DAILY_XP_MAX
+(100) XP per user per UTC day; set DAILY_XP_CAP (env SAM_AI_DAILY_XP_CAP) to
+change it, 0 to turn it off.
+"""
+
+from datetime import datetime
+from sqlalchemy import case
 from backend import db
-from backend.models import User
+from .leveling import LRUStatsCache
+from .models import DailyXP
 
 DAILY_XP_MAX = 100
+UNCAPPED_SOURCES = ("import", "legacy", "reset")
+CACHE_SIZE = 10000
+CACHE_TTL = 3600.0
+
+_settings = {"cap": DAILY_XP_MAX}
+_cache = LRUStatsCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)   # username -> {"day", "xp"}
+
+
+def configure(app):
+    cap = app.config.get("DAILY_XP_CAP", DAILY_XP_MAX)
+    _settings["cap"] = int(cap) if cap else None
+    _cache.clear()
+
+
+def daily_cap():
+    return _settings["cap"]
+
+
+def _today():
+    return datetime.utcnow().date()
+
+
+def forget(usernames):
+    for username in usernames:
+        _cache.delete(username)
 
-def reset_daily_if_needed(user: User):
-    """Reset user's daily_xp if last_daily_reset is not today."""
-    today = date.today()
-    if user.last_daily_reset != today:
-        user.daily_xp = 0
-        user.last_daily_reset = today
 
-def award_xp(user: User, amount: int):
+def _cached_earned(username, today):
+    entry = _cache.get(username)
+    if entry is None or entry["day"] != today.isoformat():
+        return None
+    return entry["xp"]
+
+
+def _upsert(username, requested, cap, today):
+    """Add up to `requested` XP to today's count, clamped at cap. Returns (granted, earned today)."""
+    table = DailyXP.__table__
+    dialect = db.session.get_bind().dialect
+    same_day = table.c.day == today
+    earned = case((same_day, table.c.xp), else_=0)
+    new_xp = case((earned + requested > cap, cap), else_=earned + requested)
+
+    if dialect.name in ("sqlite", "postgresql") and dialect.insert_returning:
+        if dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        first = min(requested, cap)
+        stmt = dialect_insert(table).values(username=username, day=today, xp=first, granted=first)
+        # SET expressions all see the pre-update row, so granted = new - old
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["username"],
+            set_={"day": today, "xp": new_xp, "granted": new_xp - earned},
+        ).returning(table.c.granted, table.c.xp)
+        row = db.session.execute(stmt).one()
+        return int(row.granted), int(row.xp)
+
+    # other databases: lock the row, then write
+    row = db.session.execute(
+        db.select(table.c.day, table.c.xp).where(table.c.username == username).with_for_update()
+    ).first()
+    before = int(row.xp) if row is not None and row.day == today else 0
+    after = min(before + requested, cap)
+    values = dict(day=today, xp=after, granted=after - before)
+    if row is None:
+        db.session.execute(table.insert().values(username=username, **values))
+    else:
+        db.session.execute(table.update().where(table.c.username == username).values(**values))
+    return after - before, after
+
+
+def apply_cap(xp_events, awards):
     """
-    Award XP to user enforcing daily cap.
-    Returns the actual awarded amount.
+    Clamp a ledger's awards to what is left of each user's daily allowance.
+    xp_events are the ledger's event dicts (in award order; capped events are
+    trimmed from the last one that still fits, dropped when nothing is left),
+    awards its {username: total}. Returns the adjusted (xp_events, awards).
     """
-    if user is None:
-        raise ValueError("No user provided to award_xp")
-
-    reset_daily_if_needed(user)
-    current_daily = user.daily_xp or 0
-    remaining = DAILY_XP_MAX - current_daily
-    if remaining <= 0:
-        awarded = 0
-    else:
-        awarded = min(amount, remaining)
-        user.daily_xp = current_daily + awarded
-        user.xp = (user.xp or 0) + awarded
+    cap = _settings["cap"]
+    if not cap:
+        return xp_events, awards
+
+    requested = {}
+    for e in xp_events:
+        if e["amount"] > 0 and e["source"] not in UNCAPPED_SOURCES:
+            requested[e["username"]] = requested.get(e["username"], 0) + e["amount"]
+    if not requested:
+        return xp_events, awards
+
+    today = _today()
+    allowance = {}
+    for username, amount in requested.items():
+        if (_cached_earned(username, today) or 0) >= cap:
+            allowance[username] = 0    # known to be capped: no counter write
+            continue
+        granted, earned = _upsert(username, amount, cap, today)
+        allowance[username] = granted
+        _cache.set(username, {"day": today.isoformat(), "xp": earned})
+
+    kept, awards = [], dict(awards)
+    for e in xp_events:
+        username = e["username"]
+        if username in allowance and e["amount"] > 0 and e["source"] not in UNCAPPED_SOURCES:
+            amount = min(e["amount"], allowance[username])
+            allowance[username] -= amount
+            awards[username] -= e["amount"] - amount
+            if not amount:
+                continue
+            e = dict(e, amount=amount)
+        kept.append(e)
+    return kept, awards
+
+
+def daily_status(username):
+    """Today's capped XP for username: {"cap", "earned", "remaining", "day"} (cap None = unlimited)."""
+    cap, today = _settings["cap"], _today()
+    earned = _cached_earned(username, today)
+    if earned is None:
+        row = db.session.execute(
+            db.select(DailyXP.day, DailyXP.xp).where(DailyXP.username == username)
+        ).first()
+        earned = int(row.xp) if row is not None and row.day == today else 0
+        _cache.set(username, {"day": today.isoformat(), "xp": earned})
+    return {
+        "cap": cap,
+        "earned": earned,
+        "remaining": max(0, cap - earned) if cap else None,
+        "day": today.isoformat(),
+    }
+
 
-    db.session.commit()
-    return awarded
+def award_xp(username, amount, source="other", ref_id=None):
+    """Award XP through leveling.add_xp (cap applied there). Returns the XP actually awarded."""
+    from .leveling import add_xp
+    result = add_xp(username, amount, source, ref_id)
+    if not result.get("ok"):
+        return 0
+    return int(result.get("xp_added", 0))
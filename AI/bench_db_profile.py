@@ -0,0 +1,88 @@
+# bench_db_profile.py
+"""
+Requests/sec under concurrent writers for each database profile
+(see backend/database.py).
+
+Each profile gets a throwaway SQLite file. W writer threads POST /api/tasks
+while R reader threads GET /api/state, all through the Flask test client.
+
+Usage: python bench_db_profile.py [writers] [readers] [requests_per_thread]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import main_app
+
+
+def bench(profile, writers=4, readers=4, per_thread=100):
+    tmpdir = tempfile.mkdtemp(prefix=f"sam_ai_bench_{profile}_")
+    uri = "sqlite:///" + os.path.join(tmpdir, "bench.db").replace("\\", "/")
+    app = main_app.create_app({"SQLALCHEMY_DATABASE_URI": uri, "SCHEMA_MODE": "auto", "DB_PROFILE": profile,
+                               "DAILY_XP_CAP": 0})
+    app.logger.disabled = True
+
+    def client_for(username):
+        c = app.test_client()
+        c.post("/register", data={"username": username, "password": "pw"})
+        c.post("/login", data={"username": username, "password": "pw"})
+        return c
+
+    clients = [client_for(f"bench_{i}") for i in range(writers + readers)]
+    errors = []
+    gate = threading.Barrier(writers + readers)
+
+    def writer(c):
+        gate.wait()
+        for i in range(per_thread):
+            r = c.post("/api/tasks", json={"title": f"task {i}"})
+            if r.status_code != 200:
+                errors.append(r.status_code)
+
+    def reader(c):
+        gate.wait()
+        for _ in range(per_thread):
+            r = c.get("/api/state")
+            if r.status_code != 200:
+                errors.append(r.status_code)
+
+    threads = [threading.Thread(target=writer, args=(c,)) for c in clients[:writers]]
+    threads += [threading.Thread(target=reader, args=(c,)) for c in clients[writers:]]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    total = (writers + readers) * per_thread
+    return total / elapsed, len(errors)
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    per_thread = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    # silence the DEBUG prints in the login view
+    import builtins
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        results = {p: bench(p, writers, readers, per_thread) for p in ("default", "performance")}
+    finally:
+        builtins.print = real_print
+
+    print(f"writers={writers} readers={readers} requests/thread={per_thread}")
+    for name, (rps, errs) in results.items():
+        print(f"  {name:<12} {rps:8.1f} req/s   errors={errs}")
+    base = results["default"][0]
+    if base:
+        print(f"  speedup      {results['performance'][0] / base:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# bench_leaderboard.py
+"""
+Leaderboard benchmark: the in-process rank index vs SQL on every request.
+
+Fills a throwaway SQLite database with N players (random XP), then reports:
+- rebuild : cold start, one streaming scan of player_stats into the index
+- per-operation latency (p50 / p95 / max, microseconds), index vs SQL:
+    rank     standing(username)        vs COUNT(*) WHERE xp > ? (+ total, + below)
+    top10    top(10)                   vs ORDER BY xp DESC, username LIMIT 10
+    page     top(10, offset=N/2)       vs the same with OFFSET N/2
+    around   around(username, 5)       vs rank query + ORDER BY ... LIMIT 11 OFFSET rank-6
+    pct      threshold(10)             vs ORDER BY xp DESC LIMIT 1 OFFSET N/10
+    update   note_player (add_xp path) (index only; the SQL side has nothing to maintain)
+
+Usage: python bench_leaderboard.py [--users 100000] [--ops 2000] [--index]
+       --index also creates an index on player_stats.xp for the SQL side
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from main_app import create_app
+
+
+def _stats(samples):
+    xs = sorted(samples)
+    return statistics.median(xs) * 1e6, xs[int(0.95 * (len(xs) - 1))] * 1e6, xs[-1] * 1e6
+
+
+def _time(fn, args_list):
+    samples = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _fill(db, PlayerStats, users, chunk=10000):
+    rng = random.Random(42)
+    for start in range(0, users, chunk):
+        db.session.execute(db.insert(PlayerStats), [
+            {"username": f"user{i:07d}", "xp": int(rng.paretovariate(1.2) * 50), "level": 0,
+             "strength": 1, "memory": 1, "stamina": 1}
+            for i in range(start, min(users, start + chunk))
+        ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rank index vs SQL leaderboard queries")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--ops", type=int, default=2000, help="samples per operation")
+    parser.add_argument("--index", action="store_true", help="index player_stats.xp for the SQL side")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="sam_ai_leaderboard_")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(tmpdir, "lb.db"),
+                      "SCHEMA_MODE": "auto", "LEADERBOARD_REFRESH": 0})
+    try:
+        with app.app_context():
+            from backend import db, leaderboard
+            from backend.leveling import PlayerStats
+
+            t0 = time.perf_counter()
+            _fill(db, PlayerStats, args.users)
+            print(f"{args.users} players written in {time.perf_counter() - t0:.1f}s")
+            if args.index:
+                db.session.execute(text("CREATE INDEX ix_bench_player_xp ON player_stats (xp)"))
+                db.session.commit()
+
+            t0 = time.perf_counter()
+            loaded = leaderboard.rebuild()
+            print(f"rebuild: {loaded} players in {(time.perf_counter() - t0) * 1000:.0f} ms (one streaming scan)")
+
+            rng = random.Random(7)
+            names = [(f"user{rng.randrange(args.users):07d}",) for _ in range(args.ops)]
+            xps = {r.username: r.xp for r in db.session.execute(db.select(PlayerStats.username, PlayerStats.xp))}
+            conn = db.session.connection()
+
+            def sql_rank(username):
+                xp = xps[username]
+                above = conn.execute(text("SELECT COUNT(*) FROM player_stats WHERE xp > :xp"), {"xp": xp}).scalar()
+                conn.execute(text("SELECT COUNT(*) FROM player_stats WHERE xp < :xp"), {"xp": xp}).scalar()
+                conn.execute(text("SELECT COUNT(*) FROM player_stats")).scalar()
+                return above + 1
+
+            def sql_page(offset):
+                return conn.execute(text(
+                    "SELECT username, xp, level FROM player_stats ORDER BY xp DESC, username LIMIT 10 OFFSET :o"
+                ), {"o": offset}).all()
+
+            def sql_around(username):
+                rank = sql_rank(username)
+                return conn.execute(text(
+                    "SELECT username, xp, level FROM player_stats ORDER BY xp DESC, username LIMIT 11 OFFSET :o"
+                ), {"o": max(0, rank - 6)}).all()
+
+            def sql_pct():
+                return conn.execute(text(
+                    "SELECT xp FROM player_stats ORDER BY xp DESC LIMIT 1 OFFSET :o"
+                ), {"o": args.users // 10}).scalar()
+
+            sql_ops = max(20, args.ops // 20)   # SQL scans are slow; fewer samples suffice
+            rows = [
+                ("rank", _time(leaderboard.standing, names), _time(sql_rank, names[:sql_ops])),
+                ("top10", _time(leaderboard.top, [(10,)] * args.ops), _time(sql_page, [(0,)] * sql_ops)),
+                ("page", _time(leaderboard.top, [(10, args.users // 2)] * args.ops),
+                 _time(sql_page, [(args.users // 2,)] * sql_ops)),
+                ("around", _time(leaderboard.around, names), _time(sql_around, names[:sql_ops])),
+                ("pct", _time(leaderboard.threshold, [(10,)] * args.ops), _time(sql_pct, [()] * sql_ops)),
+                ("update", _time(leaderboard.note_player,
+                                 [(u, xps[u] + rng.randint(1, 500), 0) for (u,) in names]), None),
+            ]
+            print(f"\n{'op':<8} {'index p50':>10} {'p95':>8} {'max':>8}   {'sql p50':>10} {'p95':>8} {'max':>8}  (us)")
+            for op, idx, sql in rows:
+                line = "{:<8} {:>10.1f} {:>8.1f} {:>8.1f}".format(op, *_stats(idx))
+                if sql:
+                    line += "   {:>10.1f} {:>8.1f} {:>8.1f}".format(*_stats(sql))
+                print(line)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# bench_startup.py
+"""
+Cold-start benchmark: how long a fresh worker takes to serve its first request.
+
+Each sample is a new Python process (like a recycled gunicorn worker without
+--preload) against a throwaway, already-migrated SQLite database. It reports:
+- import   : `import main_app`
+- create   : create_app() (config, engine, module resolution, schema step)
+- first    : first GET /login through the test client
+for each schema step:
+- off      : SCHEMA_MODE="off" (no DB access at start; pre-fork workers)
+- check    : SCHEMA_MODE="check" (one SELECT on schema_version)
+- reflect  : the old behaviour, create_all() + index reflection on every start
+
+It then forks workers from a parent that already built the app (gunicorn
+--preload) and reports fork -> first response.
+
+Usage: python bench_startup.py [samples]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+
+CHILD = r"""
+import json, sys, time, builtins
+t0 = time.perf_counter()
+import main_app
+t1 = time.perf_counter()
+mode = sys.argv[2]
+app = main_app.create_app({"SQLALCHEMY_DATABASE_URI": sys.argv[1],
+                           "SCHEMA_MODE": "off" if mode == "reflect" else mode})
+if mode == "reflect":
+    from backend import db
+    from backend.database import ensure_indexes
+    with app.app_context():
+        db.create_all()
+        ensure_indexes(db.metadata)
+t2 = time.perf_counter()
+builtins.print = lambda *a, **k: None
+app.test_client().get("/login")
+t3 = time.perf_counter()
+sys.stdout.write(json.dumps({"import": t1 - t0, "create": t2 - t1, "first": t3 - t2}))
+"""
+
+
+def _ms(xs):
+    return f"{statistics.median(xs) * 1000:7.1f}"
+
+
+def cold_starts(uri, mode, samples):
+    runs = []
+    for _ in range(samples):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD, uri, mode],
+            cwd=HERE, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return runs
+
+
+def preforked(uri, samples):
+    """fork() from a parent holding a built app; time until each child has served one request."""
+    import builtins
+    import main_app
+
+    app = main_app.create_app({"SQLALCHEMY_DATABASE_URI": uri, "SCHEMA_MODE": "check"})
+    real_print = builtins.print
+    timings = []
+    for _ in range(samples):
+        r, w = os.pipe()
+        t0 = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            builtins.print = lambda *a, **k: None
+            from backend import db
+            with app.app_context():
+                db.engine.dispose(close=False)  # never share pooled connections across fork
+            app.test_client().get("/login")
+            os.write(w, b"x")
+            os._exit(0)
+        os.close(w)
+        os.read(r, 1)
+        timings.append(time.perf_counter() - t0)
+        os.close(r)
+        os.waitpid(pid, 0)
+    builtins.print = real_print
+    return timings
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    tmpdir = tempfile.mkdtemp(prefix="sam_ai_startup_")
+    uri = "sqlite:///" + os.path.join(tmpdir, "startup.db").replace("\\", "/")
+    subprocess.run([sys.executable, "migrate.py"], cwd=HERE, check=True, capture_output=True,
+                   env=dict(os.environ, SAM_AI_DATABASE_URL=uri))
+
+    print(f"median of {samples} cold starts (ms)")
+    print(f"  {'mode':<8} {'import':>7} {'create':>7} {'first':>7} {'total':>7}")
+    for mode in ("off", "check", "reflect"):
+        runs = cold_starts(uri, mode, samples)
+        totals = [r["import"] + r["create"] + r["first"] for r in runs]
+        print(f"  {mode:<8} {_ms([r['import'] for r in runs])} {_ms([r['create'] for r in runs])} "
+              f"{_ms([r['first'] for r in runs])} {_ms(totals)}")
+
+    if hasattr(os, "fork"):
+        print(f"preloaded parent, fork -> first response: {_ms(preforked(uri, samples))} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from sqlalchemy import inspect
 from backend.extentions import db
 from main_app import create_app
 
-app = create_app()
+app = create_app({"SCHEMA_MODE": "off"})  # inspection only: no schema check or migration
 with app.app_context():
     print("Engine URL:", db.engine.url)
     insp = inspect(db.engine)
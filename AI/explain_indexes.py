@@ -0,0 +1,99 @@
+# explain_indexes.py
+"""
+EXPLAIN-based check that the planner uses the composite / partial indexes for
+the hot backend queries (SQLite: EXPLAIN QUERY PLAN).
+
+The listings are checked as the app runs them: the statements
+pagination.keyset_query builds (ORDER BY ts DESC, id DESC LIMIT n+1), for the
+first page and for a page after a cursor, rendered with their parameters.
+
+Runs against a throwaway SQLite database seeded with a few hundred rows.
+Exits non-zero if any query falls back to a scan or a temp B-tree sort.
+
+Usage: python explain_indexes.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+import main_app
+
+PAGE_SIZE = 5
+
+# (label, model name, cursor scope, timestamp column, index) of each keyset-paginated listing
+PAGED = [
+    ("tasks by user, newest first", "Task", "tasks", "created_at", "ix_tasks_username_created_at"),
+    ("quests by user, newest first", "Quest", "quests", "created_at", "ix_quests_username_created_at"),
+    ("study sessions by user, newest first", "AcademicLog", "academic", "date", "ix_academic_logs_username_date"),
+]
+
+CHECKS = [
+    (
+        "active study session",
+        "SELECT * FROM academic_logs WHERE username = :u AND end_time IS NULL",
+        "ix_academic_logs_active",
+    ),
+]
+
+
+def seed(db):
+    from backend.models import Task, Quest, AcademicLog
+    now = datetime.utcnow()
+    for u in range(20):
+        name = f"user{u}"
+        for i in range(20):
+            ts = now - timedelta(minutes=i)
+            db.session.add(Task(username=name, title=f"t{i}", created_at=ts))
+            db.session.add(Quest(username=name, title=f"q{i}", created_at=ts))
+            db.session.add(AcademicLog(username=name, subject="s", hours=1.0, date=ts,
+                                       start_time=ts, end_time=ts + timedelta(hours=1)))
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+
+
+def paged_checks(db, username):
+    """(label, sql, index) for the first page and the second (cursor) page of each listing."""
+    from backend import models
+    from backend.pagination import keyset_page, keyset_query
+
+    out = []
+    for label, model_name, scope, ts_name, index in PAGED:
+        model = getattr(models, model_name)
+        ts_col = getattr(model, ts_name)
+
+        def base():
+            return model.query.filter_by(username=username)
+
+        _, cursor = keyset_page(base(), scope, ts_col, model.id, limit=PAGE_SIZE)
+        assert cursor, "seed() must give each user more than PAGE_SIZE rows"
+        for page, cur in (("first page", None), ("cursor page", cursor)):
+            query, _ = keyset_query(base(), scope, ts_col, model.id, cursor=cur, limit=PAGE_SIZE)
+            sql = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+            out.append((f"{label} ({page})", str(sql), index))
+    return out
+
+
+def main():
+    tmpdir = tempfile.mkdtemp(prefix="sam_ai_explain_")
+    uri = "sqlite:///" + os.path.join(tmpdir, "explain.db").replace("\\", "/")
+    app = main_app.create_app({"SQLALCHEMY_DATABASE_URI": uri, "SCHEMA_MODE": "auto"})
+    from backend.extentions import db
+
+    failures = 0
+    with app.app_context():
+        seed(db)
+        for label, sql, index in paged_checks(db, "user3") + CHECKS:
+            plan = db.session.execute(text("EXPLAIN QUERY PLAN " + sql), {"u": "user3"}).fetchall()
+            details = " | ".join(str(row[-1]) for row in plan)
+            ok = index in details and "TEMP B-TREE" not in details
+            failures += not ok
+            print(f"[{'ok' if ok else 'FAIL'}] {label}: {details}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -1,27 +1,24 @@
 # inspect_users.py
-import sqlite3, os
-DB_PATH = r"C:\Users\ADMIN\Desktop\AI\backend\data\sam_ai.db"   # <-- change if different
-print("Checking DB path:", DB_PATH)
-if not os.path.exists(DB_PATH):
-    print("DB file not found.")
-else:
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
-    print("Tables:", cur.fetchall())
-    try:
-        cur.execute("PRAGMA table_info(users);")
-        print("users table schema:", cur.fetchall())
-    except Exception as e:
-        print("PRAGMA users error:", e)
-    try:
-        cur.execute("SELECT id, username, password FROM users LIMIT 20;")
-        rows = cur.fetchall()
-        print("users rows (id, username, password):")
+"""Print the users table of the configured database (SQLite file or SAM_AI_DATABASE_URL)."""
+from sqlalchemy import text
+from main_app import create_app
+from backend.extentions import db
+from backend.database import list_tables, table_exists, column_names
+
+app = create_app({"SCHEMA_MODE": "off"})  # inspection only: no schema check or migration
+
+with app.app_context():
+    print("Checking DB:", db.engine.url.render_as_string(hide_password=True))
+    print("Tables:", list_tables())
+    if not table_exists("users"):
+        print("-> users table not found.")
+    else:
+        cols = column_names("users")
+        print("users table columns:", cols)
+        wanted = [c for c in ("id", "username", "password_hash", "password") if c in cols]
+        rows = db.session.execute(text(f"SELECT {', '.join(wanted)} FROM users LIMIT 20")).fetchall()
+        print(f"users rows ({', '.join(wanted)}):")
         for r in rows:
-            print(r)
+            print(tuple(r))
         if not rows:
             print("-> users table is empty.")
-    except Exception as e:
-        print("SELECT users failed:", e)
-    conn.close()
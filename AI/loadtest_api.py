@@ -0,0 +1,223 @@
+# loadtest_api.py
+"""
+Load test: many idle dashboard streams plus polling reads, WSGI vs ASGI.
+
+For each server it starts a fresh process on a throwaway SQLite database,
+registers a user, then:
+1. opens N concurrent GET /api/stream connections and counts how many get
+   their "hello" frame (= accepted and served) within the connect timeout,
+2. while those stay open, fires R GET /api/state requests from C concurrent
+   clients and reports p50 / p95 / max latency and errors,
+3. reports the server's thread count and resident memory.
+
+Servers:
+- wsgi : main_app under gunicorn (gthread, 1 worker x --threads) when gunicorn
+         is installed, else the threaded werkzeug server
+- asgi : asgi_app under uvicorn (one process, one event loop)
+
+Usage: python loadtest_api.py [--streams 2000] [--requests 500] [--concurrency 20]
+                              [--threads 32] [--only wsgi|asgi]
+Raise the open-file limit first for large --streams (ulimit -n 65536).
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+HOST = "127.0.0.1"
+
+WERKZEUG_CHILD = r"""
+import sys
+from main_app import create_app
+create_app().run(host="127.0.0.1", port=int(sys.argv[1]), threaded=True)
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def _server_cmd(kind, port, threads):
+    if kind == "asgi":
+        return [sys.executable, "-m", "uvicorn", "--factory", "asgi_app:create_asgi_app",
+                "--host", HOST, "--port", str(port), "--log-level", "warning",
+                "--limit-concurrency", "100000", "--backlog", "4096"]
+    if shutil.which("gunicorn"):
+        return ["gunicorn", "-k", "gthread", "-w", "1", "--threads", str(threads),
+                "-b", f"{HOST}:{port}", "--backlog", "4096", "main_app:create_app()"]
+    return [sys.executable, "-c", WERKZEUG_CHILD, str(port)]
+
+
+def _proc_status(pid):
+    """(threads, rss MiB) from /proc, or (None, None) off Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            text = f.read()
+    except OSError:
+        return None, None
+    threads = int(re.search(r"^Threads:\s+(\d+)", text, re.M).group(1))
+    rss = int(re.search(r"^VmRSS:\s+(\d+)", text, re.M).group(1)) / 1024
+    return threads, rss
+
+
+# ------------------------
+# Minimal HTTP/1.1 client on asyncio streams (no client library needed)
+# ------------------------
+async def _request(port, method, path, body=b"", headers=None):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {HOST}:{port}", "Connection: close",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, head.decode("latin-1"), payload
+
+
+async def _login(port, username="loadtest", password="loadtest-pw"):
+    form = f"username={username}&password={password}".encode()
+    hdrs = {"Content-Type": "application/x-www-form-urlencoded"}
+    await _request(port, "POST", "/register", form, hdrs)
+    _, head, _ = await _request(port, "POST", "/login", form, hdrs)
+    m = re.search(r"^Set-Cookie: (session=[^;]+)", head, re.M | re.I)
+    if not m:
+        raise RuntimeError("login failed: no session cookie")
+    return m.group(1)
+
+
+async def _open_stream(port, cookie, opened, timeout):
+    """Open one SSE connection and wait for its hello frame; returns the writer or None."""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(HOST, port), timeout)
+        writer.write(f"GET /api/stream HTTP/1.1\r\nHost: {HOST}:{port}\r\nCookie: {cookie}\r\n\r\n".encode())
+        await writer.drain()
+        await asyncio.wait_for(reader.readuntil(b"event: hello"), timeout)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return None
+    opened.append(writer)
+    return writer
+
+
+async def _poll_state(port, cookie, total, concurrency):
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        for _ in remaining:
+            t0 = time.perf_counter()
+            try:
+                status, _, _ = await asyncio.wait_for(
+                    _request(port, "GET", "/api/state", headers={"Cookie": cookie}), 30)
+            except (OSError, asyncio.TimeoutError):
+                status = None
+            if status == 200:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors
+
+
+async def _run(port, pid, args):
+    cookie = await _login(port)
+    opened = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_open_stream(port, cookie, opened, args.connect_timeout)
+                           for _ in range(args.streams)))
+    open_secs = time.perf_counter() - t0
+    threads, rss = _proc_status(pid)
+
+    latencies, errors = await _poll_state(port, cookie, args.requests, args.concurrency)
+    for w in opened:
+        w.close()
+    return {
+        "streams": len(opened), "open_secs": open_secs, "threads": threads, "rss": rss,
+        "latencies": latencies, "errors": errors,
+    }
+
+
+def _wait_listening(port, proc, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            socket.create_connection((HOST, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def bench(kind, args):
+    tmpdir = tempfile.mkdtemp(prefix="sam_ai_load_")
+    env = dict(os.environ, SAM_AI_DATABASE_URL="sqlite:///" + os.path.join(tmpdir, "load.db"))
+    subprocess.run([sys.executable, "migrate.py"], cwd=HERE, check=True, capture_output=True, env=env)
+    port = _free_port()
+    cmd = _server_cmd(kind, port, args.threads)
+    proc = subprocess.Popen(cmd, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_listening(port, proc)
+        result = asyncio.run(_run(port, proc.pid, args))
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    result["server"] = os.path.basename(cmd[0]) if kind == "wsgi" else "uvicorn"
+    return result
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:8.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WSGI vs ASGI load test for the JSON API")
+    parser.add_argument("--streams", type=int, default=2000, help="idle /api/stream connections")
+    parser.add_argument("--requests", type=int, default=500, help="GET /api/state requests")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent polling clients")
+    parser.add_argument("--threads", type=int, default=32, help="gunicorn gthread threads")
+    parser.add_argument("--connect-timeout", type=float, default=20.0)
+    parser.add_argument("--only", choices=("wsgi", "asgi"))
+    args = parser.parse_args()
+
+    print(f"{args.streams} idle streams, {args.requests} x GET /api/state at concurrency {args.concurrency}")
+    print(f"  {'variant':<16} {'streams':>8} {'open s':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+          f"{'errors':>6} {'threads':>7} {'rss MiB':>8}")
+    for kind in ("wsgi", "asgi"):
+        if args.only and kind != args.only:
+            continue
+        r = bench(kind, args)
+        lat = sorted(r["latencies"])
+        if lat:
+            p50, p95, worst = statistics.median(lat), lat[int(0.95 * (len(lat) - 1))], lat[-1]
+            timing = f"{_ms(p50)} {_ms(p95)} {_ms(worst)}"
+        else:
+            timing = f"{'-':>8} {'-':>8} {'-':>8}"
+        print(f"  {kind + ' (' + r['server'] + ')':<16} {r['streams']:>8} {r['open_secs']:>7.1f} {timing} "
+              f"{r['errors']:>6} {r['threads'] or '-':>7} {r['rss'] or 0:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
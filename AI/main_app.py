@@ -2,9 +2,11 @@
 import os
 from datetime import datetime
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash, current_app
+from flask import Response, stream_with_context
 
 # backend single DB handle and initializer
 from backend import db, init_app as backend_init_app
+from backend.database import configure_engine, install_engine_hooks, database_uri_from_env, pool_settings_from_env
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DB_DIR = os.path.join(BASE_DIR, "backend", "data")
@@ -12,22 +14,50 @@ DB_PATH = os.path.join(DB_DIR, "sam_ai.db")
 os.makedirs(DB_DIR, exist_ok=True)
 
 
-def create_app():
+def create_app(config=None):
+    """
+    Build the Flask app. `config` may be a dict or a config object/import path
+    (anything app.config.from_object accepts); it overrides environment settings:
+      SAM_AI_DATABASE_URL / DATABASE_URL  -> SQLALCHEMY_DATABASE_URI (default: bundled SQLite file)
+      SAM_AI_DB_POOL_SIZE, SAM_AI_DB_MAX_OVERFLOW, SAM_AI_DB_POOL_RECYCLE, SAM_AI_DB_POOL_PRE_PING
+      SAM_AI_SCHEMA_MODE                  -> SCHEMA_MODE: "check" (default), "auto" (development) or "off"
+      SAM_AI_PASSWORD_HASH_METHOD         -> PASSWORD_HASH_METHOD (see backend.passwords)
+      SAM_AI_EXPOSE_METRICS=1             -> EXPOSE_METRICS: serve /_metrics/passwords
+      SAM_AI_DAILY_XP_CAP                 -> DAILY_XP_CAP: XP per user per UTC day (default 100; 0 = no cap)
+    Schema creation/upgrades run via `python migrate.py` (or SCHEMA_MODE "auto"); see backend.migrations.
+    """
     app = Flask(__name__, instance_relative_config=False)
 
     # Secret: prefer environment variable; fallback for dev
     app.secret_key = os.environ.get("SAM_AI_SECRET", "hameed_change_this_for_prod")
 
-    # Use absolute SQLite path (three slashes + absolute path)
+    # Use absolute SQLite path (three slashes + absolute path) unless a server DB is configured
     abs_db_path = DB_PATH.replace("\\", "/")
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{abs_db_path}"
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri_from_env() or f"sqlite:///{abs_db_path}"
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config.update(pool_settings_from_env())
+    app.config["SCHEMA_MODE"] = os.environ.get("SAM_AI_SCHEMA_MODE", "check")
+    if os.environ.get("SAM_AI_PASSWORD_HASH_METHOD"):
+        app.config["PASSWORD_HASH_METHOD"] = os.environ["SAM_AI_PASSWORD_HASH_METHOD"]
+    app.config["EXPOSE_METRICS"] = os.environ.get("SAM_AI_EXPOSE_METRICS", "") in ("1", "true", "yes")
+    if os.environ.get("SAM_AI_DAILY_XP_CAP"):
+        app.config["DAILY_XP_CAP"] = int(os.environ["SAM_AI_DAILY_XP_CAP"])
+
+    if config is not None:
+        if isinstance(config, dict):
+            app.config.update(config)
+        else:
+            app.config.from_object(config)
+
+    # Engine profile (WAL, pragmas, pool) must be in config before init_app builds the engine
+    configure_engine(app)
 
     # Initialize DB with app
     db.init_app(app)
 
-    # Let backend package perform its initialization inside app context (models import / create_all)
+    # Let backend package perform its initialization inside app context (models import, schema version check)
     with app.app_context():
+        install_engine_hooks(app, db.engine)
         try:
             backend_init_app(app)
         except Exception as e:
@@ -35,6 +65,14 @@ def create_app():
             print("[ERROR] backend.init_app failed:", e)
             raise
 
+    # Backend modules are resolved once here, not by a lazy import in every request
+    from backend import (
+        auth, state as state_mod, task_tracker, academic_tracker, quest_system,
+        leveling, events, export, passwords, analytics, leaderboard,
+    )
+    from backend.models import AcademicLog
+    from backend.pagination import DEFAULT_PAGE_SIZE
+
     # ---------------- Routes ----------------
 
     @app.route("/")
@@ -50,9 +88,10 @@ def create_app():
         if request.method == "POST":
             username = request.form.get("username", "").strip()
             password = request.form.get("password", "")
-            from backend import auth
             try:
-                success = auth.register_user(username, password)
+                success = auth.register_user(username, password, remote_addr=request.remote_addr)
+            except (passwords.RateLimited, passwords.PasswordPoolBusy) as e:
+                return _auth_refused("register.html", e)
             except Exception as e:
                 current_app.logger.exception("auth.register_user failed")
                 success = False
@@ -63,6 +102,18 @@ def create_app():
             return render_template("register.html", error="Username exists or invalid input")
         return render_template("register.html")
 
+    def _auth_refused(template, exc):
+        """429 (rate limited) or 503 (hashing pool full) page with Retry-After."""
+        if isinstance(exc, passwords.RateLimited):
+            retry = max(1, int(exc.retry_after + 0.999))
+            message, status = f"Too many attempts. Try again in {retry} seconds.", 429
+        else:
+            retry = 1
+            message, status = "Server busy, please try again.", 503
+        resp = current_app.make_response((render_template(template, error=message), status))
+        resp.headers["Retry-After"] = str(retry)
+        return resp
+
     @app.route("/login", methods=["GET", "POST"])
     def login():
         if request.method == "POST":
@@ -71,27 +122,22 @@ def create_app():
             username = (raw_username or "").strip()
             password = raw_password or ""
 
-            from backend import auth as _auth_mod
-            auth = _auth_mod
-
             # Helpful debug prints for dev (remove in prod)
             print("DEBUG(web): /login POST received", {"username": username, "has_password": bool(password)})
+            # one lookup: the row that verifies the password also seeds the identity cache
             try:
-                user_obj = auth.get_user(username)
-                print("DEBUG(web): auth.get_user returned:", user_obj)
-            except Exception as e:
-                print("DEBUG(web): auth.get_user raised:", type(e).__name__, e)
-
-            try:
-                ok = auth.login_user(username, password)
+                user_obj = auth.authenticate(username, password, remote_addr=request.remote_addr)
+            except (passwords.RateLimited, passwords.PasswordPoolBusy) as e:
+                return _auth_refused("login.html", e)
             except Exception as e:
-                print("DEBUG(web): auth.login_user raised:", type(e).__name__, e)
-                ok = False
+                print("DEBUG(web): auth.authenticate raised:", type(e).__name__, e)
+                user_obj = None
 
-            print(f"DEBUG(web): auth.login_user returned: {ok}")
+            print("DEBUG(web): auth.authenticate returned:", user_obj)
 
-            if ok:
-                session["username"] = username
+            if user_obj is not None:
+                session["username"] = user_obj.username
+                session["user_id"] = user_obj.id
                 session.permanent = True
                 return redirect(url_for("dashboard"))
 
@@ -102,192 +148,179 @@ def create_app():
     @app.route("/logout")
     def logout():
         session.pop("username", None)
+        session.pop("user_id", None)
         return redirect(url_for("login"))
 
     @app.route("/dashboard")
     def dashboard():
-        username = session.get("username")
+        username = _session_username()
         if not username:
             return redirect(url_for("login"))
 
-        # Lazy imports
+        # user, stats and the first page of tasks, quests and study sessions in two SQL statements
         try:
-            import backend.auth as auth
-            from backend import task_tracker, academic_tracker, quest_system, leveling
-        except Exception as e:
-            current_app.logger.exception("Failed importing backend modules for dashboard")
-            raise
-
-        user = auth.get_user(username)
-        if not user:
-            session.pop("username", None)
-            return redirect(url_for("login"))
-
-        # fetch raw backend data (may be model objects or dicts)
-        try:
-            raw_tasks = task_tracker.get_tasks(username) if hasattr(task_tracker, "get_tasks") else []
-            level = leveling.get_level(username) if hasattr(leveling, "get_level") else 1
-            xp = leveling.get_xp(username) if hasattr(leveling, "get_xp") else 0
-            quests = quest_system.get_quests(username) if hasattr(quest_system, "get_quests") else []
-            raw_study_sessions = academic_tracker.get_study_sessions(username) if hasattr(academic_tracker, "get_study_sessions") else []
+            state = state_mod.load_state(username, limit=DEFAULT_PAGE_SIZE)
         except Exception:
             current_app.logger.exception("Server error fetching dashboard data")
             return "Server error fetching dashboard data", 500
 
-        # ---------------- Normalise tasks -> list[dict] ----------------
-        tasks_list = []
-        try:
-            for t in raw_tasks or []:
-                if isinstance(t, dict):
-                    tasks_list.append({
-                        "id": t.get("id"),
-                        "title": t.get("title", ""),
-                        "description": t.get("description", ""),
-                        "is_done": bool(t.get("is_done", False)),
-                        "xp": int(t.get("xp", 10)),
-                    })
-                else:
-                    tasks_list.append({
-                        "id": getattr(t, "id", None),
-                        "title": getattr(t, "title", "") or "",
-                        "description": getattr(t, "description", "") or "",
-                        "is_done": bool(getattr(t, "is_done", False)),
-                        "xp": int(getattr(t, "xp", 10) or 10),
-                    })
-        except Exception:
-            current_app.logger.exception("Failed normalizing tasks")
-            tasks_list = []
-
-        # ---------------- Normalise study sessions -> list[dict] ----------------
-        sessions_list = []
-        try:
-            for s in raw_study_sessions or []:
-                if isinstance(s, dict):
-                    sessions_list.append({
-                        "id": s.get("id"),
-                        "subject": s.get("subject", ""),
-                        "hours": float(s.get("hours") or 0),
-                        "date": s.get("date"),
-                    })
-                else:
-                    d = getattr(s, "date", None)
-                    sessions_list.append({
-                        "id": getattr(s, "id", None),
-                        "subject": getattr(s, "subject", "") or "",
-                        "hours": float(getattr(s, "hours", 0) or 0),
-                        "date": d.isoformat() if d is not None else None,
-                    })
-        except Exception:
-            current_app.logger.exception("Failed normalizing study sessions")
-            sessions_list = []
+        if state is None:
+            # deleted behind the ORM's back (raw SQL): drop the cached identity too
+            auth.forget_identity(username)
+            session.pop("username", None)
+            session.pop("user_id", None)
+            return redirect(url_for("login"))
 
-        # ---------------- Optional: Aggregate academic hours by subject if you still need that ----------------
-        academics_by_subject = {}
-        try:
-            for rec in sessions_list:
-                subj = rec.get("subject")
-                hrs = float(rec.get("hours", 0) or 0)
-                if subj:
-                    academics_by_subject[subj] = academics_by_subject.get(subj, 0) + hrs
-        except Exception:
-            academics_by_subject = {}
+        tasks_list = state["tasks"]
+        sessions_list = state["academics"]
+        xp = state["stats"]["xp"]
+        level = state["stats"]["level"]
 
-        # ---------------- Build single initial-state object for client ----------------
-        state = {
-            "user": {"username": username},
-            "stats": {"xp": int(xp or 0), "level": int(level or 1)},
-            "tasks": tasks_list,
-            "academics": sessions_list,
-        }
+        # ---------------- Academic hours by subject (one all-time rollup row per subject) ----------------
+        academics_by_subject = academic_tracker.get_subject_totals(username)
 
         # Render template with normalized serializable structures (and the convenience 'state')
         return render_template(
             "dashboard.html",
             username=username,
-            user=user,
+            user=state["user"],
             tasks=tasks_list,             # normalized for template
             level=level,
             xp=xp,
-            quests=quests,
+            quests=state["quests"],
             academics=sessions_list,      # normalized sessions list
             academics_by_subject=academics_by_subject,
-            state=state                   # single object to inject with |tojson
+            state={
+                "user": state["user"],
+                "stats": state["stats"],
+                "tasks": tasks_list,
+                "academics": sessions_list,
+                "next_cursors": state["next_cursors"],
+            }                             # single object to inject with |tojson
         )
 
+    # ------------ session helpers ------------
+    def _session_username():
+        """
+        Username of the logged-in user, or None. The account check is served by
+        auth's identity cache (normally no query); a session whose account is
+        gone is cleared.
+        """
+        if "username" not in session:
+            return None
+        identity = auth.current_user()
+        if identity is None:
+            session.pop("username", None)
+            session.pop("user_id", None)
+            return None
+        return identity["username"]
+
+    # ------------ conditional GET helpers ------------
+    def _check_etag(username, scope):
+        """
+        Return (etag, response). response is a ready 304 when the client's
+        If-None-Match already matches the user's current state version, else None.
+        """
+        etag = state_mod.etag_for(username, scope)
+        if request.if_none_match.contains_weak(etag):
+            return etag, _with_etag(current_app.response_class(status=304), etag)
+        return etag, None
+
+    def _with_etag(resp, etag):
+        resp.set_etag(etag, weak=True)
+        # per-user payloads: never share, always revalidate
+        resp.headers["Cache-Control"] = "private, no-cache"
+        resp.vary.add("Cookie")
+        return resp
+
     # ------------ API: state ------------
     @app.route("/api/state")
     def api_state():
-        if "username" not in session:
+        username = _session_username()
+        if not username:
             return jsonify({"ok": False, "error": "unauthenticated"}), 401
-        username = session["username"]
-
-        try:
-            import backend.auth as auth
-            from backend import task_tracker, leveling, quest_system, academic_tracker
-        except Exception as e:
-            current_app.logger.exception("api_state import fail")
-            return jsonify({"ok": False, "error": f"import_error: {e}"}), 500
 
-        user = auth.get_user(username)
-        if not user:
-            session.pop("username", None)
-            return jsonify({"ok": False, "error": "user_not_found"}), 401
+        etag, not_modified = _check_etag(username, "state")
+        if not_modified is not None:
+            return not_modified
 
-        tasks = []
-        xp = 0
-        level = 1
         try:
-            if hasattr(task_tracker, "get_tasks"):
-                raw = task_tracker.get_tasks(username) or []
-                for t in raw:
-                    if isinstance(t, dict):
-                        tasks.append({
-                            "id": t.get("id"),
-                            "title": t.get("title"),
-                            "description": t.get("description"),
-                            "is_done": bool(t.get("is_done")),
-                            "xp": int(t.get("xp", 10)),
-                        })
-                    else:
-                        tasks.append({
-                            "id": getattr(t, "id", None),
-                            "title": getattr(t, "title", ""),
-                            "description": getattr(t, "description", ""),
-                            "is_done": bool(getattr(t, "is_done", False)),
-                            "xp": int(getattr(t, "xp", 10)),
-                        })
-            if hasattr(leveling, "get_xp"):
-                xp = int(leveling.get_xp(username) or 0)
-            if hasattr(leveling, "get_level"):
-                level = int(leveling.get_level(username) or 1)
+            state = state_mod.load_state(username, limit=DEFAULT_PAGE_SIZE)
         except Exception:
             current_app.logger.exception("api_state fetch error")
             return jsonify({"ok": False, "error": "fetch_error"}), 500
 
-        return jsonify({
+        if state is None:
+            # deleted behind the ORM's back (raw SQL): drop the cached identity too
+            auth.forget_identity(username)
+            session.pop("username", None)
+            session.pop("user_id", None)
+            return jsonify({"ok": False, "error": "user_not_found"}), 401
+
+        return _with_etag(jsonify({
             "ok": True,
-            "user": {"username": username},
-            "stats": {"xp": xp, "level": level},
-            "tasks": tasks
-        })
+            "user": state["user"],
+            "stats": state["stats"],
+            "tasks": state["tasks"],
+            "tasks_next_cursor": state["next_cursors"]["tasks"]
+        }), etag)
 
     # alias to refresh
     @app.route("/api/state/refresh")
     def api_state_refresh():
         return api_state()
 
+    # ------------ API: push stream ------------
+    @app.route("/api/stream")
+    def api_stream():
+        """
+        Server-sent events: pushes per-user deltas published by the backend
+        (stats, task_added, task_completed, academic_logged, quest_completed).
+        Sends a comment heartbeat every STREAM_HEARTBEAT_SECONDS so proxies keep it open.
+        """
+        username = _session_username()
+        if not username:
+            return jsonify({"ok": False, "error": "unauthenticated"}), 401
+
+        heartbeat = float(current_app.config.get("STREAM_HEARTBEAT_SECONDS", 15))
+        sub = events.subscribe(username)
+
+        def generate():
+            try:
+                yield "retry: 5000\n\n"
+                yield events.format_sse({"type": "hello", "data": {"username": username}})
+                while True:
+                    msg = sub.get(timeout=heartbeat)
+                    if msg is None:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield events.format_sse(msg)
+            finally:
+                sub.close()
+
+        resp = Response(stream_with_context(generate()), mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Accel-Buffering"] = "no"
+        return resp
+
     # ------------ API: tasks ------------
     @app.route("/api/tasks", methods=["GET", "POST"])
     def api_tasks():
-        if "username" not in session:
+        username = _session_username()
+        if not username:
             return jsonify({"ok": False, "error": "unauthenticated"}), 401
-        username = session["username"]
-
-        from backend import task_tracker, leveling, db as _db
-        from backend.models import Task
 
         if request.method == "GET":
-            raw = task_tracker.get_tasks(username) if hasattr(task_tracker, "get_tasks") else []
+            etag, not_modified = _check_etag(username, "tasks")
+            if not_modified is not None:
+                return not_modified
+            # keyset pagination: ?cursor=<opaque>&limit=<n> (capped server-side)
+            try:
+                raw, next_cursor = task_tracker.get_tasks_page(
+                    username, cursor=request.args.get("cursor"), limit=request.args.get("limit")
+                )
+            except ValueError:
+                return jsonify({"ok": False, "error": "invalid_cursor"}), 400
             tasks = []
             for t in raw:
                 if isinstance(t, dict):
@@ -306,7 +339,7 @@ def create_app():
                         "is_done": bool(getattr(t, "is_done", False)),
                         "xp": int(getattr(t, "xp", 10)),
                     })
-            return jsonify({"ok": True, "tasks": tasks})
+            return _with_etag(jsonify({"ok": True, "tasks": tasks, "next_cursor": next_cursor}), etag)
 
         # POST = add task
         data = request.get_json(silent=True) or {}
@@ -316,77 +349,44 @@ def create_app():
             return jsonify({"ok": False, "error": "title_required"}), 400
 
         try:
-            if hasattr(task_tracker, "add_task"):
-                # If task_tracker.add_task returns awarded xp or task object, handle gracefully
-                res = task_tracker.add_task(username, title, description)
-                # if module returns xp or task, don't assume anything; return success
-                awarded = None
-                if isinstance(res, (int, float)):
-                    awarded = int(res)
-                # after adding, fetch authoritative total xp if possible
-                total_xp = None
-                if hasattr(leveling, "get_xp"):
-                    try:
-                        total_xp = int(leveling.get_xp(username) or 0)
-                    except Exception:
-                        total_xp = None
-                resp = {"ok": True}
-                if awarded is not None:
-                    resp["awarded_xp"] = awarded
-                if total_xp is not None:
-                    resp["total_xp"] = total_xp
-                return jsonify(resp)
-            else:
-                t = Task(username=username, title=title, description=description, is_done=False, xp=10)
-                _db.session.add(t)
-                _db.session.commit()
-                # return totals
-                total_xp = None
-                from backend import leveling as _lev
-                if hasattr(_lev, "get_xp"):
-                    try:
-                        total_xp = int(_lev.get_xp(username) or 0)
-                    except Exception:
-                        total_xp = None
-                resp = {"ok": True}
-                if total_xp is not None:
-                    resp["total_xp"] = total_xp
-                return jsonify(resp)
+            task_id, result = task_tracker.add_task(username, title, description)
         except Exception:
             current_app.logger.exception("api_tasks POST failed")
             return jsonify({"ok": False, "error": "server_error"}), 500
+        if task_id is None:
+            return jsonify({"ok": False, "error": "db_error"}), 500
+
+        resp = {"ok": True, "id": task_id}
+        if result and result.get("ok"):
+            # xp_added: what the daily cap let through
+            resp["awarded_xp"] = int(result.get("xp_added", task_tracker.TASK_CREATE_XP))
+            resp["total_xp"] = int(result["xp"])
+            resp["level"] = int(result["level"])
+        return jsonify(resp)
 
     @app.route("/api/tasks/<int:task_id>/complete", methods=["POST"])
     def api_complete_task(task_id):
-        if "username" not in session:
+        username = _session_username()
+        if not username:
             return jsonify({"ok": False, "error": "unauthenticated"}), 401
-        username = session["username"]
-
-        from backend import db as _db, leveling
-        from backend.models import Task
-
-        task = Task.query.get(task_id)
-        if not task or task.username != username:
-            return jsonify({"ok": False, "error": "not_found_or_forbidden"}), 404
 
         awarded = 0
         try:
-            if not getattr(task, "is_done", False):
-                task.is_done = True
-                _db.session.add(task)
-                _db.session.commit()
-                awarded = int(getattr(task, "xp", 10))
-                if hasattr(leveling, "add_xp"):
-                    try:
-                        leveling.add_xp(username, awarded)
-                    except Exception:
-                        current_app.logger.exception("leveling.add_xp failed on task complete")
-            else:
-                awarded = 0
+            # the batch path's conditional UPDATE: a task completed concurrently
+            # (another request, a batch) is reported already_done and earns nothing
+            results, result = task_tracker.complete_tasks(username, [task_id])
         except Exception:
-            _db.session.rollback()
+            db.session.rollback()
             current_app.logger.exception("api_complete_task DB failure")
             return jsonify({"ok": False, "error": "db_error"}), 500
+        if results[0].get("error") == "not_found":
+            return jsonify({"ok": False, "error": "not_found_or_forbidden"}), 404
+        if results[0]["ok"]:
+            awarded = int(results[0]["xp"])
+
+        if result:
+            # xp_added: what the daily cap let through
+            return jsonify({"ok": True, "awarded_xp": result.get("xp_added", awarded), "total_xp": int(result["xp"])})
 
         total_xp = 0
         if hasattr(leveling, "get_xp"):
@@ -397,12 +397,47 @@ def create_app():
 
         return jsonify({"ok": True, "awarded_xp": awarded, "total_xp": total_xp})
 
+    # ------------ API: task batches ------------
+    # body: {"tasks": [{"title", "description"}, ...]} for create, {"ids": [...]} otherwise;
+    # one transaction and one XP update per call, results reported per item
+    def _batch_response(results, xp_result=None):
+        succeeded = sum(1 for r in results if r and r.get("ok"))
+        resp = {"ok": True, "results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+        if xp_result and xp_result.get("ok"):
+            resp["total_xp"] = int(xp_result["xp"])
+            resp["level"] = int(xp_result["level"])
+        return jsonify(resp)
+
+    def _run_batch(op, key):
+        username = _session_username()
+        if not username:
+            return jsonify({"ok": False, "error": "unauthenticated"}), 401
+
+        data = request.get_json(silent=True) or {}
+        try:
+            out = getattr(task_tracker, op)(username, data.get(key))
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e), "max_batch_size": task_tracker.MAX_BATCH_SIZE}), 400
+        except Exception:
+            current_app.logger.exception("%s failed", op)
+            return jsonify({"ok": False, "error": "db_error"}), 500
+        return _batch_response(*out) if isinstance(out, tuple) else _batch_response(out)
+
+    @app.route("/api/tasks/batch", methods=["POST"])
+    def api_tasks_batch_create():
+        return _run_batch("add_tasks", "tasks")
+
+    @app.route("/api/tasks/batch/complete", methods=["POST"])
+    def api_tasks_batch_complete():
+        return _run_batch("complete_tasks", "ids")
+
+    @app.route("/api/tasks/batch/delete", methods=["POST"])
+    def api_tasks_batch_delete():
+        return _run_batch("delete_tasks", "ids")
+
     # ------------ API: academic ------------
     # single implementation used by both HTML form route (below) and API route
     def _process_academic_log(username, subject, hours):
-        from backend import leveling, db as _db
-        from backend.models import AcademicLog
-
         try:
             hours = float(hours)
         except Exception:
@@ -411,20 +446,25 @@ def create_app():
             raise ValueError("invalid_input")
 
         rec = AcademicLog(username=username, subject=subject, hours=hours, date=datetime.utcnow())
-        _db.session.add(rec)
-
         awarded = int(hours * 5)
-        if hasattr(leveling, "add_xp"):
-            try:
-                leveling.add_xp(username, awarded)
-            except Exception:
-                current_app.logger.exception("leveling.add_xp failed")
 
-        try:
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-            raise
+        # log row, study rollups + XP award in a single commit (the ledger rolls back on error)
+        with leveling.xp_ledger() as ledger:
+            db.session.add(rec)
+            db.session.flush()  # rec.id for the XP event
+            academic_tracker.record_study(username, subject, hours, rec.date)
+            leveling.add_xp(username, awarded, "study", rec.id)
+        result = ledger.results.get(username)
+
+        events.publish(username, "academic_logged", {"session": {
+            "id": rec.id,
+            "subject": rec.subject,
+            "hours": float(rec.hours or 0),
+            "date": rec.date.isoformat() if rec.date else None,
+        }})
+
+        if result:
+            return result.get("xp_added", awarded), int(result["xp"])
 
         total_xp = None
         if hasattr(leveling, "get_xp"):
@@ -438,9 +478,9 @@ def create_app():
     @app.route("/add_academic", methods=["POST"])
     def add_academic():
         # HTML form endpoint (keeps old behaviour)
-        if "username" not in session:
+        username = _session_username()
+        if not username:
             return redirect(url_for("login"))
-        username = session["username"]
         subject = request.form.get("subject", "").strip()
         hours = request.form.get("hours", 0)
         try:
@@ -458,32 +498,31 @@ def create_app():
 
     @app.route("/api/academic", methods=["GET", "POST"])
     def api_academic():
-        if "username" not in session:
+        username = _session_username()
+        if not username:
             return jsonify({"ok": False, "error": "unauthenticated"}), 401
-        username = session["username"]
-
-        from backend.models import AcademicLog
 
         if request.method == "GET":
             try:
-                rows = AcademicLog.query.filter_by(username=username).order_by(AcademicLog.date.desc()).limit(50).all()
-                out = []
-                for r in rows:
-                    out.append({
-                        "id": getattr(r, "id", None),
-                        "subject": getattr(r, "subject", ""),
-                        "hours": float(getattr(r, "hours", 0)),
-                        "date": getattr(r, "date", None).isoformat() if getattr(r, "date", None) else None
-                    })
+                etag, not_modified = _check_etag(username, "academic")
+                if not_modified is not None:
+                    return not_modified
+                try:
+                    out, next_cursor = academic_tracker.get_study_sessions_page(
+                        username, cursor=request.args.get("cursor"), limit=request.args.get("limit")
+                    )
+                except ValueError:
+                    return jsonify({"ok": False, "error": "invalid_cursor"}), 400
                 # return totals too
                 total_xp = None
-                from backend import leveling as _lev
-                if hasattr(_lev, "get_xp"):
+                if hasattr(leveling, "get_xp"):
                     try:
-                        total_xp = int(_lev.get_xp(username) or 0)
+                        total_xp = int(leveling.get_xp(username) or 0)
                     except Exception:
                         total_xp = None
-                return jsonify({"ok": True, "sessions": out, "total_xp": total_xp})
+                return _with_etag(jsonify({
+                    "ok": True, "sessions": out, "next_cursor": next_cursor, "total_xp": total_xp
+                }), etag)
             except Exception:
                 current_app.logger.exception("api_academic GET failed")
                 return jsonify({"ok": False, "error": "server_error"}), 500
@@ -508,12 +547,159 @@ def create_app():
             current_app.logger.exception("api_academic POST failed")
             return jsonify({"ok": False, "error": "server_error"}), 500
 
+    @app.route("/api/academic/stats")
+    def api_academic_stats():
+        """Per-subject totals and a day/week series, read from the study rollups."""
+        username = _session_username()
+        if not username:
+            return jsonify({"ok": False, "error": "unauthenticated"}), 401
+
+        period = request.args.get("period", "week")
+        periods = request.args.get("periods", 12, type=int)
+        # the window ends in the current day / week, so the tag changes when a new one starts
+        today = datetime.utcnow().date()
+        start = academic_tracker.period_start(period, today)
+        etag, not_modified = _check_etag(username, f"academic-stats-{period}-{periods}-{start}")
+        if not_modified is not None:
+            return not_modified
+        try:
+            stats = academic_tracker.get_study_stats(username, period=period, periods=periods, today=today)
+        except ValueError:
+            return jsonify({"ok": False, "error": "invalid_period"}), 400
+        except Exception:
+            current_app.logger.exception("api_academic_stats failed")
+            return jsonify({"ok": False, "error": "server_error"}), 500
+        return _with_etag(jsonify({"ok": True, **stats}), etag)
+
+    # ------------ API: analytics ------------
+    @app.route("/api/analytics")
+    def api_analytics():
+        """XP and study hours per day / week / month, from the XP event log and study rollups."""
+        username = _session_username()
+        if not username:
+            return jsonify({"ok": False, "error": "unauthenticated"}), 401
+
+        bucket = request.args.get("bucket", "week")
+        days = request.args.get("days", type=int)
+        # the window ends today, so the tag changes at midnight (UTC) as well as on writes
+        today = datetime.utcnow().date()
+        etag, not_modified = _check_etag(username, f"analytics-{bucket}-{days}-{today.isoformat()}")
+        if not_modified is not None:
+            return not_modified
+        try:
+            data = analytics.get_analytics(username, bucket=bucket, days=days, today=today)
+        except ValueError:
+            return jsonify({"ok": False, "error": "invalid_bucket"}), 400
+        except Exception:
+            current_app.logger.exception("api_analytics failed")
+            return jsonify({"ok": False, "error": "server_error"}), 500
+        return _with_etag(jsonify({"ok": True, **data}), etag)
+
+    # ------------ API: leaderboard ------------
+    @app.route("/api/leaderboard")
+    def api_leaderboard():
+        """
+        Global XP ranking from the in-process rank index (backend.leaderboard):
+          view=top        entries at ?offset=0&limit=10
+          view=around     entries within ?radius=5 places of the user
+          view=percentile XP needed to be in the ?top=10 percent
+        Every view includes the user's own standing as "me".
+        """
+        username = _session_username()
+        if not username:
+            return jsonify({"ok": False, "error": "unauthenticated"}), 401
+
+        view = request.args.get("view", "top")
+        try:
+            leaderboard.ensure_loaded()
+            me = leaderboard.standing(username)
+            if me is None:
+                # not in the index yet (e.g. registered in another worker since the last rebuild)
+                stats = leveling.get_stats(username) or {}
+                leaderboard.note_player(username, stats.get("xp", 0), stats.get("level", 0))
+                me = leaderboard.standing(username)
+            body = {"ok": True, "view": view, "me": me}
+            if view == "top":
+                body["entries"] = leaderboard.top(
+                    limit=request.args.get("limit", 10, type=int),
+                    offset=request.args.get("offset", 0, type=int),
+                )
+            elif view == "around":
+                body["entries"] = leaderboard.around(username, radius=request.args.get("radius", 5, type=int))
+            elif view == "percentile":
+                body["threshold"] = leaderboard.threshold(request.args.get("top", 10, type=float))
+            else:
+                return jsonify({"ok": False, "error": "invalid_view"}), 400
+        except ValueError:
+            return jsonify({"ok": False, "error": "invalid_percent"}), 400
+        except Exception:
+            current_app.logger.exception("api_leaderboard failed")
+            return jsonify({"ok": False, "error": "server_error"}), 500
+        resp = jsonify(body)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+
+    # ------------ API: quests ------------
+    @app.route("/api/quests")
+    def api_quests():
+        username = _session_username()
+        if not username:
+            return jsonify({"ok": False, "error": "unauthenticated"}), 401
+
+        etag, not_modified = _check_etag(username, "quests")
+        if not_modified is not None:
+            return not_modified
+        try:
+            quests, next_cursor = quest_system.get_quests_page(
+                username, cursor=request.args.get("cursor"), limit=request.args.get("limit")
+            )
+        except ValueError:
+            return jsonify({"ok": False, "error": "invalid_cursor"}), 400
+        except Exception:
+            current_app.logger.exception("api_quests GET failed")
+            return jsonify({"ok": False, "error": "server_error"}), 500
+        return _with_etag(jsonify({"ok": True, "quests": quests, "next_cursor": next_cursor}), etag)
+
+    # ------------ API: export ------------
+    @app.route("/api/export")
+    def api_export():
+        """
+        Full history (stats, tasks, quests, study sessions) as ?format=csv (default)
+        or ndjson, streamed from the DB and gzip-compressed on the fly when the
+        client accepts it.
+        """
+        username = _session_username()
+        if not username:
+            return jsonify({"ok": False, "error": "unauthenticated"}), 401
+
+        fmt = (request.args.get("format") or "csv").lower()
+        if fmt not in export.FORMATS:
+            return jsonify({"ok": False, "error": "invalid_format"}), 400
+
+        etag, not_modified = _check_etag(username, "export-" + fmt)
+        if not_modified is not None:
+            return not_modified
+
+        chunks = export.iter_csv(username) if fmt == "csv" else export.iter_ndjson(username)
+        gzip_ok = "gzip" in (request.headers.get("Accept-Encoding") or "").lower()
+        if gzip_ok:
+            chunks = export.gzip_chunks(chunks)
+
+        mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        resp = Response(stream_with_context(chunks), mimetype=mimetype)
+        resp.headers["Content-Disposition"] = f'attachment; filename="{export.export_filename(username, fmt)}"'
+        resp.headers["X-Accel-Buffering"] = "no"
+        resp.vary.add("Accept-Encoding")
+        if gzip_ok:
+            resp.headers["Content-Encoding"] = "gzip"
+        return _with_etag(resp, etag)
+
     # ------------ Optional: simple quests API (example) ------------
     @app.route("/api/complete_quest", methods=["POST"])
     def api_complete_quest():
-        if "username" not in session:
+        username = _session_username()
+        if not username:
             return jsonify({"ok": False, "error": "unauthenticated"}), 401
-        username = session["username"]
         data = request.get_json(silent=True) or {}
         title = (data.get("title") or "").strip()
         if not title:
@@ -521,7 +707,6 @@ def create_app():
 
         # Attempt to delegate to backend.quest_system if available
         try:
-            from backend import quest_system, leveling
             res = None
             if hasattr(quest_system, "complete_quest"):
                 res = quest_system.complete_quest(username, title)
@@ -533,7 +718,7 @@ def create_app():
                 awarded = 10
                 if hasattr(leveling, "add_xp"):
                     try:
-                        leveling.add_xp(username, awarded)
+                        awarded = leveling.add_xp(username, awarded, "quest").get("xp_added", awarded)
                     except Exception:
                         current_app.logger.exception("leveling.add_xp failed for quest")
             total_xp = None
@@ -550,6 +735,13 @@ def create_app():
             current_app.logger.exception("api_complete_quest failed")
             return jsonify({"ok": False, "error": "server_error"}), 500
 
+    # ------------ metrics ------------
+    if app.config.get("EXPOSE_METRICS"):
+        @app.route("/_metrics/passwords")
+        def _metrics_passwords():
+            # hashing pool latency / queue depth and rate-limit counters
+            return jsonify(passwords.metrics())
+
     # ------------ debug helpers ------------
     @app.route("/_debug_session")
     def _debug_session():
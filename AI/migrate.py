@@ -0,0 +1,64 @@
+# migrate.py
+"""
+Schema migration CLI (see backend/migrations.py).
+
+Uses the same database as the app: the bundled SQLite file by default, or
+SAM_AI_DATABASE_URL / DATABASE_URL (e.g. postgresql://...) when set.
+
+Usage:
+  python migrate.py upgrade [--to N]   apply pending migrations (default command)
+  python migrate.py current            print the recorded schema version
+  python migrate.py history            list migrations, marking applied ones
+  python migrate.py rebuild-rollups [--user NAME]
+                                       recompute study rollups from academic_logs
+"""
+
+import argparse
+import sys
+
+from main_app import create_app
+from backend.extentions import db
+from backend import migrations
+from backend.database import list_tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sam AI schema migrations")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=("upgrade", "current", "history", "rebuild-rollups"))
+    parser.add_argument("--to", type=int, default=None, help="stop at this version")
+    parser.add_argument("--user", default=None, help="rebuild-rollups: only this user")
+    args = parser.parse_args(argv)
+
+    # the CLI runs migrations itself, with output, instead of at app start
+    app = create_app({"SCHEMA_MODE": "off"})
+    with app.app_context():
+        engine = db.engine
+        print("Using DB:", engine.url.render_as_string(hide_password=True))
+        version = migrations.current_version(engine)
+
+        if args.command == "current":
+            print("schema version:", "unversioned" if version is None else version, f"(head {migrations.HEAD})")
+            return 0
+
+        if args.command == "history":
+            for number, description, _ in migrations.MIGRATIONS:
+                mark = "x" if version is not None and number <= version else " "
+                print(f"[{mark}] {number:04d} {description}")
+            return 0
+
+        if args.command == "rebuild-rollups":
+            from backend.academic_tracker import rebuild_study_rollups
+            written = rebuild_study_rollups(username=args.user)
+            db.session.commit()
+            print("rollup rows written:", written)
+            return 0
+
+        applied = migrations.upgrade(engine, target=args.to)
+        print("applied:", ", ".join(map(str, applied)) if applied else "nothing (up to date)")
+        print("schema version:", migrations.current_version(engine))
+        print("Tables:", list_tables())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
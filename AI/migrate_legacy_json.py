@@ -0,0 +1,423 @@
+# migrate_legacy_json.py
+"""
+One-shot migrator: loads the legacy JSON stores into the database.
+
+Sources (paths relative to AI/), imported in this order:
+- backend/data/user.json, data/user.json  {username: {"password": ...}}  -> User
+- data/tasks.json            {username: [{title, description, completed}]} -> Task
+- data/quest_data.json       {username: [quest, ...] | {title: quest}}    -> Quest
+- data/academic_data.json    [{username, subject, hours, date}] or {username: [...]} -> AcademicLog
+- data/academics/<user>.json {subject: hours}                             -> AcademicLog
+- data/xp.json               {username: xp}                               -> PlayerStats (via add_xp)
+- data/level_data.json       {username: {strength, memory, stamina, ...}} -> PlayerStats stats
+
+Files are parsed incrementally (one top-level entry at a time), so a large
+file is never loaded whole. Records are written in chunks, each chunk in ONE
+transaction together with its checkpoint row (import_checkpoints). An
+interrupted run resumes after the last committed chunk, and a re-run skips
+sources that are already done. Checkpoints are keyed by a content hash: if a
+source changed after it was imported, it is skipped with a warning unless
+--reset is given (which imports it again from the start).
+
+Legacy XP totals are added with add_xp, so levels follow the current curve.
+Completed legacy tasks/quests do not award XP again; xp.json already holds it.
+Users referenced by data files but absent from user.json get a random
+password and must reset it.
+
+Usage: python migrate_legacy_json.py [--chunk-size N] [--reset] [--dry-run]
+"""
+
+import argparse
+import codecs
+import hashlib
+import json
+import os
+import secrets
+import sys
+import time
+from datetime import datetime
+
+from main_app import create_app
+from backend.extentions import db
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+READ_SIZE = 64 * 1024
+
+
+# ------------------------
+# Incremental JSON reading
+# ------------------------
+def _encoding(path):
+    with open(path, "rb") as f:
+        head = f.read(4)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    return "utf-8"
+
+
+def iter_json_entries(path, read_size=READ_SIZE):
+    """
+    Yield (key, value) for each member of a top-level JSON object, or
+    (index, value) for each element of a top-level array, reading the file
+    in chunks. Only one entry is held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding=_encoding(path)) as f:
+        buf, pos, eof = "", 0, False
+
+        def more(n):
+            nonlocal buf, pos, eof
+            chunk = f.read(n)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        def peek():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return buf[pos] if pos < len(buf) else ""
+                more(read_size)
+
+        def value():
+            # a value is always followed by ',', ':', '}' or ']', so a decode that
+            # reaches the end of the buffer may be a truncated number: read on
+            nonlocal pos
+            want = read_size
+            while True:
+                peek()
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                    if end < len(buf) or eof:
+                        pos = end
+                        return obj
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                more(want)
+                want *= 2  # large values: grow reads so re-decoding stays linear
+
+        def expect(ch):
+            nonlocal pos
+            if peek() != ch:
+                raise ValueError(f"{path}: expected {ch!r} at offset {pos}")
+            pos += 1
+
+        first = peek()
+        if first == "":
+            return
+        if first not in "{[":
+            raise ValueError(f"{path}: top level must be an object or array")
+        pos += 1
+        closing = "}" if first == "{" else "]"
+        index = 0
+        if peek() == closing:
+            return
+        while True:
+            if first == "{":
+                key = value()
+                expect(":")
+            else:
+                key = index
+            yield key, value()
+            index += 1
+            if peek() == closing:
+                return
+            expect(",")
+
+
+def _sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ------------------------
+# Record extraction (one legacy entry -> normalized records)
+# ------------------------
+def _text(value, limit=None):
+    s = "" if value is None else str(value).strip()
+    return s[:limit] if limit else s
+
+
+def _date(value):
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+        except ValueError:
+            pass
+    return datetime.utcnow()
+
+
+def _users(path):
+    for username, info in iter_json_entries(path):
+        password = info.get("password") if isinstance(info, dict) else None
+        yield ("user", _text(username), password)
+
+
+def _tasks(path):
+    for username, tasks in iter_json_entries(path):
+        for t in tasks if isinstance(tasks, list) else []:
+            if not isinstance(t, dict) or not _text(t.get("title")):
+                continue
+            yield ("task", _text(username), {
+                "title": _text(t.get("title"), 200),
+                "description": _text(t.get("description")),
+                "is_done": bool(t.get("completed") or t.get("is_done")),
+                "xp": int(t.get("xp") or 10),
+                "created_at": _date(t.get("created_at")),
+            })
+
+
+def _quests(path):
+    for username, quests in iter_json_entries(path):
+        if isinstance(quests, dict):
+            quests = [dict(q, title=q.get("title") or title) if isinstance(q, dict) else {"title": title}
+                      for title, q in quests.items()]
+        for q in quests if isinstance(quests, list) else []:
+            if not isinstance(q, dict) or not _text(q.get("title") or q.get("name")):
+                continue
+            yield ("quest", _text(username), {
+                "title": _text(q.get("title") or q.get("name"), 200),
+                "description": _text(q.get("description")),
+                "reward_xp": int(q.get("reward_xp") or q.get("xp") or q.get("reward") or 20),
+                "completed": bool(q.get("completed") or q.get("done")),
+                "created_at": _date(q.get("created_at")),
+            })
+
+
+def _study_record(username, entry):
+    subject = _text(entry.get("subject"), 100)
+    if not username or not subject:
+        return None
+    return ("study", username, {
+        "subject": subject,
+        "hours": float(entry.get("hours") or 0.0),
+        "date": _date(entry.get("date")),
+    })
+
+
+def _academic_log(path):
+    for key, value in iter_json_entries(path):
+        if isinstance(key, int):  # [{"username": ..., ...}]
+            entries = [(value.get("username") or value.get("user"), value)] if isinstance(value, dict) else []
+        else:                     # {"username": [...]}
+            entries = [(key, e) for e in value if isinstance(e, dict)] if isinstance(value, list) else []
+        for username, entry in entries:
+            rec = _study_record(_text(username), entry)
+            if rec:
+                yield rec
+
+
+def _academic_totals(path):
+    username = os.path.splitext(os.path.basename(path))[0]
+    for subject, hours in iter_json_entries(path):
+        rec = _study_record(username, {"subject": subject, "hours": hours})
+        if rec:
+            yield rec
+
+
+def _xp(path):
+    for username, xp in iter_json_entries(path):
+        if isinstance(xp, dict):
+            xp = xp.get("xp")
+        try:
+            xp = int(xp or 0)
+        except (TypeError, ValueError):
+            continue
+        if xp > 0:
+            yield ("xp", _text(username), xp)
+
+
+def _levels(path):
+    for username, info in iter_json_entries(path):
+        if isinstance(info, dict):
+            stats = {k: int(info[k]) for k in ("strength", "memory", "stamina")
+                     if isinstance(info.get(k), (int, float))}
+            if stats:
+                yield ("stats", _text(username), stats)
+
+
+def sources():
+    """(relative path, extractor) in import order; missing files are skipped."""
+    out = [
+        ("backend/data/user.json", _users),
+        ("data/user.json", _users),
+        ("data/tasks.json", _tasks),
+        ("data/quest_data.json", _quests),
+        ("data/academic_data.json", _academic_log),
+    ]
+    academics_dir = os.path.join(BASE_DIR, "data", "academics")
+    if os.path.isdir(academics_dir):
+        for name in sorted(os.listdir(academics_dir)):
+            if name.endswith(".json"):
+                out.append((f"data/academics/{name}", _academic_totals))
+    out += [
+        ("data/xp.json", _xp),
+        ("data/level_data.json", _levels),
+    ]
+    return [(rel, fn) for rel, fn in out if os.path.isfile(os.path.join(BASE_DIR, rel))]
+
+
+# ------------------------
+# Chunk writer
+# ------------------------
+def _ensure_users(usernames, passwords):
+    """Insert missing User rows, and their PlayerStats rows, for usernames (inside the current transaction)."""
+    from backend.models import User
+    from backend.leveling import _insert_players_if_missing
+    from werkzeug.security import generate_password_hash
+
+    usernames = {u for u in usernames if u}
+    if not usernames:
+        return 0
+    existing = set(db.session.execute(
+        db.select(User.username).where(User.username.in_(usernames))
+    ).scalars())
+    now = datetime.utcnow()
+    rows = []
+    for u in sorted(usernames - existing):
+        if passwords.get(u):
+            pw_hash = generate_password_hash(passwords[u])
+        else:
+            # 192 random bits need no key stretching; scrypt here would dominate the import
+            pw_hash = generate_password_hash(secrets.token_urlsafe(24), method="pbkdf2:sha256:1")
+        rows.append({"username": u, "password_hash": pw_hash, "created_at": now})
+    if rows:
+        db.session.execute(db.insert(User), rows)
+        _insert_players_if_missing([r["username"] for r in rows])
+    return len(rows)
+
+
+def _write_chunk(records, rel, fingerprint, position, done):
+    """Write one chunk of records and its checkpoint in a single transaction."""
+    from backend.models import Task, Quest, AcademicLog, ImportCheckpoint
+    from backend.leveling import PlayerStats, add_xp, xp_ledger, _insert_player_if_missing
+    from backend.state import bump_versions
+    from backend.academic_tracker import _add_to_rollups, _rollup_rows
+
+    passwords = {r[1]: r[2] for r in records if r[0] == "user" and r[2]}
+    tasks = [dict(r[2], username=r[1]) for r in records if r[0] == "task"]
+    quests = [dict(r[2], username=r[1]) for r in records if r[0] == "quest"]
+    logs = [dict(r[2], username=r[1]) for r in records if r[0] == "study"]
+    usernames = {r[1] for r in records}
+
+    with xp_ledger():
+        _ensure_users(usernames, passwords)
+        if tasks:
+            db.session.execute(db.insert(Task), tasks)
+        if quests:
+            db.session.execute(db.insert(Quest), quests)
+        if logs:
+            db.session.execute(db.insert(AcademicLog), logs)
+            _add_to_rollups(db.session, [
+                row for log in logs
+                for row in _rollup_rows(log["username"], log["subject"], log["hours"], log["date"])
+            ])
+        for kind, username, value in records:
+            if kind == "xp":
+                add_xp(username, value, "import")
+            elif kind == "stats":
+                _insert_player_if_missing(username)
+                current = {k: db.func.coalesce(getattr(PlayerStats, k), 0) for k in value}
+                db.session.execute(
+                    db.update(PlayerStats).where(PlayerStats.username == username).values(**{
+                        k: db.case((current[k] < v, v), else_=current[k]) for k, v in value.items()
+                    })
+                )
+        bump_versions(usernames)
+
+        cp = db.session.get(ImportCheckpoint, rel)
+        if cp is None:
+            cp = ImportCheckpoint(source=rel, fingerprint=fingerprint)
+            db.session.add(cp)
+        cp.fingerprint = fingerprint
+        cp.position = position
+        cp.done = done
+    # the ledger committed; drop the stats cache entries we bypassed
+    from backend import leveling
+    for username in usernames:
+        leveling._cache_discard(username)
+
+
+def import_source(rel, extract, chunk_size=1000, dry_run=False):
+    """Import one source from its checkpoint on. Returns (records written, seconds)."""
+    from backend.models import ImportCheckpoint
+
+    path = os.path.join(BASE_DIR, rel)
+    fingerprint = _sha1(path)
+    cp = db.session.get(ImportCheckpoint, rel)
+    start = 0
+    if cp is not None:
+        if cp.fingerprint != fingerprint:
+            print(f"  {rel}: changed since it was imported (checkpoint at {cp.position}); "
+                  f"skipping, use --reset to import it again")
+            return 0, 0.0
+        if cp.done:
+            print(f"  {rel}: already imported ({cp.position} records)")
+            return 0, 0.0
+        start = cp.position
+        print(f"  {rel}: resuming after record {start}")
+
+    t0 = time.perf_counter()
+    written, position, chunk = 0, 0, []
+    for record in extract(path):
+        position += 1
+        if position <= start:
+            continue
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            if not dry_run:
+                _write_chunk(chunk, rel, fingerprint, position, done=False)
+            written += len(chunk)
+            chunk = []
+    if not dry_run:
+        # final (possibly empty) chunk marks the source done
+        _write_chunk(chunk, rel, fingerprint, position, done=True)
+    written += len(chunk)
+    return written, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import the legacy JSON stores into the database.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="records per transaction")
+    parser.add_argument("--reset", action="store_true", help="forget checkpoints and import everything again")
+    parser.add_argument("--dry-run", action="store_true", help="parse and count records without writing")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        from backend.models import ImportCheckpoint
+
+        print("Using DB:", db.engine.url)
+        if args.reset and not args.dry_run:
+            db.session.execute(db.delete(ImportCheckpoint))
+            db.session.commit()
+
+        total, total_secs = 0, 0.0
+        for rel, extract in sources():
+            try:
+                n, secs = import_source(rel, extract, max(1, args.chunk_size), args.dry_run)
+            except Exception as e:
+                db.session.rollback()
+                print(f"  {rel}: FAILED after the last checkpoint: {e!r}")
+                return 1
+            total += n
+            total_secs += secs
+            if n:
+                print(f"  {rel}: {n} records in {secs:.2f}s ({n / secs if secs else 0:,.0f} rows/s)")
+        rate = total / total_secs if total_secs else 0
+        print(f"Done: {total} records in {total_secs:.2f}s ({rate:,.0f} rows/s)"
+              + (" [dry run]" if args.dry_run else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,7 @@ import os, importlib
 # adjust if your create_app is in a different module
 from main_app import create_app
 
-app = create_app()
+app = create_app({"SCHEMA_MODE": "off"})  # inspection only: no schema check or migration
 print("FLASK APP created.")
 print("SQLALCHEMY_DATABASE_URI:", app.config.get("SQLALCHEMY_DATABASE_URI"))
 print("instance_path:", getattr(app, "instance_path", None))
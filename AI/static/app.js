@@ -1,4 +1,4 @@
-// static/app.js - Sam AI dashboard frontend (polished, real-time via polling + optimistic UI)
+// static/app.js - Sam AI dashboard frontend (polished, real-time via server push (SSE) with polling fallback + optimistic UI)
 
 // -------------------- Helpers --------------------
 function escapeHtml(s){
@@ -12,10 +12,29 @@ async function safeJson(resp){
   try { return await resp.json(); } catch(e){ return null; }
 }
 
+// Conditional GET: remember each URL's ETag + body and replay the body on 304.
+const ETAG_CACHE = {};
+async function fetchJsonCached(url){
+  const cached = ETAG_CACHE[url];
+  const headers = {};
+  if (cached) headers['If-None-Match'] = cached.etag;
+  // no-store: we do our own revalidation, so the 304 must reach us untouched
+  const resp = await fetch(url, { credentials:'same-origin', cache:'no-store', headers });
+  if (resp.status === 304 && cached) return cached.body;
+  const body = await safeJson(resp);
+  const etag = resp.headers.get('ETag');
+  if (etag && body && body.ok) ETAG_CACHE[url] = { etag, body };
+  else delete ETAG_CACHE[url];
+  return body;
+}
+
 // -------------------- UI state --------------------
 let todayXP = 0; // today's earned XP (client-side accumulation)
 let POLLING_INTERVAL_MS = 10000; // 10s; change as needed
 let POLLER = null;
+let STREAM = null; // EventSource for /api/stream (null when polling)
+let TASKS_NEXT_CURSOR = null; // keyset cursor for the next /api/tasks page (null = no more)
+let STUDY_NEXT_CURSOR = null; // same for /api/academic
 let CURRENT_STATE = { user:null, stats:{xp:0, level:1}, tasks:[] };
 
 // debounce helper
@@ -67,8 +86,7 @@ function updateXPAndUI(delta){
 // -------------------- Fetch / State --------------------
 async function fetchState(){
   try {
-    const resp = await fetch('/api/state', { credentials: 'same-origin' });
-    const j = await safeJson(resp);
+    const j = await fetchJsonCached('/api/state');
     if (!j || !j.ok) return null;
     return j;
   } catch(e){
@@ -93,6 +111,7 @@ async function refreshStateAndUI(){
   // tasks
   if (Array.isArray(s.tasks)) {
     CURRENT_STATE.tasks = s.tasks;
+    TASKS_NEXT_CURSOR = s.tasks_next_cursor || null;
     renderTasks();
   }
   // academics: we don't have daily aggregation from API here; loadAcademic will fetch sessions
@@ -110,6 +129,7 @@ function startPoller(){
         if (s.stats && typeof s.stats.xp !== 'undefined') setTopPoints(s.stats.xp);
         if (Array.isArray(s.tasks)) {
           CURRENT_STATE.tasks = s.tasks;
+          TASKS_NEXT_CURSOR = s.tasks_next_cursor || null;
           renderTasks();
         }
       }
@@ -118,13 +138,72 @@ function startPoller(){
 }
 function stopPoller(){ if (POLLER){ clearInterval(POLLER); POLLER = null; } }
 
+// -------------------- Server push --------------------
+function handlePush(msg){
+  if (!msg || !msg.type) return;
+  const d = msg.data || {};
+  switch (msg.type){
+    case 'stats':
+      if (typeof d.xp === 'number'){
+        CURRENT_STATE.stats = { xp: d.xp, level: d.level };
+        setTopPoints(d.xp);
+      }
+      break;
+    case 'task_added':
+      if (d.task){
+        const tasks = CURRENT_STATE.tasks || (CURRENT_STATE.tasks = []);
+        if (!tasks.some(t=>String(t.id) === String(d.task.id))) tasks.unshift(d.task);
+        renderTasks();
+      }
+      break;
+    case 'task_completed': {
+      const t = (CURRENT_STATE.tasks || []).find(t=>String(t.id) === String(d.id));
+      if (t) t.is_done = true;
+      renderTasks();
+      break;
+    }
+    case 'tasks_changed':
+      // batch create/complete/delete: refetch the first page
+      loadTasks();
+      break;
+    case 'academic_logged':
+      loadAcademic();
+      break;
+  }
+}
+
+// Open the push stream; fall back to polling when EventSource is unavailable or the stream dies.
+function startStream(){
+  if (STREAM) return;
+  if (typeof EventSource === 'undefined') { startPoller(); return; }
+  STREAM = new EventSource('/api/stream', { withCredentials: true });
+  STREAM.onopen = ()=>{
+    // resync anything missed while disconnected, then rely on pushes
+    stopPoller();
+    refreshStateAndUI();
+  };
+  ['stats','task_added','task_completed','tasks_changed','academic_logged','quest_completed'].forEach(type=>{
+    STREAM.addEventListener(type, ev=>{
+      try { handlePush(JSON.parse(ev.data)); } catch(e){ console.warn('bad push message', e); }
+    });
+  });
+  STREAM.onerror = ()=>{
+    // browser retries automatically while CONNECTING; poll in the meantime
+    startPoller();
+    if (STREAM && STREAM.readyState === EventSource.CLOSED){
+      STREAM = null;
+    }
+  };
+}
+function stopStream(){ if (STREAM){ STREAM.close(); STREAM = null; } }
+
 // -------------------- TASKS --------------------
 async function loadTasks(){
   try{
-    const resp = await fetch('/api/tasks', { credentials:'same-origin' });
-    const data = await safeJson(resp);
+    const data = await fetchJsonCached('/api/tasks');
     if (data && data.ok){
       CURRENT_STATE.tasks = data.tasks || [];
+      TASKS_NEXT_CURSOR = data.next_cursor || null;
       renderTasks();
     } else {
       console.warn('loadTasks error', data);
@@ -134,6 +213,23 @@ async function loadTasks(){
   }
 }
 
+// append the next keyset page of tasks
+async function loadMoreTasks(){
+  if (!TASKS_NEXT_CURSOR) return;
+  try{
+    const resp = await fetch('/api/tasks?cursor=' + encodeURIComponent(TASKS_NEXT_CURSOR), { credentials:'same-origin' });
+    const data = await safeJson(resp);
+    if (data && data.ok){
+      const seen = new Set((CURRENT_STATE.tasks || []).map(t=>String(t.id)));
+      (data.tasks || []).forEach(t=>{ if (!seen.has(String(t.id))) CURRENT_STATE.tasks.push(t); });
+      TASKS_NEXT_CURSOR = data.next_cursor || null;
+      renderTasks();
+    }
+  }catch(e){
+    console.error('loadMoreTasks failed', e);
+  }
+}
+
 function renderTasks(){
   const node = qs('tasks-list');
   if (!node) return;
@@ -170,6 +266,14 @@ function renderTasks(){
     btn.addEventListener('click', cb);
     btn._sami_cb = cb;
   });
+
+  if (TASKS_NEXT_CURSOR){
+    const more = document.createElement('button');
+    more.className = 'btn ghost';
+    more.textContent = 'Load more';
+    more.addEventListener('click', loadMoreTasks);
+    node.appendChild(more);
+  }
 }
 
 async function submitTask(e){
@@ -256,22 +360,49 @@ async function completeTask(id){
 }
 
 // -------------------- ACADEMIC --------------------
-async function loadAcademic(){
+function renderStudySessions(sessions, append){
+  const node = qs('study-list');
+  if (!node) return;
+  const oldMore = qs('study-more');
+  if (oldMore) oldMore.remove();
+  if (!append) node.innerHTML = '';
+  if (!append && sessions.length === 0) node.innerHTML = '<p style="color:var(--muted)">No study sessions logged yet.</p>';
+  sessions.forEach(s=>{
+    const el = document.createElement('div');
+    el.className = 'task';
+    el.innerHTML = `<div><strong>${escapeHtml(s.subject)}</strong><div style="color:var(--muted)">${s.hours} hours — ${s.date ? new Date(s.date).toLocaleString() : ''}</div></div>`;
+    node.appendChild(el);
+  });
+  if (STUDY_NEXT_CURSOR){
+    const more = document.createElement('button');
+    more.id = 'study-more';
+    more.className = 'btn ghost';
+    more.textContent = 'Load more';
+    more.addEventListener('click', loadMoreAcademic);
+    node.appendChild(more);
+  }
+}
+
+async function loadMoreAcademic(){
+  if (!STUDY_NEXT_CURSOR) return;
   try{
-    const resp = await fetch('/api/academic', { credentials:'same-origin' });
+    const resp = await fetch('/api/academic?cursor=' + encodeURIComponent(STUDY_NEXT_CURSOR), { credentials:'same-origin' });
     const data = await safeJson(resp);
     if (data && data.ok){
-      const node = qs('study-list');
-      if (!node) return;
-      node.innerHTML = '';
-      const sessions = data.sessions || [];
-      if (sessions.length === 0) node.innerHTML = '<p style="color:var(--muted)">No study sessions logged yet.</p>';
-      sessions.forEach(s=>{
-        const el = document.createElement('div');
-        el.className = 'task';
-        el.innerHTML = `<div><strong>${escapeHtml(s.subject)}</strong><div style="color:var(--muted)">${s.hours} hours — ${s.date ? new Date(s.date).toLocaleString() : ''}</div></div>`;
-        node.appendChild(el);
-      });
+      STUDY_NEXT_CURSOR = data.next_cursor || null;
+      renderStudySessions(data.sessions || [], true);
+    }
+  }catch(e){
+    console.error('loadMoreAcademic failed', e);
+  }
+}
+
+async function loadAcademic(){
+  try{
+    const data = await fetchJsonCached('/api/academic');
+    if (data && data.ok){
+      STUDY_NEXT_CURSOR = data.next_cursor || null;
+      renderStudySessions(data.sessions || [], false);
       // update top points if returned
       if (typeof data.total_xp === 'number') setTopPoints(data.total_xp);
     } else {
@@ -418,17 +549,8 @@ async function initDashboard(){
   }
 
   function exportCSV(){
-    // try use authoritative lists if present, else fallback to CURRENT_STATE
-    const tasks = CURRENT_STATE.tasks || [];
-    // academics list not stored globally here: fetch `/api/academic` if needed (skip for perf)
-    const rows = [['Type','Title/Subject','Value','Date']];
-    tasks.forEach(t=>rows.push(['task', t.title||'', t.description||'', '']));
-    // offer download
-    const csv = rows.map(r=>r.map(c=>'"'+String(c).replace(/"/g,'""')+'"').join(',')).join('\n');
-    const blob = new Blob([csv], {type:'text/csv'});
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a'); a.href = url; a.download='sam-ai-data.csv'; a.click();
-    URL.revokeObjectURL(url);
+    // full history (tasks, quests, study sessions, stats) is streamed by the server
+    window.location.href = '/api/export?format=csv';
   }
 
   // initial load
@@ -436,8 +558,8 @@ async function initDashboard(){
   await loadTasks();
   await loadAcademic();
 
-  // start poller for near-real-time updates (adjust interval above)
-  startPoller();
+  // server push for near-real-time updates; startStream falls back to the poller
+  startStream();
 }
 
 document.addEventListener('DOMContentLoaded', initDashboard);
@@ -0,0 +1,75 @@
+# stress_add_xp.py
+"""
+Concurrency stress check for leveling.add_xp.
+
+Runs N threads that each award XP to the same user many times against a
+throwaway SQLite database (or SAM_AI_TEST_DATABASE_URL, e.g. a local
+PostgreSQL), then verifies that every award succeeded, that no XP was lost
+and that the level matches the curve. Exits non-zero otherwise.
+
+Usage: python stress_add_xp.py [threads] [awards_per_thread]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import main_app
+
+
+def run(threads=8, per_thread=50, amount=7):
+    uri = os.environ.get("SAM_AI_TEST_DATABASE_URL")
+    if not uri:
+        tmpdir = tempfile.mkdtemp(prefix="sam_ai_stress_")
+        uri = "sqlite:///" + os.path.join(tmpdir, "stress.db").replace("\\", "/")
+    # no daily cap: every award must land for the lost-update check
+    app = main_app.create_app({"SQLALCHEMY_DATABASE_URI": uri, "SCHEMA_MODE": "auto", "DAILY_XP_CAP": 0})
+
+    from backend import leveling
+
+    username = "stress_user"
+    with app.app_context():
+        leveling.reset_player(username)
+
+    failures = []
+    start_gate = threading.Barrier(threads)
+
+    def worker():
+        with app.app_context():
+            start_gate.wait()
+            for _ in range(per_thread):
+                res = leveling.add_xp(username, amount)
+                if not res.get("ok"):
+                    failures.append(res.get("error"))
+
+    t0 = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with app.app_context():
+        leveling.clear_cache()
+        stats = leveling.get_stats(username)
+
+    expected = threads * per_thread * amount
+    print(f"threads={threads} awards={threads * per_thread} elapsed={elapsed:.2f}s "
+          f"({threads * per_thread / elapsed:.0f} awards/s)")
+    print(f"expected_xp={expected} db_xp={stats['xp']} failed_awards={len(failures)} level={stats['level']}")
+    # a failed award is a failure too, not a smaller expected total
+    ok = (not failures and stats["xp"] == expected
+          and stats["level"] == leveling.get_curve().level_for(stats["xp"]))
+    if failures:
+        print("sample failure:", failures[0])
+    print("OK: no lost updates" if ok else "FAIL: failed, lost or phantom XP")
+    return ok
+
+
+if __name__ == "__main__":
+    n_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    n_awards = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    sys.exit(0 if run(n_threads, n_awards) else 1)